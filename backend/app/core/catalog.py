@@ -0,0 +1,63 @@
+from typing import Any, Dict, Optional
+from beanie import PydanticObjectId
+from beanie.odm.operators.update.general import Set
+from fastapi import HTTPException
+from app.core.config import settings
+from app.core.events import publish_event
+from app.models import Category, Product
+
+# ----------------------------
+# --- CATEGORY DENORMALIZATION ---
+# ----------------------------
+
+def category_fields(category: Optional[Category]) -> Dict[str, Any]:
+    """
+    Category data copied into products, so listings and category filters
+    need no second query. The legacy free-text `category` follows the name.
+    """
+    if category is None:
+        return {"category_name": None, "category_slug": None}
+    return {"category": category.name, "category_name": category.name, "category_slug": category.slug}
+
+
+async def resolve_category_fields(category_id: Optional[str]) -> Dict[str, Any]:
+    """Embedded fields for a product pointing at `category_id` (400 if it does not exist)."""
+    if not category_id:
+        return category_fields(None)
+    category = None
+    if PydanticObjectId.is_valid(category_id):
+        category = await Category.get(PydanticObjectId(category_id))
+    if category is None:
+        raise HTTPException(status_code=400, detail="Category not found.")
+    return category_fields(category)
+
+
+async def fan_out_category(category_id: str) -> int:
+    """
+    Copy the current name/slug of a category into all its products with one
+    update_many. Reads the category at run time, so replays and out-of-order
+    runs converge on the latest values.
+    """
+    category = await Category.get(PydanticObjectId(category_id))
+    if category is None:
+        return 0
+    result = await Product.find({"category_id": category_id}).update(Set(category_fields(category)))
+    return result.modified_count if result else 0
+
+
+async def category_changed(category_id: str):
+    """
+    Schedule the fan-out of a renamed category on the worker. If the event
+    cannot be published (Redis down), the fan-out runs inline instead.
+    """
+    published = await publish_event(settings.CATALOG_EVENTS_STREAM, "category.updated", {"category_id": category_id})
+    if published is None:
+        await fan_out_category(category_id)
+
+
+async def backfill_category_fields():
+    """Embed category fields into products saved before they existed."""
+    async for category in Category.find_all():
+        await Product.find({"category_id": str(category.id), "category_slug": None}).update(
+            Set(category_fields(category))
+        )
@@ -0,0 +1,246 @@
+import gzip
+import hashlib
+import zlib
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+from app.core.redis import get_cache_bytes, set_cache_bytes
+
+# Brotli is optional: if the package is missing we simply negotiate gzip only
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+# Content types that are already compressed (or must be streamed untouched).
+# Re-compressing them wastes CPU for little or no size gain.
+SKIP_CONTENT_TYPES = (
+    "image/",
+    "video/",
+    "audio/",
+    "font/woff",
+    "application/zip",
+    "application/gzip",
+    "application/x-gzip",
+    "application/pdf",
+    "application/octet-stream",
+    "text/event-stream",
+)
+
+
+def supported_encodings() -> Tuple[str, ...]:
+    """Encodings this server can produce, in order of preference."""
+    if brotli is not None:
+        return ("br", "gzip")
+    return ("gzip",)
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """
+    Pick the best encoding from an Accept-Encoding header.
+    Honors q-values (q=0 disables an encoding) and prefers brotli on ties.
+    """
+    if not accept_encoding:
+        return None
+
+    qualities = {}
+    for part in accept_encoding.split(","):
+        token, _, params = part.strip().partition(";")
+        token = token.strip().lower()
+        if not token:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        qualities[token] = q
+
+    best, best_q = None, 0.0
+    for encoding in supported_encodings():
+        q = qualities.get(encoding, qualities.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def is_compressible(content_type: str) -> bool:
+    return not content_type.lower().startswith(SKIP_CONTENT_TYPES)
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    """Compress a body with the configured level for the given encoding."""
+    if encoding == "br":
+        return brotli.compress(body, quality=settings.BROTLI_QUALITY)
+    # mtime=0 keeps the output deterministic for identical payloads
+    return gzip.compress(body, compresslevel=settings.GZIP_LEVEL, mtime=0)
+
+
+class StreamCompressor:
+    """Incremental compression of a body sent in several chunks."""
+
+    def __init__(self, encoding: str):
+        if encoding == "br":
+            compressor = brotli.Compressor(quality=settings.BROTLI_QUALITY)
+            self.process, self.finish = compressor.process, compressor.finish
+        else:
+            # wbits 16+ writes the gzip container (mtime 0, like compress())
+            compressor = zlib.compressobj(settings.GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+            self.process, self.finish = compressor.compress, compressor.flush
+
+
+class CompressedCache:
+    """
+    Small in-process LRU of compressed representations.
+    Entries are keyed by (cache key, content digest, encoding), so a new
+    version of a cached payload naturally gets a new entry and the old one
+    ages out.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, str, str], bytes]" = OrderedDict()
+
+    def get(self, key: Tuple[str, str, str]) -> Optional[bytes]:
+        body = self._entries.get(key)
+        if body is not None:
+            self._entries.move_to_end(key)
+        return body
+
+    def put(self, key: Tuple[str, str, str], body: bytes):
+        self._entries[key] = body
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+compressed_cache = CompressedCache(settings.COMPRESSED_CACHE_SIZE)
+
+
+async def precompressed_response(
+    request: Request,
+    cache_key: str,
+    body: bytes,
+    status_code: int = 200,
+    extra_headers: Optional[Dict[str, str]] = None,
+) -> Response:
+    """
+    Build a JSON response for an already-serialized cached payload.
+    The compressed body is produced once per payload version and reused,
+    instead of being recompressed by the middleware on every request: first
+    from this process's LRU, then from Redis (shared by all instances).
+    """
+    headers = {"Vary": "Accept-Encoding", **(extra_headers or {})}
+    encoding = negotiate_encoding(request.headers.get("accept-encoding", ""))
+    if encoding is None or len(body) < settings.COMPRESSION_MINIMUM_SIZE:
+        return Response(body, status_code=status_code, media_type="application/json", headers=headers)
+
+    digest = hashlib.blake2b(body, digest_size=16).hexdigest()
+    entry_key = (cache_key, digest, encoding)
+    compressed = compressed_cache.get(entry_key)
+    if compressed is None:
+        shared_key = f"compressed:{cache_key}:{digest}:{encoding}"
+        compressed = await get_cache_bytes(shared_key)
+        if compressed is None:
+            compressed = compress(body, encoding)
+            await set_cache_bytes(shared_key, compressed, settings.COMPRESSED_CACHE_TTL)
+        compressed_cache.put(entry_key, compressed)
+
+    headers["Content-Encoding"] = encoding
+    return Response(compressed, status_code=status_code, media_type="application/json", headers=headers)
+
+
+class CompressionMiddleware:
+    """
+    Negotiated brotli/gzip compression.
+    - Skips responses that already carry a Content-Encoding (e.g. precompressed cache hits)
+    - Skips already-compressed content types (images, archives, ...)
+    - Bodies sent in several chunks (StreamingResponse, and every response
+      going through a BaseHTTPMiddleware such as @app.middleware("http"))
+      are buffered up to `minimum_size`, then compressed chunk by chunk
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: Optional[int] = None):
+        self.app = app
+        self.minimum_size = settings.COMPRESSION_MINIMUM_SIZE if minimum_size is None else minimum_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        initial_message: Message = {}
+        pending: List[bytes] = []  # chunks held while the body is still below minimum_size
+        compressor: Optional[StreamCompressor] = None
+
+        async def send_wrapper(message: Message):
+            nonlocal initial_message, compressor
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                if "content-encoding" in headers or not is_compressible(headers.get("content-type", "")):
+                    await send(message)
+                else:
+                    # Hold the headers until we know whether the body gets compressed
+                    initial_message = message
+                return
+
+            if message["type"] != "http.response.body" or not (initial_message or compressor):
+                # Other messages, or the body of a passed-through response
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+            if compressor is not None:
+                chunk = compressor.process(body)
+                if not more_body:
+                    chunk += compressor.finish()
+                if chunk or not more_body:
+                    await send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+                return
+
+            pending.append(body)
+            size = sum(len(c) for c in pending)
+            if more_body and size < self.minimum_size:
+                return
+
+            start, initial_message = initial_message, {}
+            body = b"".join(pending)
+            pending.clear()
+            if size < self.minimum_size:
+                # Complete and too small: sent as-is
+                await send(start)
+                await send({"type": "http.response.body", "body": body})
+                return
+
+            headers = MutableHeaders(raw=start["headers"])
+            headers.add_vary_header("Accept-Encoding")
+            headers["Content-Encoding"] = encoding
+            if not more_body:
+                compressed = compress(body, encoding)
+                headers["Content-Length"] = str(len(compressed))
+                await send(start)
+                await send({"type": "http.response.body", "body": compressed})
+                return
+
+            # More to come: the compressed length is not known in advance
+            del headers["Content-Length"]
+            compressor = StreamCompressor(encoding)
+            await send(start)
+            await send({"type": "http.response.body", "body": compressor.process(body), "more_body": True})
+
+        await self.app(scope, receive, send_wrapper)
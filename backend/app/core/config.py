@@ -4,5 +4,137 @@ class Settings:
     # Use 'redis' as hostname because in docker-compose, the service name is 'redis'
     # Default to localhost for local dev if not running in docker or if port is exposed
     REDIS_URL: str = os.getenv("REDIS_URL", "redis://redis:6379/0")
+    # Connection pool: at most N connections per client, callers wait up to POOL_TIMEOUT seconds for a free one
+    REDIS_MAX_CONNECTIONS: int = int(os.getenv("REDIS_MAX_CONNECTIONS", 50))
+    REDIS_POOL_TIMEOUT: float = float(os.getenv("REDIS_POOL_TIMEOUT", 2))
+    REDIS_SOCKET_TIMEOUT: float = float(os.getenv("REDIS_SOCKET_TIMEOUT", 2))
+    REDIS_CONNECT_TIMEOUT: float = float(os.getenv("REDIS_CONNECT_TIMEOUT", 2))
+    # Idle connections are PINGed before reuse after this many seconds
+    REDIS_HEALTH_CHECK_INTERVAL: int = int(os.getenv("REDIS_HEALTH_CHECK_INTERVAL", 30))
+    # Retries of a command on connection errors / timeouts
+    REDIS_RETRIES: int = int(os.getenv("REDIS_RETRIES", 2))
+    # Seconds between connection attempts when Redis was down at startup
+    REDIS_RECONNECT_INTERVAL: int = int(os.getenv("REDIS_RECONNECT_INTERVAL", 5))
+
+    # --- MongoDB read routing (see app/core/read_routing.py) ---
+    # Browsing reads may go to replica-set secondaries; a standalone server just serves them
+    CATALOG_READ_PREFERENCE: str = os.getenv("CATALOG_READ_PREFERENCE", "secondaryPreferred")
+    # Secondaries lagging more than this are skipped (-1 = no limit, otherwise >= 90)
+    CATALOG_MAX_STALENESS_SECONDS: int = int(os.getenv("CATALOG_MAX_STALENESS_SECONDS", 120))
+    CATALOG_READ_CONCERN: str = os.getenv("CATALOG_READ_CONCERN", "local")
+    # Checkout reads always go to the primary; "majority" ignores writes that could be rolled back
+    CHECKOUT_READ_CONCERN: str = os.getenv("CHECKOUT_READ_CONCERN", "majority")
+
+    # --- Cache resilience ---
+    # Deadline of one cache call; a slower Redis counts as failing
+    CACHE_TIMEOUT_MS: int = int(os.getenv("CACHE_TIMEOUT_MS", 150))
+    # After N consecutive cache failures the cache is bypassed for RESET seconds
+    CACHE_BREAKER_FAILURES: int = int(os.getenv("CACHE_BREAKER_FAILURES", 5))
+    CACHE_BREAKER_RESET: float = float(os.getenv("CACHE_BREAKER_RESET", 10))
+    # Same for MongoDB: requests are answered 503 at once while it is unreachable
+    DB_BREAKER_FAILURES: int = int(os.getenv("DB_BREAKER_FAILURES", 5))
+    DB_BREAKER_RESET: float = float(os.getenv("DB_BREAKER_RESET", 10))
+
+    # --- Response compression ---
+    # Responses smaller than this (bytes) are sent as-is
+    COMPRESSION_MINIMUM_SIZE: int = int(os.getenv("COMPRESSION_MINIMUM_SIZE", 1000))
+    # gzip level 1-9 (6 is a good speed/ratio trade-off for JSON)
+    GZIP_LEVEL: int = int(os.getenv("GZIP_LEVEL", 6))
+    # brotli quality 0-11 (4-5 is close to gzip speed with a better ratio)
+    BROTLI_QUALITY: int = int(os.getenv("BROTLI_QUALITY", 5))
+    # Max number of precompressed cache representations kept in memory
+    COMPRESSED_CACHE_SIZE: int = int(os.getenv("COMPRESSED_CACHE_SIZE", 256))
+    # Compressed representations are also shared between instances through Redis
+    COMPRESSED_CACHE_TTL: int = int(os.getenv("COMPRESSED_CACHE_TTL", 3600))
+
+    # --- Image pipeline ---
+    # Widths (px) of the responsive variants computed for every image
+    IMAGE_VARIANT_WIDTHS = [int(w) for w in os.getenv("IMAGE_VARIANT_WIDTHS", "320,640,960,1280").split(",")]
+    # Fetch image headers on write to read width/height (disable for offline dev)
+    IMAGE_PROBE_ENABLED: bool = os.getenv("IMAGE_PROBE_ENABLED", "true").lower() == "true"
+    IMAGE_PROBE_TIMEOUT: float = float(os.getenv("IMAGE_PROBE_TIMEOUT", 5))
+    # Only https URLs on exactly this host are treated (and fetched) as Cloudinary images
+    CLOUDINARY_HOST: str = os.getenv("CLOUDINARY_HOST", "res.cloudinary.com")
+    # Local stand-in for the image CDN: files under MEDIA_ROOT served at MEDIA_BASE_URL
+    MEDIA_ROOT: str = os.getenv("MEDIA_ROOT", "media")
+    MEDIA_BASE_URL: str = os.getenv("MEDIA_BASE_URL", "/media/")
+
+    # --- Batch reads ---
+    # Max read operations in one POST /batch
+    BATCH_MAX_OPERATIONS: int = int(os.getenv("BATCH_MAX_OPERATIONS", 20))
+
+    # --- Catalog snapshots ---
+    # Local stand-in for the snapshot bucket (manifest + versioned JSON shards)
+    SNAPSHOT_ROOT: str = os.getenv("SNAPSHOT_ROOT", "snapshots")
+    # Public base URL of the bucket/CDN; empty = shards are served by this API under /catalog/
+    SNAPSHOT_BASE_URL: str = os.getenv("SNAPSHOT_BASE_URL", "")
+    # Full regeneration by the worker (catches changes whose event was lost)
+    SNAPSHOT_REFRESH_INTERVAL: int = int(os.getenv("SNAPSHOT_REFRESH_INTERVAL", 600))
+    # Previous versions of a shard kept for caches still pointing at them
+    SNAPSHOT_KEEP_VERSIONS: int = int(os.getenv("SNAPSHOT_KEEP_VERSIONS", 3))
+
+    # --- Order event pipeline (Redis Streams) ---
+    ORDER_EVENTS_STREAM: str = os.getenv("ORDER_EVENTS_STREAM", "orders:events")
+    # Catalog changes fanned out by the worker (e.g. category renames into products)
+    CATALOG_EVENTS_STREAM: str = os.getenv("CATALOG_EVENTS_STREAM", "catalog:events")
+    # Approximate max length of a stream (older entries are trimmed)
+    EVENTS_STREAM_MAXLEN: int = int(os.getenv("EVENTS_STREAM_MAXLEN", 100000))
+    WORKER_GROUP: str = os.getenv("WORKER_GROUP", "order-workers")
+    WORKER_CONSUMER: str = os.getenv("WORKER_CONSUMER", os.getenv("HOSTNAME", "worker-1"))
+    WORKER_BATCH_SIZE: int = int(os.getenv("WORKER_BATCH_SIZE", 50))
+    WORKER_BLOCK_MS: int = int(os.getenv("WORKER_BLOCK_MS", 5000))
+    # A failed event is retried after this idle time, up to WORKER_MAX_DELIVERIES times
+    WORKER_RETRY_IDLE_MS: int = int(os.getenv("WORKER_RETRY_IDLE_MS", 30000))
+    WORKER_MAX_DELIVERIES: int = int(os.getenv("WORKER_MAX_DELIVERIES", 5))
+    # Orders still unprocessed after this many seconds get their event re-published
+    WORKER_SWEEP_AFTER_SECONDS: int = int(os.getenv("WORKER_SWEEP_AFTER_SECONDS", 300))
+
+    # --- Idempotent order submission ---
+    # How long a stored response can be replayed (seconds)
+    IDEMPOTENCY_TTL: int = int(os.getenv("IDEMPOTENCY_TTL", 24 * 3600))
+    # Lock lifetime of an in-flight request (released earlier on completion)
+    IDEMPOTENCY_LOCK_TTL: int = int(os.getenv("IDEMPOTENCY_LOCK_TTL", 30))
+    # How long a duplicate waits for the in-flight original (seconds)
+    IDEMPOTENCY_WAIT_TIMEOUT: float = float(os.getenv("IDEMPOTENCY_WAIT_TIMEOUT", 10))
+
+    # --- Order numbers ---
+    # Numbers reserved per counter update (the unused rest of a block is lost on restart)
+    ORDER_NUMBER_BLOCK: int = int(os.getenv("ORDER_NUMBER_BLOCK", 20))
+
+    # --- Inventory ---
+    # Unconfirmed (still pending) orders give their reserved stock back after this delay
+    RESERVATION_TTL_MINUTES: int = int(os.getenv("RESERVATION_TTL_MINUTES", 60))
+    RESERVATION_SWEEP_INTERVAL: int = int(os.getenv("RESERVATION_SWEEP_INTERVAL", 60))
+    # Hot (Redis) stock counters are written back to MongoDB every N seconds, in batches
+    STOCK_SYNC_INTERVAL: int = int(os.getenv("STOCK_SYNC_INTERVAL", 5))
+    STOCK_SYNC_BATCH: int = int(os.getenv("STOCK_SYNC_BATCH", 500))
+
+    # --- Rate limiting (per client IP and route, shared through Redis) ---
+    RATE_LIMIT_ENABLED: bool = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+    # "<requests>/<seconds>" over a sliding window
+    RATE_LIMIT_ORDERS: str = os.getenv("RATE_LIMIT_ORDERS", "10/60")
+    RATE_LIMIT_LOGIN: str = os.getenv("RATE_LIMIT_LOGIN", "10/60")
+    RATE_LIMIT_SIGNUP: str = os.getenv("RATE_LIMIT_SIGNUP", "5/3600")
+    # Number of reverse proxies in front of the app (client IP is read from X-Forwarded-For)
+    TRUSTED_PROXY_HOPS: int = int(os.getenv("TRUSTED_PROXY_HOPS", 0))
+
+    # --- Profiling (debug only, off in production) ---
+    PROFILING_ENABLED: bool = os.getenv("PROFILING_ENABLED", "false").lower() == "true"
+    # Event loop blocked longer than this is reported with the stack of the blocking code
+    PROFILING_BLOCK_THRESHOLD_MS: float = float(os.getenv("PROFILING_BLOCK_THRESHOLD_MS", 100))
+    # Requests sent with "X-Profile: <token>" are sampled every N ms (no token = request profiling off)
+    PROFILING_TOKEN: str = os.getenv("PROFILING_TOKEN", "")
+    PROFILING_SAMPLE_INTERVAL_MS: float = float(os.getenv("PROFILING_SAMPLE_INTERVAL_MS", 2))
+    # Collapsed stacks (flamegraph.pl / speedscope input) are written here; only the newest N are kept
+    PROFILING_OUTPUT_DIR: str = os.getenv("PROFILING_OUTPUT_DIR", "profiles")
+    PROFILING_MAX_FILES: int = int(os.getenv("PROFILING_MAX_FILES", 50))
+
+    # --- Load shedding (503 while the process is overloaded) ---
+    LOAD_SHEDDING_ENABLED: bool = os.getenv("LOAD_SHEDDING_ENABLED", "true").lower() == "true"
+    # Event loop lag (smoothed) above which new requests are rejected
+    SHED_MAX_LOOP_LAG_MS: float = float(os.getenv("SHED_MAX_LOOP_LAG_MS", 250))
+    # Requests waiting for a MongoDB connection above which new requests are rejected
+    SHED_MAX_DB_WAITERS: int = int(os.getenv("SHED_MAX_DB_WAITERS", 40))
+    SHED_RETRY_AFTER: int = int(os.getenv("SHED_RETRY_AFTER", 2))
 
 settings = Settings()
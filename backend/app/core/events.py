@@ -0,0 +1,173 @@
+import asyncio
+import json
+from typing import Any, Awaitable, Callable, Dict, List, NamedTuple, Optional
+from redis.exceptions import ResponseError
+from app.core.config import settings
+from app.core.redis import cache_breaker, create_blocking_client, get_redis
+
+# ----------------------------
+# --- PUBLISHING ---
+# ----------------------------
+
+async def publish_event(stream: str, event_type: str, data: Dict[str, Any]) -> Optional[str]:
+    """
+    Append an event to a Redis Stream. Returns the entry id, or None if
+    Redis is unavailable (callers must not fail the request because of it;
+    the worker's sweep re-publishes what was missed).
+    """
+    client = get_redis()
+    if client is None:
+        return None
+    try:
+        return await cache_breaker.call(
+            client.xadd, stream,
+            {"type": event_type, "data": json.dumps(data, default=str)},
+            maxlen=settings.EVENTS_STREAM_MAXLEN,
+            approximate=True,
+        )
+    except Exception as e:
+        print(f"Error publishing event {event_type}: {e!r}")
+    return None
+
+
+# ----------------------------
+# --- CONSUMING ---
+# ----------------------------
+
+class Event(NamedTuple):
+    id: str
+    type: str
+    data: Dict[str, Any]
+    deliveries: int
+
+
+# A handler receives every event of its type from one batch
+BatchHandler = Callable[[List[Event]], Awaitable[None]]
+
+
+def dead_letter_stream(stream: str) -> str:
+    return f"{stream}:dead"
+
+
+class StreamConsumer:
+    """
+    Consumer-group reader for one stream.
+
+    - New events are read in batches with XREADGROUP and dispatched by type
+    - A batch is acknowledged only after its handlers succeed
+    - Failed events stay pending and are re-claimed (XAUTOCLAIM) after
+      WORKER_RETRY_IDLE_MS; after WORKER_MAX_DELIVERIES attempts they are
+      moved to the `<stream>:dead` stream
+
+    Delivery is at-least-once: handlers must tolerate seeing an event twice.
+    """
+
+    def __init__(self, stream: str, group: str, consumer: str):
+        self.stream = stream
+        self.group = group
+        self.consumer = consumer
+        self.handlers: Dict[str, List[BatchHandler]] = {}
+        # Client for the blocking read, opened by run() (the shared one otherwise)
+        self.reader = None
+
+    def register(self, event_type: str, handler: BatchHandler):
+        self.handlers.setdefault(event_type, []).append(handler)
+
+    async def ensure_group(self):
+        try:
+            await get_redis().xgroup_create(self.stream, self.group, id="0", mkstream=True)
+        except ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+    def _parse(self, entries, deliveries: Dict[str, int]) -> List[Event]:
+        events = []
+        for entry_id, fields in entries:
+            if not fields:
+                continue  # entry trimmed from the stream while pending
+            events.append(Event(
+                id=entry_id,
+                type=fields.get("type", ""),
+                data=json.loads(fields.get("data") or "{}"),
+                deliveries=deliveries.get(entry_id, 1),
+            ))
+        return events
+
+    async def _claim_retries(self) -> List[Event]:
+        """Take over events whose previous attempt failed (or whose consumer died)."""
+        client = get_redis()
+        result = await client.xautoclaim(
+            self.stream, self.group, self.consumer,
+            min_idle_time=settings.WORKER_RETRY_IDLE_MS,
+            start_id="0-0",
+            count=settings.WORKER_BATCH_SIZE,
+        )
+        entries = result[1] if result else []
+        if not entries:
+            return []
+        pending = await client.xpending_range(
+            self.stream, self.group,
+            min=entries[0][0], max=entries[-1][0], count=len(entries),
+        )
+        deliveries = {p["message_id"]: p["times_delivered"] for p in pending}
+        return self._parse(entries, deliveries)
+
+    async def read_batch(self) -> List[Event]:
+        retries = await self._claim_retries()
+        if retries:
+            return retries
+        response = await (self.reader or get_redis()).xreadgroup(
+            self.group, self.consumer, {self.stream: ">"},
+            count=settings.WORKER_BATCH_SIZE,
+            block=settings.WORKER_BLOCK_MS,
+        )
+        if not response:
+            return []
+        return self._parse(response[0][1], {})
+
+    async def _dead_letter(self, events: List[Event], error: Exception):
+        client = get_redis()
+        for event in events:
+            await client.xadd(dead_letter_stream(self.stream), {
+                "type": event.type,
+                "data": json.dumps(event.data, default=str),
+                "source_id": event.id,
+                "error": repr(error),
+            })
+        await client.xack(self.stream, self.group, *[e.id for e in events])
+
+    async def process(self, events: List[Event]):
+        by_type: Dict[str, List[Event]] = {}
+        for event in events:
+            by_type.setdefault(event.type, []).append(event)
+
+        client = get_redis()
+        for event_type, batch in by_type.items():
+            try:
+                for handler in self.handlers.get(event_type, []):
+                    await handler(batch)
+            except Exception as e:
+                print(f"--> Handler failed for {len(batch)} '{event_type}' event(s): {e!r}")
+                exhausted = [ev for ev in batch if ev.deliveries >= settings.WORKER_MAX_DELIVERIES]
+                if exhausted:
+                    await self._dead_letter(exhausted, e)
+                # The others stay pending and are retried after WORKER_RETRY_IDLE_MS
+                continue
+            await client.xack(self.stream, self.group, *[ev.id for ev in batch])
+
+    async def run(self, stop: asyncio.Event):
+        await self.ensure_group()
+        self.reader = create_blocking_client(settings.WORKER_BLOCK_MS)
+        try:
+            while not stop.is_set():
+                try:
+                    events = await self.read_batch()
+                    if events:
+                        await self.process(events)
+                except Exception as e:
+                    # Redis hiccup: back off and keep going
+                    print(f"--> Error consuming {self.stream}: {e!r}")
+                    await asyncio.sleep(1)
+        finally:
+            reader, self.reader = self.reader, None
+            await reader.aclose()
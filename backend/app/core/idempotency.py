@@ -0,0 +1,126 @@
+import asyncio
+import hashlib
+import json
+import time
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+from fastapi import HTTPException
+from app.core.config import settings
+from app.core.redis import cache_breaker, get_redis
+
+IN_FLIGHT = "in_flight"
+DONE = "done"
+MAX_KEY_LENGTH = 255
+
+
+class StoredResponse(NamedTuple):
+    status_code: int
+    body: Any
+
+
+def fingerprint(payload: str) -> str:
+    """Hash of the request body: a key may only be replayed with the same body."""
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _redis_key(scope: str, key: str) -> str:
+    return f"idem:{scope}:{key}"
+
+
+# Waiters inside this process share the leader's result instead of polling Redis:
+# redis key -> (request fingerprint, future of the stored response)
+_local_waiters: Dict[str, Tuple[str, "asyncio.Future[StoredResponse]"]] = {}
+
+
+async def begin(scope: str, key: str, request_fingerprint: str) -> Optional[StoredResponse]:
+    """
+    Claim an idempotency key before doing the work.
+
+    Returns None when the caller owns the key and must process the request
+    (then call `complete` or `abort`). Returns the stored response when the
+    key was already used, waiting for an in-flight duplicate to finish first.
+    Without Redis the request is simply processed.
+    """
+    if len(key) > MAX_KEY_LENGTH:
+        raise HTTPException(status_code=400, detail="Idempotency-Key is too long.")
+
+    client = get_redis()
+    if client is None:
+        return None
+
+    redis_key = _redis_key(scope, key)
+    marker = json.dumps({"state": IN_FLIGHT, "fingerprint": request_fingerprint})
+    try:
+        claimed = await cache_breaker.call(client.set, redis_key, marker, nx=True, ex=settings.IDEMPOTENCY_LOCK_TTL)
+    except Exception as e:
+        print(f"Error claiming idempotency key: {e}")
+        return None
+    if claimed:
+        _local_waiters[redis_key] = (request_fingerprint, asyncio.get_running_loop().create_future())
+        return None
+
+    # Duplicate of a request handled by this process: await its result directly
+    if redis_key in _local_waiters:
+        leader_fingerprint, local = _local_waiters[redis_key]
+        if leader_fingerprint != request_fingerprint:
+            raise HTTPException(status_code=422, detail="Idempotency-Key was already used with a different request body.")
+        try:
+            return await asyncio.wait_for(asyncio.shield(local), settings.IDEMPOTENCY_WAIT_TIMEOUT)
+        except asyncio.TimeoutError:
+            raise HTTPException(status_code=409, detail="A request with this Idempotency-Key is still in progress.")
+        except asyncio.CancelledError:
+            if not local.cancelled():
+                raise  # this request itself was cancelled
+            raise HTTPException(status_code=409, detail="The original request with this Idempotency-Key failed, retry.")
+
+    # Otherwise poll Redis until the other instance stores the response
+    deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT_TIMEOUT
+    while True:
+        try:
+            raw = await cache_breaker.call(client.get, redis_key)
+        except Exception as e:
+            # The original may have completed: processing again could duplicate it
+            print(f"Error polling idempotency key: {e!r}")
+            raise HTTPException(status_code=409, detail="A request with this Idempotency-Key is still in progress.")
+        if raw is None:
+            # The original request failed and released the key
+            raise HTTPException(status_code=409, detail="The original request with this Idempotency-Key failed, retry.")
+        record = json.loads(raw)
+        if record.get("fingerprint") != request_fingerprint:
+            raise HTTPException(status_code=422, detail="Idempotency-Key was already used with a different request body.")
+        if record["state"] == DONE:
+            return StoredResponse(record["status_code"], record["body"])
+        if time.monotonic() >= deadline:
+            raise HTTPException(status_code=409, detail="A request with this Idempotency-Key is still in progress.")
+        await asyncio.sleep(0.05)
+
+
+async def complete(scope: str, key: str, request_fingerprint: str, status_code: int, body: Any):
+    """Store the response so replays of the key get it back."""
+    redis_key = _redis_key(scope, key)
+    stored = StoredResponse(status_code, body)
+    client = get_redis()
+    if client is not None:
+        record = {"state": DONE, "fingerprint": request_fingerprint, "status_code": status_code, "body": body}
+        try:
+            await cache_breaker.call(client.set, redis_key, json.dumps(record, default=str), ex=settings.IDEMPOTENCY_TTL)
+        except Exception as e:
+            print(f"Error storing idempotent response: {e}")
+
+    _, local = _local_waiters.pop(redis_key, (None, None))
+    if local is not None and not local.done():
+        local.set_result(stored)
+
+
+async def abort(scope: str, key: str):
+    """Release the key after a failure so the client can retry."""
+    redis_key = _redis_key(scope, key)
+    client = get_redis()
+    if client is not None:
+        try:
+            await cache_breaker.call(client.delete, redis_key)
+        except Exception as e:
+            print(f"Error releasing idempotency key: {e}")
+
+    _, local = _local_waiters.pop(redis_key, (None, None))
+    if local is not None and not local.done():
+        local.cancel()
@@ -0,0 +1,254 @@
+import asyncio
+import base64
+import os
+import struct
+import urllib.request
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlparse, urlunparse
+from app.core.config import settings
+from app.models import ImageAsset, ImageVariant
+
+# --------------------------
+# --- DIMENSION PROBING ---
+# --------------------------
+
+def read_image_size(head: bytes) -> Optional[Tuple[int, int]]:
+    """
+    Read (width, height) from the first bytes of a PNG, GIF, JPEG or WebP file.
+    Only the header is parsed, so a few KB of the file are enough.
+    """
+    if head.startswith(b"\x89PNG\r\n\x1a\n") and len(head) >= 24:
+        return struct.unpack(">II", head[16:24])
+
+    if head[:6] in (b"GIF87a", b"GIF89a") and len(head) >= 10:
+        return struct.unpack("<HH", head[6:10])
+
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP" and len(head) >= 30:
+        chunk = head[12:16]
+        if chunk == b"VP8 ":
+            w, h = struct.unpack("<HH", head[26:30])
+            return w & 0x3FFF, h & 0x3FFF
+        if chunk == b"VP8L":
+            b = head[21:25]
+            w = 1 + (((b[1] & 0x3F) << 8) | b[0])
+            h = 1 + (((b[3] & 0xF) << 10) | (b[2] << 2) | ((b[1] & 0xC0) >> 6))
+            return w, h
+        if chunk == b"VP8X":
+            w = 1 + int.from_bytes(head[24:27], "little")
+            h = 1 + int.from_bytes(head[27:30], "little")
+            return w, h
+        return None
+
+    if head[:2] == b"\xff\xd8":
+        # Walk JPEG segments until a start-of-frame marker
+        i = 2
+        while i + 9 < len(head):
+            if head[i] != 0xFF:
+                i += 1
+                continue
+            marker = head[i + 1]
+            if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:
+                i += 2
+                continue
+            length = struct.unpack(">H", head[i + 2:i + 4])[0]
+            if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+                h, w = struct.unpack(">HH", head[i + 5:i + 9])
+                return w, h
+            i += 2 + length
+    return None
+
+
+# HTTPS only: no file://, ftp:// or plain http handlers, and redirects are
+# not followed, so a fetch cannot be steered to local files or internal hosts
+_https_opener = urllib.request.OpenerDirector()
+for _handler in (urllib.request.HTTPSHandler(), urllib.request.HTTPDefaultErrorHandler(), urllib.request.HTTPErrorProcessor()):
+    _https_opener.add_handler(_handler)
+
+
+def _fetch_head(url: str, limit: int) -> bytes:
+    """Download the first `limit` bytes of a remote file over HTTPS (blocking)."""
+    if urlparse(url).scheme != "https":
+        raise ValueError(f"Refusing to fetch non-https URL: {url}")
+    request = urllib.request.Request(url, headers={"Range": f"bytes=0-{limit - 1}"})
+    with _https_opener.open(request, timeout=settings.IMAGE_PROBE_TIMEOUT) as response:
+        if response.status >= 300:
+            raise ValueError(f"Unexpected status {response.status}")
+        return response.read(limit)
+
+
+async def fetch_head(url: str, limit: int = 64 * 1024) -> Optional[bytes]:
+    """Non-blocking wrapper: the download runs in a worker thread."""
+    if not settings.IMAGE_PROBE_ENABLED:
+        return None
+    try:
+        return await asyncio.to_thread(_fetch_head, url, limit)
+    except Exception as e:
+        print(f"Error probing image {url}: {e}")
+        return None
+
+
+def svg_placeholder(width: Optional[int], height: Optional[int]) -> str:
+    """Neutral placeholder keeping the aspect ratio, as an inline data URL."""
+    w, h = width or 16, height or 9
+    svg = f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {w} {h}"><rect width="100%" height="100%" fill="#2a2a2a"/></svg>'
+    return "data:image/svg+xml;base64," + base64.b64encode(svg.encode()).decode()
+
+
+# --------------------------
+# --- TRANSFORMERS ---
+# --------------------------
+
+class ImageTransformer(ABC):
+    """
+    Builds the responsive record of an image URL.
+    Subclasses decide which URLs they handle, how variant URLs are written
+    and how dimensions / blur placeholders are obtained.
+    """
+
+    @abstractmethod
+    def handles(self, url: str) -> bool:
+        ...
+
+    @abstractmethod
+    def variant_url(self, url: str, width: int) -> Optional[str]:
+        """URL of the image resized to `width`, None if the host cannot resize it."""
+
+    async def probe(self, url: str) -> Tuple[Optional[int], Optional[int]]:
+        return None, None
+
+    async def blur_placeholder(self, url: str, width: Optional[int], height: Optional[int]) -> Optional[str]:
+        return svg_placeholder(width, height)
+
+    async def describe(self, url: str) -> ImageAsset:
+        width, height = await self.probe(url)
+        # Never upscale: drop variants wider than the original when it is known
+        widths = [w for w in settings.IMAGE_VARIANT_WIDTHS if width is None or w <= width]
+        if width is not None and (not widths or widths[-1] < width):
+            widths.append(width)
+        resized = {w: self.variant_url(url, w) for w in widths}
+        variants = [ImageVariant(width=w, url=u) for w, u in resized.items() if u is not None]
+        return ImageAsset(
+            url=url,
+            width=width,
+            height=height,
+            blur_data_url=await self.blur_placeholder(url, width, height),
+            variants=variants,
+            srcset=", ".join(f"{v.url} {v.width}w" for v in variants),
+        )
+
+
+class CloudinaryTransformer(ImageTransformer):
+    """URLs hosted on Cloudinary: variants are delivery-URL transformations."""
+
+    def handles(self, url: str) -> bool:
+        # Parsed, not substring-matched: these URLs are fetched server-side
+        try:
+            parsed = urlparse(url)
+            port = parsed.port
+        except ValueError:
+            return False
+        return (
+            parsed.scheme == "https"
+            and parsed.hostname == settings.CLOUDINARY_HOST
+            and parsed.username is None
+            and port is None
+            and "/upload/" in parsed.path
+        )
+
+    def _transform(self, url: str, transformation: str) -> str:
+        parsed = urlparse(url)
+        head, tail = parsed.path.split("/upload/", 1)
+        return urlunparse(parsed._replace(path=f"{head}/upload/{transformation}/{tail}"))
+
+    def variant_url(self, url: str, width: int) -> str:
+        return self._transform(url, f"w_{width},c_limit,f_auto,q_auto")
+
+    async def probe(self, url: str) -> Tuple[Optional[int], Optional[int]]:
+        head = await fetch_head(url)
+        size = read_image_size(head) if head else None
+        return size if size else (None, None)
+
+    async def blur_placeholder(self, url: str, width: Optional[int], height: Optional[int]) -> Optional[str]:
+        # A 16px blurred rendition is a few hundred bytes: inline it
+        tiny = await fetch_head(self._transform(url, "w_16,e_blur:1000,q_30,f_jpg"))
+        # Only embed what is really a JPEG image
+        if not tiny or not tiny.startswith(b"\xff\xd8") or read_image_size(tiny) is None:
+            return svg_placeholder(width, height)
+        return "data:image/jpeg;base64," + base64.b64encode(tiny).decode()
+
+
+class LocalTransformer(ImageTransformer):
+    """
+    Fallback for URLs no image CDN serves (files under MEDIA_ROOT, other
+    hosts). Nothing resizes them, so they get no variants and no srcset:
+    a srcset would label the full-size file with smaller widths. Dimensions
+    are read from files under MEDIA_ROOT when the URL points there.
+    """
+
+    def handles(self, url: str) -> bool:
+        return True
+
+    def variant_url(self, url: str, width: int) -> Optional[str]:
+        return None
+
+    def _local_path(self, url: str) -> Optional[str]:
+        if url.startswith(settings.MEDIA_BASE_URL):
+            relative = url[len(settings.MEDIA_BASE_URL):].split("?", 1)[0].lstrip("/")
+            path = os.path.normpath(os.path.join(settings.MEDIA_ROOT, relative))
+            if path.startswith(os.path.normpath(settings.MEDIA_ROOT) + os.sep):
+                return path
+        return None
+
+    @staticmethod
+    def _read_size(path: str) -> Optional[Tuple[int, int]]:
+        """Blocking file read: run in a worker thread."""
+        if not os.path.isfile(path):
+            return None
+        with open(path, "rb") as f:
+            return read_image_size(f.read(64 * 1024))
+
+    async def probe(self, url: str) -> Tuple[Optional[int], Optional[int]]:
+        path = self._local_path(url)
+        if path is None:
+            return None, None
+        size = await asyncio.to_thread(self._read_size, path)
+        return size if size else (None, None)
+
+
+# Checked in order; the local stand-in accepts anything and must stay last
+transformers: List[ImageTransformer] = [CloudinaryTransformer(), LocalTransformer()]
+
+
+def register_transformer(transformer: ImageTransformer):
+    """Plug in a transformer for another image host (takes precedence)."""
+    transformers.insert(0, transformer)
+
+
+def get_transformer(url: str) -> ImageTransformer:
+    return next(t for t in transformers if t.handles(url))
+
+
+async def existing_image_assets(model, doc_id) -> List[ImageAsset]:
+    """Read only the stored image records of a document (for reuse on update)."""
+    doc = await model.get_pymongo_collection().find_one({"_id": doc_id}, {"image_assets": 1})
+    return [ImageAsset(**a) for a in (doc or {}).get("image_assets", [])]
+
+
+def _current(asset: ImageAsset) -> bool:
+    transformer = get_transformer(asset.url)
+    return all(transformer.variant_url(asset.url, v.width) == v.url for v in asset.variants)
+
+
+async def build_image_assets(urls: List[str], existing: Optional[List[ImageAsset]] = None) -> List[ImageAsset]:
+    """
+    Compute the image records for `urls`, in the same order.
+    Records already computed for an unchanged URL are reused while their
+    variants are still the ones its transformer writes; the others are
+    described concurrently.
+    """
+    known: Dict[str, ImageAsset] = {a.url: a for a in (existing or []) if _current(a)}
+    missing = [u for u in dict.fromkeys(urls) if u not in known]
+    described = await asyncio.gather(*(get_transformer(u).describe(u) for u in missing))
+    known.update(zip(missing, described))
+    return [known[u] for u in urls]
@@ -0,0 +1,452 @@
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from beanie import PydanticObjectId
+from beanie.odm.operators.update.general import Set
+from fastapi import HTTPException
+from pymongo import ReturnDocument, UpdateOne
+from app.core.config import settings
+from app.core.redis import get_redis_store
+from app.models import (
+    Order, OrderItem, Product, ProductOptionGroup, ProductType,
+    ReservationStatus, StockLine, StockReservation, VariantStock,
+)
+
+# ----------------------------
+# --- KEYS ---
+# ----------------------------
+
+def variant_key(options: Dict[str, str]) -> str:
+    """Canonical key of an option combination: 'group=label' pairs sorted by group."""
+    return "|".join(f"{name}={label}" for name, label in sorted(options.items()))
+
+
+def parse_variant_key(key: str) -> Dict[str, str]:
+    """'Kích thước=Nhỏ|Màu sắc=Hồng' -> {'Kích thước': 'Nhỏ', 'Màu sắc': 'Hồng'} (400 if malformed)."""
+    options: Dict[str, str] = {}
+    for pair in key.split("|"):
+        name, sep, label = pair.partition("=")
+        name, label = name.strip(), label.strip()
+        if not sep or not name or not label or name in options:
+            raise HTTPException(status_code=400, detail=f"Invalid variant key: {key}")
+        options[name] = label
+    return options
+
+
+def normalize_variant_stock(variant_stock: Iterable[Any], options: Iterable[Any]) -> List[VariantStock]:
+    """
+    Validate the stock entries of a product against its option groups and
+    rewrite their keys canonically. Every key must pick one existing choice
+    in every group, so checkout can always match the chosen combination.
+    """
+    groups = {g.name: {c.label for c in g.choices} for g in map(ProductOptionGroup.model_validate, options)}
+    normalized: Dict[str, VariantStock] = {}
+    for entry in map(VariantStock.model_validate, variant_stock):
+        chosen = parse_variant_key(entry.key)
+        if chosen.keys() != groups.keys():
+            raise HTTPException(status_code=400, detail=f"Variant '{entry.key}' must choose exactly one option of each group: {sorted(groups)}")
+        for name, label in chosen.items():
+            if label not in groups[name]:
+                raise HTTPException(status_code=400, detail=f"Variant '{entry.key}': no choice '{label}' in '{name}'")
+        key = variant_key(chosen)
+        if key in normalized:
+            raise HTTPException(status_code=400, detail=f"Duplicate variant: {key}")
+        normalized[key] = VariantStock(key=key, stock=entry.stock)
+    return list(normalized.values())
+
+
+def counter_key(product_id: str, key: str) -> str:
+    return f"stock:{product_id}:{key}"
+
+
+# Redis set of counters changed since the last sync to MongoDB
+DIRTY_COUNTERS = "stock:dirty"
+
+
+def _variant(product: Product, key: str):
+    return next((v for v in product.variant_stock if v.key == key), None)
+
+
+def stock_lines(items: List[OrderItem], products: Dict[str, Product]) -> List[StockLine]:
+    """
+    Stock lines for the tracked items of an order (quantities merged per
+    product/variant). Custom (made-to-order) products and products without
+    a stock figure are not tracked. Products with per-variant stock need a
+    complete option combination (400 otherwise); a combination without a
+    stock entry is not for sale (409).
+    """
+    merged: Dict[Tuple[str, str], StockLine] = {}
+    for item in items:
+        product = products[item.product_id]
+        if product.type != ProductType.READY:
+            continue
+        if product.variant_stock:
+            groups = sorted(g.name for g in product.options)
+            if sorted(item.options) != groups:
+                raise HTTPException(status_code=400, detail=f"Choose one option of each group for {product.name}: {groups}")
+            key = variant_key(item.options)
+            if _variant(product, key) is None:
+                raise HTTPException(status_code=409, detail=f"Out of stock: {product.name} ({key})")
+        elif product.stock is None:
+            continue
+        else:
+            key = ""  # tracked on the product as a whole
+        line = merged.setdefault((item.product_id, key), StockLine(
+            product_id=item.product_id, variant_key=key, quantity=0, hot=product.hot_stock,
+        ))
+        line.quantity += item.quantity
+    return list(merged.values())
+
+
+def _current_stock(product: Product, key: str) -> int:
+    if key:
+        return _variant(product, key).stock
+    return product.stock
+
+
+def _out_of_stock(line: StockLine, products: Dict[str, Product]) -> HTTPException:
+    name = products[line.product_id].name
+    suffix = f" ({line.variant_key})" if line.variant_key else ""
+    return HTTPException(status_code=409, detail=f"Out of stock: {name}{suffix}")
+
+
+# ----------------------------
+# --- MONGODB PATH ---
+# ----------------------------
+
+def _decrement(line: StockLine) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """Filter/update taking a line's quantity, matching only if enough is left."""
+    oid = PydanticObjectId(line.product_id)
+    if line.variant_key:
+        return (
+            {"_id": oid, "variant_stock": {"$elemMatch": {"key": line.variant_key, "stock": {"$gte": line.quantity}}}},
+            {"$inc": {"variant_stock.$.stock": -line.quantity}},
+        )
+    return {"_id": oid, "stock": {"$gte": line.quantity}}, {"$inc": {"stock": -line.quantity}}
+
+
+def _increment_op(line: StockLine) -> UpdateOne:
+    oid = PydanticObjectId(line.product_id)
+    if line.variant_key:
+        return UpdateOne(
+            {"_id": oid, "variant_stock.key": line.variant_key},
+            {"$inc": {"variant_stock.$.stock": line.quantity}},
+        )
+    return UpdateOne({"_id": oid}, {"$inc": {"stock": line.quantity}})
+
+
+async def _reserve_in_mongo(lines: List[StockLine], products: Dict[str, Product]):
+    """
+    Conditional decrement of each line (all or nothing): at the first line
+    that does not match, the lines already taken are given back.
+    """
+    collection = Product.get_pymongo_collection()
+    applied: List[StockLine] = []
+    try:
+        for line in lines:
+            result = await collection.update_one(*_decrement(line))
+            if result.modified_count == 0:
+                # Not enough left, or the product was deleted meanwhile
+                if await collection.count_documents({"_id": PydanticObjectId(line.product_id)}, limit=1) == 0:
+                    raise HTTPException(status_code=404, detail="Product not found.")
+                raise _out_of_stock(line, products)
+            applied.append(line)
+    except BaseException:
+        await _release_in_mongo(applied)
+        raise
+
+
+async def _release_in_mongo(lines: List[StockLine]):
+    if lines:
+        await Product.get_pymongo_collection().bulk_write([_increment_op(l) for l in lines], ordered=False)
+
+
+# ----------------------------
+# --- REDIS (HOT COUNTER) PATH ---
+# ----------------------------
+
+# KEYS: counters, then the dirty set. ARGV: quantity, initial value (pairs).
+# Missing counters are seeded from MongoDB's value; then either every counter
+# has enough stock and all are decremented, or nothing changes and the
+# 1-based index of the first short line is returned.
+RESERVE_SCRIPT = """
+local n = #KEYS - 1
+for i = 1, n do
+    redis.call('SET', KEYS[i], ARGV[2 * i], 'NX')
+end
+for i = 1, n do
+    if tonumber(redis.call('GET', KEYS[i])) < tonumber(ARGV[2 * i - 1]) then
+        return i
+    end
+end
+for i = 1, n do
+    redis.call('DECRBY', KEYS[i], ARGV[2 * i - 1])
+    redis.call('SADD', KEYS[n + 1], KEYS[i])
+end
+return 0
+"""
+
+# Counters that no longer exist (dropped after an admin edit, Redis restart)
+# are left alone; their 1-based indexes are returned so the caller gives
+# that stock back in MongoDB instead.
+RELEASE_SCRIPT = """
+local n = #KEYS - 1
+local missing = {}
+for i = 1, n do
+    if redis.call('EXISTS', KEYS[i]) == 1 then
+        redis.call('INCRBY', KEYS[i], ARGV[i])
+        redis.call('SADD', KEYS[n + 1], KEYS[i])
+    else
+        table.insert(missing, i)
+    end
+end
+return missing
+"""
+
+
+async def _reserve_in_redis(lines: List[StockLine], products: Dict[str, Product]):
+    if not lines:
+        return
+    client = get_redis_store()
+    if client is None:
+        raise HTTPException(status_code=503, detail="Stock service unavailable, please retry.")
+    keys = [counter_key(l.product_id, l.variant_key) for l in lines] + [DIRTY_COUNTERS]
+    args = []
+    for line in lines:
+        args += [line.quantity, _current_stock(products[line.product_id], line.variant_key)]
+    short = await client.eval(RESERVE_SCRIPT, len(keys), *keys, *args)
+    if short:
+        raise _out_of_stock(lines[int(short) - 1], products)
+
+
+async def _release_in_redis(lines: List[StockLine]):
+    if not lines:
+        return
+    client = get_redis_store()
+    if client is None:
+        # The counters hold the live stock: giving it back in MongoDB would be
+        # overwritten by the next sync, so the caller has to retry later
+        raise HTTPException(status_code=503, detail="Stock service unavailable, please retry.")
+    keys = [counter_key(l.product_id, l.variant_key) for l in lines] + [DIRTY_COUNTERS]
+    missing = await client.eval(RELEASE_SCRIPT, len(keys), *keys, *[l.quantity for l in lines])
+    await _release_in_mongo([lines[int(i) - 1] for i in missing or []])
+
+
+# ----------------------------
+# --- PUBLIC API ---
+# ----------------------------
+
+async def _take(lines: List[StockLine], products: Dict[str, Product]):
+    hot = [l for l in lines if l.hot]
+    cold = [l for l in lines if not l.hot]
+    await _reserve_in_redis(hot, products)
+    try:
+        await _reserve_in_mongo(cold, products)
+    except BaseException:
+        await _release_in_redis(hot)
+        raise
+
+
+async def reserve(items: List[OrderItem], products: Dict[str, Product]) -> Optional[StockReservation]:
+    """
+    Atomically take stock for an order. Raises 409 if any line is short,
+    in which case nothing stays reserved.
+    """
+    lines = stock_lines(items, products)
+    if not lines:
+        return None
+
+    await _take(lines, products)
+    return StockReservation(
+        lines=lines,
+        expires_at=datetime.utcnow() + timedelta(minutes=settings.RESERVATION_TTL_MINUTES),
+    )
+
+
+async def release(reservation: StockReservation):
+    """Give the stock of a reservation back."""
+    await _release_in_redis([l for l in reservation.lines if l.hot])
+    await _release_in_mongo([l for l in reservation.lines if not l.hot])
+
+
+async def finish_reservation(
+    order_id: PydanticObjectId,
+    status: ReservationStatus,
+    current: Tuple[ReservationStatus, ...] = (ReservationStatus.ACTIVE,),
+) -> bool:
+    """
+    Move a reservation in one of the `current` states to `status` (committed /
+    released / expired) and give the stock back unless it is committed. The
+    status flip is a conditional update, so stock is returned at most once.
+    """
+    doc = await Order.get_pymongo_collection().find_one_and_update(
+        {"_id": order_id, "reservation.status": {"$in": [c.value for c in current]}},
+        {"$set": {"reservation.status": status.value}},
+        projection={"reservation": 1},
+        return_document=ReturnDocument.BEFORE,
+    )
+    if doc is None:
+        return False
+    if status != ReservationStatus.COMMITTED:
+        try:
+            await release(StockReservation(**doc["reservation"]))
+        except BaseException:
+            # Not given back (Redis down): restore the state so a retry releases it
+            await Order.get_pymongo_collection().update_one(
+                {"_id": order_id, "reservation.status": status.value},
+                {"$set": {"reservation.status": doc["reservation"]["status"]}},
+            )
+            raise
+    return True
+
+
+async def reclaim_expired(order_id: PydanticObjectId) -> bool:
+    """
+    Take the stock of an expired reservation again and commit it (an order
+    confirmed after its hold ran out). 409 if the stock is no longer there.
+    The status is flipped first, so concurrent confirmations take it once.
+    """
+    collection = Order.get_pymongo_collection()
+    doc = await collection.find_one_and_update(
+        {"_id": order_id, "reservation.status": ReservationStatus.EXPIRED.value},
+        {"$set": {"reservation.status": ReservationStatus.COMMITTED.value}},
+        projection={"reservation": 1},
+        return_document=ReturnDocument.BEFORE,
+    )
+    if doc is None:
+        return False
+
+    reservation = StockReservation(**doc["reservation"])
+    try:
+        ids = list({PydanticObjectId(l.product_id) for l in reservation.lines})
+        products = {str(p.id): p for p in await Product.find({"_id": {"$in": ids}}).to_list()}
+        missing = next((l for l in reservation.lines if l.product_id not in products), None)
+        if missing is not None:
+            raise HTTPException(status_code=409, detail=f"Product no longer available: {missing.product_id}")
+        await _take(reservation.lines, products)
+    except BaseException:
+        await collection.update_one(
+            {"_id": order_id, "reservation.status": ReservationStatus.COMMITTED.value},
+            {"$set": {"reservation.status": ReservationStatus.EXPIRED.value}},
+        )
+        raise
+    return True
+
+
+async def expire_reservations(limit: int = 500) -> int:
+    """Release reservations of orders still pending after RESERVATION_TTL_MINUTES."""
+    orders = await Order.find({
+        "status": "pending",
+        "reservation.status": ReservationStatus.ACTIVE.value,
+        "reservation.expires_at": {"$lt": datetime.utcnow()},
+    }).limit(limit).to_list()
+    expired = 0
+    for order in orders:
+        if await finish_reservation(order.id, ReservationStatus.EXPIRED):
+            expired += 1
+    return expired
+
+
+# KEYS: counters, then the dirty set. ARGV: the value each counter had when it
+# was synced ('' if it was gone). A counter changed since (by an order, or
+# re-seeded) stays dirty for the next round.
+CLEAN_SCRIPT = """
+local n = #KEYS - 1
+for i = 1, n do
+    if (redis.call('GET', KEYS[i]) or '') == ARGV[i] then
+        redis.call('SREM', KEYS[n + 1], KEYS[i])
+    end
+end
+return 0
+"""
+
+
+async def _revisions(product_ids: Iterable[str]) -> Dict[str, Any]:
+    cursor = Product.get_pymongo_collection().find(
+        {"_id": {"$in": [PydanticObjectId(i) for i in set(product_ids)]}}, {"revision": 1},
+    )
+    return {str(doc["_id"]): doc.get("revision") async for doc in cursor}
+
+
+async def sync_hot_counters() -> int:
+    """
+    Write changed Redis counters back to MongoDB in batches, so the stored
+    stock stays close to the live value (and seeds the counter after a Redis
+    restart).
+
+    Counters leave the dirty set only once their value is written (and only
+    if no order changed them since). Each write
+    only applies if the product's revision is still the one read before the
+    counters: an admin edit that lands in between (and drops the counters)
+    keeps its stock instead of being overwritten by the older live value.
+    """
+    client = get_redis_store()
+    if client is None:
+        return 0
+    keys = await client.srandmember(DIRTY_COUNTERS, settings.STOCK_SYNC_BATCH)
+    if not keys:
+        return 0
+    owner = {key: key.split(":", 2)[1] for key in keys}
+    revisions = await _revisions(owner.values())
+    values = await client.mget(keys)
+
+    done, written, ops = [], [], []
+    for key, value in zip(keys, values):
+        product_id, variant = owner[key], key.split(":", 2)[2]
+        if value is None or product_id not in revisions:
+            done.append(key)  # counter dropped or product deleted: nothing to write
+            continue
+        query = {"_id": PydanticObjectId(product_id), "revision": revisions[product_id]}
+        if variant:
+            query["variant_stock.key"] = variant
+            ops.append(UpdateOne(query, {"$set": {"variant_stock.$.stock": int(value)}}))
+        else:
+            ops.append(UpdateOne(query, {"$set": {"stock": int(value)}}))
+        written.append(key)
+    if ops:
+        result = await Product.get_pymongo_collection().bulk_write(ops, ordered=False)
+        if result.matched_count < len(ops):
+            # Products edited meanwhile stay dirty and are read again next round
+            current = await _revisions(owner[k] for k in written)
+            written = [k for k in written if current.get(owner[k], revisions[owner[k]]) == revisions[owner[k]]]
+        done += written
+    if done:
+        read = dict(zip(keys, values))
+        await client.eval(CLEAN_SCRIPT, len(done) + 1, *done, DIRTY_COUNTERS, *[read[k] or "" for k in done])
+    return len(ops)
+
+
+def _product_counters(product: Product) -> List[str]:
+    product_id = str(product.id)
+    return [counter_key(product_id, "")] + [counter_key(product_id, v.key) for v in product.variant_stock]
+
+
+async def flush_hot_counters(product: Product):
+    """Write a product's live Redis counters to MongoDB now."""
+    client = get_redis_store()
+    if client is None:
+        return
+    values = await client.mget(_product_counters(product))
+    changes = {}
+    if values[0] is not None:
+        changes["stock"] = int(values[0])
+    if any(v is not None for v in values[1:]):
+        variants = [v.model_dump() for v in product.variant_stock]
+        for variant, value in zip(variants, values[1:]):
+            if value is not None:
+                variant["stock"] = int(value)
+        changes["variant_stock"] = variants
+    if changes:
+        await Product.find_one(Product.id == product.id).update(Set(changes))
+
+
+async def drop_hot_counters(*products: Product):
+    """
+    Delete the Redis counters of products (after an admin edit of their stock
+    or of the hot flag): they are re-seeded from MongoDB on the next order.
+    """
+    client = get_redis_store()
+    if client is None:
+        return
+    keys = list({k for p in products for k in _product_counters(p)})
+    await client.delete(*keys)
+    await client.srem(DIRTY_COUNTERS, *keys)
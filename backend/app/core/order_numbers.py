@@ -0,0 +1,79 @@
+import asyncio
+from typing import Optional
+from pymongo import ReturnDocument
+from app.core.config import settings
+from app.models import Order
+
+# ----------------------------
+# --- ORDER NUMBERS ---
+# ----------------------------
+
+# Short numbers staff can read over the phone ("đơn số 1042") instead of ObjectIds.
+# One counter document holds the last number handed out. Each process takes
+# a block of ORDER_NUMBER_BLOCK numbers per $inc, so checkouts hit the counter
+# once per block instead of once per order. Numbers are unique and increasing
+# per process; across processes they interleave, and the rest of a block is
+# skipped when a process restarts (gaps are fine, duplicates are not).
+COUNTER_ID = "order_number"
+# Marker in the counters collection: set once every older order has a number
+BACKFILL_MARKER_ID = "order_number_backfill"
+
+
+def _counters():
+    return Order.get_pymongo_collection().database["counters"]
+
+
+class OrderNumberAllocator:
+    def __init__(self, block_size: int):
+        self.block_size = block_size
+        self._next = 0
+        self._end = 0  # exclusive
+        self._lock = asyncio.Lock()
+
+    async def _allocate_block(self):
+        counter = await _counters().find_one_and_update(
+            {"_id": COUNTER_ID},
+            {"$inc": {"value": self.block_size}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        self._end = counter["value"] + 1
+        self._next = self._end - self.block_size
+
+    async def next_number(self) -> int:
+        async with self._lock:
+            if self._next >= self._end:
+                await self._allocate_block()
+            number = self._next
+            self._next += 1
+            return number
+
+
+allocator = OrderNumberAllocator(settings.ORDER_NUMBER_BLOCK)
+
+
+async def next_order_number() -> int:
+    return await allocator.next_number()
+
+
+def parse_order_number(text: str) -> Optional[int]:
+    """`1042`, `#1042` -> 1042; None if the text is not an order number."""
+    text = text.strip().lstrip("#")
+    return int(text) if text.isdigit() and int(text) > 0 else None
+
+
+async def backfill_order_numbers():
+    """
+    Number orders placed before order numbers existed, oldest first.
+    Runs once: checkout numbers every new order, so after the first complete
+    pass a marker document skips the (unindexed) scan on later startups.
+    """
+    if await _counters().find_one({"_id": BACKFILL_MARKER_ID}):
+        return
+    async for order in Order.find({"number": None}).sort("created_at"):
+        # Conditional: another instance backfilling at the same time keeps its number
+        await Order.get_pymongo_collection().update_one(
+            {"_id": order.id, "number": None},
+            {"$set": {"number": await next_order_number()}},
+        )
+    await _counters().update_one({"_id": BACKFILL_MARKER_ID}, {"$set": {"done": True}}, upsert=True)
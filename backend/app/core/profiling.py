@@ -0,0 +1,207 @@
+"""
+Debug profiling (PROFILING_ENABLED=true).
+
+- BlockingWatchdog: a thread watching the loop lag monitor's ticks. When the
+  event loop stops ticking for longer than PROFILING_BLOCK_THRESHOLD_MS, it
+  prints the stack of the loop thread, i.e. the code blocking it (pbkdf2,
+  validation of a huge list, a synchronous call...).
+- ProfilingMiddleware: requests sent with "X-Profile: <PROFILING_TOKEN>" are
+  sampled by a thread while they run (never without a token). Samples are
+  written as collapsed stacks, the input of flamegraph.pl and speedscope; the
+  newest PROFILING_MAX_FILES are kept.
+
+Both read other threads' frames through sys._current_frames(); the loop is
+never paused to take a sample.
+"""
+import asyncio
+import hmac
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from types import FrameType
+from typing import Optional
+from app.core.config import settings
+from app.core.shedding import loop_monitor
+
+
+def format_stack(frame: Optional[FrameType], limit: int = 40) -> str:
+    lines = []
+    while frame is not None and len(lines) < limit:
+        code = frame.f_code
+        lines.append(f"    {code.co_filename}:{frame.f_lineno} in {code.co_name}")
+        frame = frame.f_back
+    return "\n".join(reversed(lines))
+
+
+def collapse_stack(frame: Optional[FrameType]) -> str:
+    """One sample in collapsed format: root;...;leaf (no line numbers, so samples aggregate)."""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)})")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+# ----------------------------
+# --- BLOCKING WATCHDOG ---
+# ----------------------------
+
+class BlockingWatchdog:
+    """
+    Reports event loop stalls: once with the stack of the blocking code
+    while it is blocked, once with the total duration when the loop resumes.
+    """
+
+    def __init__(self, threshold_ms: float, check_interval: float = 0.02):
+        self.threshold = threshold_ms / 1000
+        self.check_interval = check_interval
+        self.stalls = 0
+        self.max_stall_ms = 0.0
+        self._loop_thread: Optional[int] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def _watch(self):
+        stalled_since = None
+        while not self._stop.wait(self.check_interval):
+            tick = loop_monitor.last_tick
+            # A tick is due every loop_monitor.interval; anything beyond is the loop being busy
+            blocked = time.perf_counter() - tick - loop_monitor.interval
+            if stalled_since is None and blocked > self.threshold:
+                stalled_since = tick
+                frame = sys._current_frames().get(self._loop_thread)
+                print(f"--> Event loop blocked for more than {blocked * 1000:.0f} ms in:\n{format_stack(frame)}")
+            elif stalled_since is not None and tick != stalled_since:
+                stall_ms = (tick - stalled_since - loop_monitor.interval) * 1000
+                self.stalls += 1
+                self.max_stall_ms = max(self.max_stall_ms, stall_ms)
+                print(f"--> Event loop resumed after {stall_ms:.0f} ms")
+                stalled_since = None
+
+    def start(self):
+        """Call from the event loop thread, after loop_monitor.start()."""
+        if self._thread is None:
+            self._loop_thread = threading.get_ident()
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    def metrics(self):
+        return {"stalls": self.stalls, "max_stall_ms": round(self.max_stall_ms, 1)}
+
+
+watchdog = BlockingWatchdog(settings.PROFILING_BLOCK_THRESHOLD_MS)
+
+
+# ----------------------------
+# --- SAMPLING PROFILER ---
+# ----------------------------
+
+class RequestSampler:
+    """
+    Samples the loop thread every `interval` seconds, keeping only the samples
+    taken while `task` (the request) is the one running: time the request
+    spends awaiting I/O is not on the loop, so it does not show up.
+    """
+
+    def __init__(self, task: asyncio.Task, interval: float):
+        self.task = task
+        self.loop = task.get_loop()
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self.total = 0
+        self._loop_thread = threading.get_ident()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, name="request-sampler", daemon=True)
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            self.total += 1
+            if asyncio.current_task(self.loop) is not self.task:
+                continue
+            frame = sys._current_frames().get(self._loop_thread)
+            if frame is not None:
+                self.samples[collapse_stack(frame)] += 1
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+
+PROFILE_SUFFIX = ".folded"
+
+
+def _write_profile(path: str, content: str):
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    with open(path, "w") as f:
+        f.write(content)
+    # Names start with a timestamp: sorted oldest first
+    profiles = sorted(n for n in os.listdir(directory) if n.endswith(PROFILE_SUFFIX))
+    for name in profiles[:max(len(profiles) - settings.PROFILING_MAX_FILES, 0)]:
+        try:
+            os.remove(os.path.join(directory, name))
+        except FileNotFoundError:
+            pass  # pruned by a concurrent request
+
+
+class ProfilingMiddleware:
+    """
+    Profiles requests carrying "X-Profile: <PROFILING_TOKEN>" and tells the
+    client where the result went in the X-Profile-File response header.
+    Must be the innermost middleware: @app.middleware("http") runs the rest
+    of the stack in another task, which the sampler would not recognize.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    def _wants_profile(self, scope) -> bool:
+        if not settings.PROFILING_TOKEN:
+            return False
+        for name, value in scope["headers"]:
+            if name == b"x-profile":
+                return hmac.compare_digest(value, settings.PROFILING_TOKEN.encode())
+        return False
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.PROFILING_ENABLED or not self._wants_profile(scope):
+            await self.app(scope, receive, send)
+            return
+
+        slug = re.sub(r"[^A-Za-z0-9]+", "-", scope["path"]).strip("-") or "root"
+        name = f"{datetime.utcnow():%Y%m%d-%H%M%S-%f}-{scope['method']}-{slug}{PROFILE_SUFFIX}"
+        path = os.path.join(settings.PROFILING_OUTPUT_DIR, name)
+
+        async def send_with_header(message):
+            if message["type"] == "http.response.start":
+                message = {**message, "headers": [*message.get("headers", []), (b"x-profile-file", name.encode())]}
+            await send(message)
+
+        started = time.perf_counter()
+        with RequestSampler(asyncio.current_task(), settings.PROFILING_SAMPLE_INTERVAL_MS / 1000) as sampler:
+            await self.app(scope, receive, send_with_header)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        await asyncio.to_thread(_write_profile, path, sampler.collapsed())
+        on_loop = sum(sampler.samples.values())
+        print(f"--> Profiled {scope['method']} {scope['path']}: {elapsed_ms:.0f} ms, "
+              f"{on_loop}/{sampler.total} samples on the loop -> {path}")
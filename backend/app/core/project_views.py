@@ -0,0 +1,170 @@
+import json
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+from pymongo.errors import DuplicateKeyError
+from starlette.requests import Request
+from starlette.responses import Response
+from app.core.compression import precompressed_response
+from app.core.read_routing import CACHE_FILL, read_one
+from app.models import Company, Project, ProjectListView, ProjectViewItem
+
+# Maximum number of projects on the home page featured list
+FEATURED_LIMIT = 6
+FEATURED_KEY = "featured"
+# Rebuilds of one view racing each other retry this many times
+REBUILD_ATTEMPTS = 5
+
+
+def company_key(company_slug: str) -> str:
+    return f"company:{company_slug}"
+
+
+def _sorted(query):
+    # Deterministic ordering: newest completion first, then newest document.
+    # Projects without completion_date sort last (null < any date in MongoDB).
+    return query.sort(-Project.completion_date, -Project.id)
+
+
+def _to_item(project: Project, company: Optional[Company]) -> ProjectViewItem:
+    return ProjectViewItem(
+        id=str(project.id),
+        name=project.name,
+        slug=project.slug,
+        company_slug=project.company_slug,
+        company_name=company.name if company else None,
+        company_logo_url=company.logo_url if company else None,
+        address=project.address,
+        completion_date=project.completion_date,
+        image_urls=project.image_urls,
+        cover_asset=project.image_assets[0] if project.image_assets else None,
+        is_featured=project.is_featured,
+    )
+
+
+async def _store_view(
+    key: str,
+    projects: List[ProjectViewItem],
+    company: Optional[Company],
+    version: Optional[int],
+) -> bool:
+    """
+    Write a rebuilt view only if it is still at `version` (None: not built
+    yet) and bump the version. False if another rebuild wrote it meanwhile.
+    """
+    fields = {
+        "company_slug": company.slug if company else None,
+        "company_name": company.name if company else None,
+        "company_logo_url": company.logo_url if company else None,
+        "projects": [p.model_dump(by_alias=True, mode="json") for p in projects],
+        "updated_at": datetime.utcnow(),
+    }
+    collection = ProjectListView.get_pymongo_collection()
+    if version is None:
+        try:
+            await collection.insert_one({"key": key, **fields, "version": 1})
+        except DuplicateKeyError:
+            # Lost the insert race on the unique key
+            return False
+        return True
+    result = await collection.update_one({"key": key, "version": version}, {"$set": fields, "$inc": {"version": 1}})
+    return result.matched_count == 1
+
+
+async def _rebuild(key: str, build: Callable[[], Awaitable[Optional[Tuple[List[ProjectViewItem], Optional[Company]]]]]):
+    """
+    Rebuild a view with a version check: the version is read before the
+    source documents, so a rebuild that read older data than one stored
+    meanwhile is not written; it reads the sources again instead.
+    `build` returns (projects, company), or None to delete the view.
+    """
+    collection = ProjectListView.get_pymongo_collection()
+    for _ in range(REBUILD_ATTEMPTS):
+        current = await collection.find_one({"key": key}, {"version": 1})
+        built = await build()
+        if built is None:
+            await collection.delete_one({"key": key})
+            return
+        if await _store_view(key, *built, current["version"] if current else None):
+            return
+    print(f"--> Gave up rebuilding the project view {key}: it kept changing")
+
+
+async def rebuild_company_view(company_slug: str):
+    """Recompute the project list of one company (company info embedded)."""
+    async def build():
+        company = await Company.find_one(Company.slug == company_slug)
+        if company is None:
+            return None
+        projects = await _sorted(Project.find(Project.company_slug == company_slug)).to_list()
+        return [_to_item(p, company) for p in projects], company
+
+    await _rebuild(company_key(company_slug), build)
+
+
+async def rebuild_featured_view():
+    """Recompute the featured project list shown on the home page."""
+    async def build():
+        projects = await _sorted(Project.find(Project.is_featured == True)).limit(FEATURED_LIMIT).to_list()
+
+        # One query for all companies referenced by the featured projects
+        slugs = list({p.company_slug for p in projects})
+        companies = await Company.find({"slug": {"$in": slugs}}).to_list() if slugs else []
+        by_slug = {c.slug: c for c in companies}
+        return [_to_item(p, by_slug.get(p.company_slug)) for p in projects], None
+
+    await _rebuild(FEATURED_KEY, build)
+
+
+async def refresh_project_views(company_slugs: Iterable[Optional[str]], featured: bool):
+    """
+    Rebuild the views touched by a project write.
+    `company_slugs` should contain both the old and new company of the project.
+    """
+    for slug in {s for s in company_slugs if s}:
+        await rebuild_company_view(slug)
+    if featured:
+        await rebuild_featured_view()
+
+
+async def get_company_view(company_slug: str) -> Optional[ProjectListView]:
+    """
+    Single indexed read of a company's project list.
+    Views missing for older data are built lazily on first access.
+    Returns None if the company does not exist.
+    """
+    key = company_key(company_slug)
+    view = await read_one(ProjectListView, CACHE_FILL, {"key": key})
+    if view is None:
+        # Read back from the primary: a secondary may not have the new view yet
+        await rebuild_company_view(company_slug)
+        view = await ProjectListView.find_one(ProjectListView.key == key)
+    return view
+
+
+async def get_featured_view() -> ProjectListView:
+    """Single indexed read of the featured project list."""
+    view = await read_one(ProjectListView, CACHE_FILL, {"key": FEATURED_KEY})
+    if view is None:
+        await rebuild_featured_view()
+        view = await ProjectListView.find_one(ProjectListView.key == FEATURED_KEY)
+    return view
+
+
+def view_etag(view: ProjectListView) -> str:
+    """Stable cache key of a view version, used as ETag and compression cache key."""
+    return f"{view.key}:v{view.version}"
+
+
+async def view_response(request: Request, view: ProjectListView, items: Any, variant: str = "") -> Response:
+    """
+    Serve the items of a view as JSON with the view version as ETag.
+    `variant` distinguishes several payloads built from one view (e.g. pages).
+    Clients revalidating with If-None-Match get a 304 without a body.
+    """
+    cache_key = f"{view_etag(view)}:{variant}" if variant else view_etag(view)
+    etag = f'"{cache_key}"'
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+
+    body = json.dumps(items, default=str).encode("utf-8")
+    return await precompressed_response(request, cache_key, body, extra_headers={"ETag": etag})
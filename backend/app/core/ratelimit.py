@@ -0,0 +1,77 @@
+import uuid
+from typing import Tuple
+from fastapi import HTTPException, Request, Response
+from app.core.config import settings
+from app.core.redis import cache_breaker, get_redis
+
+# Sliding-window log: one sorted-set entry per accepted request, scored by
+# its time (Redis clock, so every app instance agrees). KEYS[1]: window key.
+# ARGV: window (ms), limit, unique member. Returns {allowed, remaining, retry_after_ms}.
+SLIDING_WINDOW_SCRIPT = """
+local t = redis.call('TIME')
+local now = t[1] * 1000 + math.floor(t[2] / 1000)
+local window = tonumber(ARGV[1])
+local limit = tonumber(ARGV[2])
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now - window)
+local count = redis.call('ZCARD', KEYS[1])
+if count < limit then
+    redis.call('ZADD', KEYS[1], now, ARGV[3])
+    redis.call('PEXPIRE', KEYS[1], window)
+    return {1, limit - count - 1, 0}
+end
+local oldest = redis.call('ZRANGE', KEYS[1], 0, 0, 'WITHSCORES')
+return {0, 0, tonumber(oldest[2]) + window - now}
+"""
+
+
+def parse_rule(rule: str) -> Tuple[int, int]:
+    """'10/60' -> (10 requests, 60 seconds)."""
+    limit, seconds = rule.split("/", 1)
+    return int(limit), int(seconds)
+
+
+def client_ip(request: Request) -> str:
+    """
+    Address of the client. Behind TRUSTED_PROXY_HOPS reverse proxies, it is
+    the entry those proxies appended to X-Forwarded-For (entries further left
+    are client-supplied and cannot be trusted).
+    """
+    hops = settings.TRUSTED_PROXY_HOPS
+    if hops:
+        forwarded = [ip.strip() for ip in request.headers.get("x-forwarded-for", "").split(",") if ip.strip()]
+        if forwarded:
+            return forwarded[max(len(forwarded) - hops, 0)]
+    return request.client.host if request.client else "unknown"
+
+
+class RateLimit:
+    """
+    Route dependency limiting each client IP to `rule` ("<requests>/<seconds>").
+    Counters live in Redis so the limit holds across app instances; without
+    Redis requests are let through.
+
+        @router.post("/", dependencies=[Depends(RateLimit("orders", settings.RATE_LIMIT_ORDERS))])
+    """
+
+    def __init__(self, name: str, rule: str):
+        self.name = name
+        self.limit, self.window = parse_rule(rule)
+
+    async def __call__(self, request: Request, response: Response):
+        client = get_redis()
+        if not settings.RATE_LIMIT_ENABLED or client is None:
+            return
+        key = f"ratelimit:{self.name}:{client_ip(request)}"
+        try:
+            allowed, remaining, retry_after_ms = await cache_breaker.call(
+                client.eval, SLIDING_WINDOW_SCRIPT, 1, key, self.window * 1000, self.limit, uuid.uuid4().hex,
+            )
+        except Exception as e:
+            print(f"Error checking rate limit: {e}")
+            return
+
+        headers = {"X-RateLimit-Limit": str(self.limit), "X-RateLimit-Remaining": str(remaining)}
+        if not allowed:
+            headers["Retry-After"] = str(max(1, -(-int(retry_after_ms) // 1000)))
+            raise HTTPException(status_code=429, detail="Too many requests, please slow down.", headers=headers)
+        response.headers.update(headers)
@@ -0,0 +1,108 @@
+from typing import Any, Dict, List, Optional, Tuple, Type
+from pydantic import BaseModel
+from pymongo.read_concern import ReadConcern
+from pymongo.read_preferences import Nearest, Primary, PrimaryPreferred, Secondary, SecondaryPreferred
+from app.core.config import settings
+
+# ----------------------------
+# --- ROUTES ---
+# ----------------------------
+
+# "catalog": browsing (products, categories, projects): may be served by a
+#            replica-set secondary, slightly behind the primary
+# "checkout": reads that decide an order (prices, stock): always the primary
+# "cache_fill": browsing reads that are stored (Redis caches of product details,
+#               project pages, galleries and views; catalog snapshots): the
+#               primary, so what a write just invalidated is not rebuilt from
+#               the pre-write data of a lagging secondary
+CATALOG = "catalog"
+CHECKOUT = "checkout"
+CACHE_FILL = "cache_fill"
+
+_MODES = {
+    "primary": Primary,
+    "primaryPreferred": PrimaryPreferred,
+    "secondary": Secondary,
+    "secondaryPreferred": SecondaryPreferred,
+    "nearest": Nearest,
+}
+
+
+def _read_preference(mode: str, max_staleness: int):
+    if mode not in _MODES:
+        raise ValueError(f"Unknown read preference '{mode}', expected one of {list(_MODES)}")
+    if mode == "primary":
+        return Primary()
+    # max_staleness -1 = no limit (MongoDB requires at least 90s otherwise)
+    return _MODES[mode](max_staleness=max_staleness)
+
+
+ROUTES: Dict[str, Tuple[Any, ReadConcern]] = {
+    CATALOG: (
+        _read_preference(settings.CATALOG_READ_PREFERENCE, settings.CATALOG_MAX_STALENESS_SECONDS),
+        ReadConcern(settings.CATALOG_READ_CONCERN),
+    ),
+    CHECKOUT: (
+        _read_preference("primary", -1),
+        ReadConcern(settings.CHECKOUT_READ_CONCERN),
+    ),
+    CACHE_FILL: (
+        _read_preference("primary", -1),
+        ReadConcern(settings.CATALOG_READ_CONCERN),
+    ),
+}
+
+
+def routed_collection(model, route: str):
+    """The model's collection with the read preference / read concern of `route`."""
+    read_preference, read_concern = ROUTES[route]
+    return model.get_pymongo_collection().with_options(read_preference=read_preference, read_concern=read_concern)
+
+
+# ----------------------------
+# --- READ HELPERS ---
+# ----------------------------
+
+def _projection(response_model: Optional[Type[BaseModel]]) -> Optional[Dict[str, Any]]:
+    settings_cls = getattr(response_model, "Settings", None)
+    return getattr(settings_cls, "projection", None)
+
+
+async def read_many(
+    model,
+    route: str,
+    query: Optional[Dict[str, Any]] = None,
+    response_model: Optional[Type[BaseModel]] = None,
+    sort: Optional[List[Tuple[str, int]]] = None,
+    skip: int = 0,
+    limit: int = 0,
+) -> List[Any]:
+    """
+    `model.find(query)` through `route`, validated as `response_model`
+    (the model itself by default; a `Settings.projection` on it is applied).
+    """
+    response_model = response_model or model
+    cursor = routed_collection(model, route).find(query or {}, _projection(response_model))
+    if sort:
+        cursor = cursor.sort(sort)
+    if skip:
+        cursor = cursor.skip(skip)
+    if limit:
+        cursor = cursor.limit(limit)
+    return [response_model.model_validate(doc) async for doc in cursor]
+
+
+async def read_one(
+    model,
+    route: str,
+    query: Dict[str, Any],
+    response_model: Optional[Type[BaseModel]] = None,
+) -> Optional[Any]:
+    """`model.find_one(query)` through `route` (None if nothing matches)."""
+    response_model = response_model or model
+    doc = await routed_collection(model, route).find_one(query, _projection(response_model))
+    return response_model.model_validate(doc) if doc else None
+
+
+async def count(model, route: str, query: Optional[Dict[str, Any]] = None) -> int:
+    return await routed_collection(model, route).count_documents(query or {})
@@ -1,52 +1,253 @@
+import asyncio
 import json
 import redis.asyncio as redis
-from typing import Optional, Any
+from redis.asyncio.retry import Retry
+from redis.backoff import ExponentialBackoff
+from redis.exceptions import ConnectionError, TimeoutError
+from typing import Optional, Any, Dict, Iterable, List, Set
 from app.core.config import settings
+from app.core.resilience import CircuitBreaker, CircuitOpenError, register_breaker
 
 redis_client: Optional[redis.Redis] = None
+# Same server, without response decoding: for binary values (compressed payloads)
+redis_binary: Optional[redis.Redis] = None
+_reconnect_task: Optional[asyncio.Task] = None
 
-async def init_redis():
-    """Initialize the Redis client."""
-    global redis_client
-    try:
-        redis_client = redis.from_url(
-            settings.REDIS_URL,
-            encoding="utf-8",
-            decode_responses=True
-        )
+# Cache calls are bounded by CACHE_TIMEOUT_MS; after repeated failures the
+# cache is bypassed for CACHE_BREAKER_RESET seconds (requests go to MongoDB)
+cache_breaker = register_breaker(CircuitBreaker(
+    "redis",
+    failure_threshold=settings.CACHE_BREAKER_FAILURES,
+    reset_timeout=settings.CACHE_BREAKER_RESET,
+    call_timeout=settings.CACHE_TIMEOUT_MS / 1000,
+))
+
+def _create_client(
+    decode_responses: bool,
+    socket_timeout: float = settings.REDIS_SOCKET_TIMEOUT,
+    max_connections: int = settings.REDIS_MAX_CONNECTIONS,
+) -> redis.Redis:
+    """
+    Client on a bounded pool: when all connections are busy, callers wait up
+    to REDIS_POOL_TIMEOUT for one instead of failing. Dropped connections are
+    re-established and the command retried (with backoff).
+    """
+    pool = redis.BlockingConnectionPool.from_url(
+        settings.REDIS_URL,
+        max_connections=max_connections,
+        timeout=settings.REDIS_POOL_TIMEOUT,
+        socket_timeout=socket_timeout,
+        socket_connect_timeout=settings.REDIS_CONNECT_TIMEOUT,
+        health_check_interval=settings.REDIS_HEALTH_CHECK_INTERVAL,
+        retry=Retry(ExponentialBackoff(cap=1, base=0.05), settings.REDIS_RETRIES),
+        retry_on_error=[ConnectionError, TimeoutError],
+        encoding="utf-8",
+        decode_responses=decode_responses,
+    )
+    return redis.Redis(connection_pool=pool)
+
+def create_blocking_client(block_ms: int) -> redis.Redis:
+    """
+    Client of its own for a blocking read (XREADGROUP BLOCK): on the shared
+    pool the socket timeout is shorter than the block, so every quiet poll
+    would end in a TimeoutError. Here the socket waits for the block plus
+    the usual REDIS_SOCKET_TIMEOUT. Close it with aclose().
+    """
+    return _create_client(True, socket_timeout=block_ms / 1000 + settings.REDIS_SOCKET_TIMEOUT, max_connections=1)
+
+async def _connect() -> bool:
+    global redis_client, redis_binary
+    text, binary = _create_client(True), _create_client(False)
+    try:
         # Test connection
-        await redis_client.ping()
-        print("--> Successfully connected to Redis!")
+        await text.ping()
     except Exception as e:
         print(f"--> Failed to connect to Redis: {e}")
-        redis_client = None
+        await text.aclose()
+        await binary.aclose()
+        return False
+    redis_client, redis_binary = text, binary
+    print("--> Successfully connected to Redis!")
+    return True
+
+async def _reconnect_loop():
+    while not await _connect():
+        await asyncio.sleep(settings.REDIS_RECONNECT_INTERVAL)
+
+async def init_redis():
+    """
+    Initialize the Redis clients.
+    If Redis is down at startup, the app runs without it (helpers become
+    no-ops) and keeps trying to connect in the background.
+    """
+    global _reconnect_task
+    if await _connect():
+        return
+    if _reconnect_task is None or _reconnect_task.done():
+        _reconnect_task = asyncio.get_running_loop().create_task(_reconnect_loop())
+
+async def close_redis():
+    """Stop reconnecting and close the connection pools."""
+    global redis_client, redis_binary, _reconnect_task
+    if _reconnect_task is not None:
+        _reconnect_task.cancel()
+        _reconnect_task = None
+    for client in (redis_client, redis_binary):
+        if client is not None:
+            await client.aclose()
+    redis_client = redis_binary = None
+
+def get_redis() -> Optional[redis.Redis]:
+    """
+    Current Redis client (None if Redis is unavailable, or while the cache
+    circuit is open: callers then take their no-Redis fallback right away).
+    """
+    if not cache_breaker.available():
+        return None
+    return redis_client
+
+def get_redis_store() -> Optional[redis.Redis]:
+    """
+    Redis client for data that lives only in Redis (hot stock counters).
+    Not gated by the cache circuit: an open circuit means the cache is slow,
+    and those callers have no fallback to skip to. None only while Redis is
+    not connected.
+    """
+    return redis_client
+
+def _report(action: str, error: Exception):
+    # An open circuit is expected and already logged once by the breaker
+    if not isinstance(error, CircuitOpenError):
+        print(f"Error {action}: {error!r}")
 
 async def get_cache(key: str) -> Optional[Any]:
     """Retrieve data from Redis cache."""
     if redis_client is None:
         return None
     try:
-        data = await redis_client.get(key)
+        data = await cache_breaker.call(redis_client.get, key)
         if data:
             return json.loads(data)
     except Exception as e:
-        print(f"Error reading from cache: {e}")
+        _report("reading from cache", e)
     return None
 
+async def get_cache_raw(key: str) -> Optional[str]:
+    """Retrieve the serialized JSON string from Redis cache without parsing it."""
+    if redis_client is None:
+        return None
+    try:
+        return await cache_breaker.call(redis_client.get, key)
+    except Exception as e:
+        _report("reading from cache", e)
+    return None
+
+async def set_cache_raw(key: str, value: str, expire: int = 3600, group: Optional[str] = None):
+    """
+    Store an already-serialized JSON string in Redis cache with TTL
+    (and register it in `group`, in the same round trip).
+    """
+    if redis_client is None:
+        return
+    try:
+        if group is None:
+            await cache_breaker.call(redis_client.set, key, value, ex=expire)
+            return
+        pipe = redis_client.pipeline(transaction=False)
+        pipe.set(key, value, ex=expire)
+        pipe.sadd(group, key)
+        await cache_breaker.call(pipe.execute)
+    except Exception as e:
+        _report("writing to cache", e)
+
 async def set_cache(key: str, value: Any, expire: int = 3600):
     """Store data in Redis cache with TTL."""
     if redis_client is None:
         return
     try:
-        await redis_client.set(key, json.dumps(value), ex=expire)
+        await cache_breaker.call(redis_client.set, key, json.dumps(value), ex=expire)
     except Exception as e:
-        print(f"Error writing to cache: {e}")
+        _report("writing to cache", e)
 
 async def clear_cache(key: str):
     """Remove key from Redis cache."""
     if redis_client is None:
         return
     try:
-        await redis_client.delete(key)
+        await cache_breaker.call(redis_client.delete, key)
+    except Exception as e:
+        _report("clearing cache", e)
+
+async def track_cache_key(group: str, key: str):
+    """Remember that `key` belongs to `group` so the group can be invalidated selectively."""
+    if redis_client is None:
+        return
+    try:
+        await cache_breaker.call(redis_client.sadd, group, key)
+    except Exception as e:
+        _report("writing to cache", e)
+
+async def get_tracked_keys(group: str) -> Set[str]:
+    """Return all cache keys registered under `group`."""
+    if redis_client is None:
+        return set()
+    try:
+        return await cache_breaker.call(redis_client.smembers, group)
+    except Exception as e:
+        _report("reading from cache", e)
+    return set()
+
+async def clear_cache_keys(keys: Iterable[str], group: Optional[str] = None):
+    """Remove several keys in one call (and unregister them from `group`)."""
+    keys = list(keys)
+    if redis_client is None or not keys:
+        return
+    try:
+        pipe = redis_client.pipeline(transaction=False)
+        pipe.delete(*keys)
+        if group:
+            pipe.srem(group, *keys)
+        await cache_breaker.call(pipe.execute)
+    except Exception as e:
+        _report("clearing cache", e)
+
+async def get_cache_many(keys: List[str]) -> List[Optional[Any]]:
+    """Retrieve several cached values in one MGET (None for misses), in the order of `keys`."""
+    if redis_client is None or not keys:
+        return [None] * len(keys)
+    try:
+        return [json.loads(v) if v else None for v in await cache_breaker.call(redis_client.mget, keys)]
+    except Exception as e:
+        _report("reading from cache", e)
+    return [None] * len(keys)
+
+async def set_cache_many(values: Dict[str, Any], expire: int = 3600):
+    """Store several values with TTL in one pipelined round trip."""
+    if redis_client is None or not values:
+        return
+    try:
+        pipe = redis_client.pipeline(transaction=False)
+        for key, value in values.items():
+            pipe.set(key, json.dumps(value, default=str), ex=expire)
+        await cache_breaker.call(pipe.execute)
+    except Exception as e:
+        _report("writing to cache", e)
+
+async def get_cache_bytes(key: str) -> Optional[bytes]:
+    """Retrieve a binary value (e.g. a compressed payload) as-is."""
+    if redis_binary is None:
+        return None
+    try:
+        return await cache_breaker.call(redis_binary.get, key)
+    except Exception as e:
+        _report("reading from cache", e)
+    return None
+
+async def set_cache_bytes(key: str, value: bytes, expire: int = 3600):
+    """Store a binary value with TTL (no text decoding on the way back)."""
+    if redis_binary is None:
+        return
+    try:
+        await cache_breaker.call(redis_binary.set, key, value, ex=expire)
     except Exception as e:
-        print(f"Error clearing cache: {e}")
+        _report("writing to cache", e)
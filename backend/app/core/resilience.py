@@ -0,0 +1,146 @@
+import asyncio
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+from pymongo import monitoring
+from app.core.config import settings
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a dependency whose circuit is open."""
+
+
+class CircuitBreaker:
+    """
+    Stops calling a dependency after `failure_threshold` consecutive failures
+    (errors or timeouts) for `reset_timeout` seconds, so callers fall back at
+    once instead of waiting on a sick service.
+
+    - closed: calls go through
+    - open: calls fail immediately with CircuitOpenError
+    - half_open: `reset_timeout` elapsed, calls go through again; the first
+      success closes the circuit, the first failure re-opens it
+
+    Failures and successes may be recorded from driver threads (pymongo
+    listeners), hence the lock.
+    """
+
+    def __init__(self, name: str, failure_threshold: int, reset_timeout: float, call_timeout: Optional[float] = None):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.call_timeout = call_timeout
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._open_until = 0.0
+        # Degraded-mode metrics
+        self.calls = 0
+        self.failures = 0
+        self.timeouts = 0
+        self.short_circuits = 0
+        self.times_opened = 0
+        self.last_error: Optional[str] = None
+
+    @property
+    def state(self) -> str:
+        if self._failures < self.failure_threshold:
+            return "closed"
+        return "open" if time.monotonic() < self._open_until else "half_open"
+
+    def available(self) -> bool:
+        """False while the circuit is open (calls should be skipped)."""
+        return time.monotonic() >= self._open_until
+
+    def record_success(self):
+        with self._lock:
+            if self._failures >= self.failure_threshold:
+                print(f"--> Circuit '{self.name}' closed, dependency recovered")
+            self._failures = 0
+
+    def record_failure(self, error: Any):
+        with self._lock:
+            self.failures += 1
+            self.last_error = repr(error)
+            self._failures += 1
+            if self._failures >= self.failure_threshold and self.available():
+                self._open_until = time.monotonic() + self.reset_timeout
+                self.times_opened += 1
+                print(f"--> Circuit '{self.name}' opened for {self.reset_timeout}s after {self._failures} failure(s): {error!r}")
+
+    async def call(self, fn: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        """Run `fn(*args, **kwargs)` under the breaker and its per-call timeout."""
+        if not self.available():
+            self.short_circuits += 1
+            raise CircuitOpenError(f"circuit '{self.name}' is open")
+        self.calls += 1
+        try:
+            result = await asyncio.wait_for(fn(*args, **kwargs), self.call_timeout)
+        except asyncio.TimeoutError as e:
+            self.timeouts += 1
+            self.record_failure(e)
+            raise
+        except Exception as e:
+            self.record_failure(e)
+            raise
+        self.record_success()
+        return result
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "calls": self.calls,
+            "failures": self.failures,
+            "timeouts": self.timeouts,
+            "short_circuits": self.short_circuits,
+            "times_opened": self.times_opened,
+            "last_error": self.last_error,
+        }
+
+
+breakers: Dict[str, CircuitBreaker] = {}
+
+
+def register_breaker(breaker: CircuitBreaker) -> CircuitBreaker:
+    breakers[breaker.name] = breaker
+    return breaker
+
+
+def breaker_metrics() -> Dict[str, Dict[str, Any]]:
+    return {name: breaker.metrics() for name, breaker in breakers.items()}
+
+
+# ----------------------------
+# --- MONGODB ---
+# ----------------------------
+
+# Driver errors meaning "the database is unreachable or too slow" (as opposed
+# to errors about the request itself, e.g. a duplicate key)
+UNAVAILABLE_ERROR_TYPES = {"AutoReconnect", "ConnectionFailure", "NetworkTimeout", "WaitQueueTimeoutError", "ExecutionTimeout"}
+UNAVAILABLE_ERROR_CODES = {50, 91, 189, 10107, 11600, 13435}  # MaxTimeMSExpired, shutdown, not primary
+
+
+class CommandHealthListener(monitoring.CommandListener):
+    """Feeds a circuit breaker from the outcome of every MongoDB command."""
+
+    def __init__(self, breaker: CircuitBreaker):
+        self.breaker = breaker
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        self.breaker.record_success()
+
+    def failed(self, event):
+        failure = event.failure or {}
+        if failure.get("errtype") in UNAVAILABLE_ERROR_TYPES or failure.get("code") in UNAVAILABLE_ERROR_CODES:
+            self.breaker.record_failure(failure.get("errmsg", "command failed"))
+
+
+# While open, the load shedder answers 503 at once instead of letting requests
+# wait for MongoDB's timeouts
+db_breaker = register_breaker(CircuitBreaker(
+    "mongodb",
+    failure_threshold=settings.DB_BREAKER_FAILURES,
+    reset_timeout=settings.DB_BREAKER_RESET,
+))
@@ -0,0 +1,146 @@
+import asyncio
+import json
+import threading
+import time
+from typing import Optional
+from pymongo import monitoring
+from app.core.config import settings
+from app.core.resilience import db_breaker
+
+# ----------------------------
+# --- SIGNALS ---
+# ----------------------------
+
+class PoolMonitor(monitoring.ConnectionPoolListener):
+    """
+    Counts operations waiting for a MongoDB connection (checkout started but
+    not yet served). Events come from driver threads, hence the lock.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.waiting = 0
+        self.checked_out = 0
+
+    def _add(self, waiting: int = 0, checked_out: int = 0):
+        with self._lock:
+            self.waiting += waiting
+            self.checked_out += checked_out
+
+    def connection_check_out_started(self, event):
+        self._add(waiting=1)
+
+    def connection_checked_out(self, event):
+        self._add(waiting=-1, checked_out=1)
+
+    def connection_check_out_failed(self, event):
+        self._add(waiting=-1)
+
+    def connection_checked_in(self, event):
+        self._add(checked_out=-1)
+
+    def pool_created(self, event): pass
+    def pool_ready(self, event): pass
+    def pool_cleared(self, event): pass
+    def pool_closed(self, event): pass
+    def connection_created(self, event): pass
+    def connection_ready(self, event): pass
+    def connection_closed(self, event): pass
+
+
+class LoopLagMonitor:
+    """
+    Measures how late the event loop wakes up a periodic sleep: a busy loop
+    (CPU-bound handlers, blocking calls, too many tasks) shows up as lag.
+    The value is smoothed so a single slow tick does not trip shedding.
+    """
+
+    def __init__(self, interval: float = 0.1, smoothing: float = 0.3):
+        self.interval = interval
+        self.smoothing = smoothing
+        self.lag_ms = 0.0
+        # perf_counter() of the last tick: stops moving while the loop is blocked
+        self.last_tick = time.perf_counter()
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self):
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.last_tick = time.perf_counter()
+            lag = max(0.0, (self.last_tick - started - self.interval) * 1000)
+            self.lag_ms += self.smoothing * (lag - self.lag_ms)
+
+    def start(self):
+        if self._task is None:
+            self.last_tick = time.perf_counter()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+pool_monitor = PoolMonitor()
+loop_monitor = LoopLagMonitor()
+
+
+def overload_reason() -> Optional[str]:
+    """Why the process should not take new work right now (None if it can)."""
+    if not db_breaker.available():
+        return "database unavailable"
+    if loop_monitor.lag_ms > settings.SHED_MAX_LOOP_LAG_MS:
+        return "event loop lag"
+    if pool_monitor.waiting > settings.SHED_MAX_DB_WAITERS:
+        return "database pool saturated"
+    return None
+
+
+# ----------------------------
+# --- MIDDLEWARE ---
+# ----------------------------
+
+class LoadSheddingMiddleware:
+    """
+    Rejects new requests with 503 + Retry-After while the process is
+    overloaded, so requests already admitted keep a bounded latency instead
+    of every request slowing down. Requests in flight are never interrupted.
+    """
+
+    EXEMPT_PATHS = {"/", "/health"}
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or not settings.LOAD_SHEDDING_ENABLED
+            or scope["method"] == "OPTIONS"
+            or scope["path"] in self.EXEMPT_PATHS
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        reason = overload_reason()
+        if reason is None:
+            await self.app(scope, receive, send)
+            return
+
+        body = json.dumps({"detail": "Server is busy, please retry shortly."}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(settings.SHED_RETRY_AFTER).encode()),
+                (b"x-shed-reason", reason.encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
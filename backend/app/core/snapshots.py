@@ -0,0 +1,255 @@
+"""
+Static catalog snapshots.
+
+Each shard (products, categories, companies, featured projects) is rendered
+to JSON with the same shape as its API endpoint, stored under a
+content-addressed version next to brotli/gzip copies, and listed in a
+manifest. Unchanged shards keep their version, so CDN and ISR caches of
+them stay valid; only the manifest has to be revalidated.
+
+Layout in the object store (a local directory standing in for S3):
+
+    catalog/manifest.json
+    catalog/<shard>/<version>.json[.br|.gz]
+"""
+import asyncio
+import gzip
+import hashlib
+import json
+import os
+import uuid
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+from app.core.config import settings
+from app.core.events import publish_event
+from app.core.read_routing import CACHE_FILL, read_many
+from app.core.redis import cache_breaker, get_redis
+from app.models import Company, Product
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+PRODUCTS = "products"
+CATEGORIES = "categories"
+COMPANIES = "companies"
+FEATURED_PROJECTS = "featured-projects"
+
+MANIFEST_KEY = "catalog/manifest.json"
+LOCK_KEY = "snapshots:lock"
+# Shards waiting for a regeneration (taken by whoever holds the lock)
+DIRTY_KEY = "snapshots:dirty"
+
+# Deletes the lock only while it still holds the caller's token: a lock that
+# expired during a slow regeneration may belong to another replica by now
+RELEASE_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+# Snapshots are compressed once and served many times: use the maximum levels
+ENCODINGS = {"gzip": ".gz", "br": ".br"}
+
+
+# ----------------------------
+# --- OBJECT STORE ---
+# ----------------------------
+
+class LocalObjectStore:
+    """
+    S3-compatible stand-in: objects are files under `root`, keyed by their
+    relative path. Writes are atomic (temp file + rename), so readers never
+    see a partial object. Methods are blocking: call them in a thread.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def _path(self, key: str) -> str:
+        path = os.path.normpath(os.path.join(self.root, key))
+        if not path.startswith(os.path.normpath(self.root) + os.sep):
+            raise ValueError(f"Invalid object key: {key}")
+        return path
+
+    def put(self, key: str, body: bytes):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(body)
+        os.replace(tmp, path)
+
+    def get(self, key: str) -> Optional[bytes]:
+        try:
+            with open(self._path(key), "rb") as f:
+                return f.read()
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def delete(self, key: str):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+
+store = LocalObjectStore(settings.SNAPSHOT_ROOT)
+
+
+def shard_key(shard: str, version: str, encoding: Optional[str] = None) -> str:
+    return f"catalog/{shard}/{version}.json{ENCODINGS.get(encoding, '')}"
+
+
+def shard_url(shard: str, version: str) -> str:
+    """Public URL of a shard: the CDN in front of the store, or the API route serving it."""
+    base = settings.SNAPSHOT_BASE_URL or "/"
+    return f"{base.rstrip('/')}/{shard_key(shard, version)}"
+
+
+# ----------------------------
+# --- RENDERERS ---
+# ----------------------------
+
+# Same payloads as the API endpoints, read from the primary: a render right
+# after a write must see it, or the stale data hashes to the current version
+# and nothing is published (routers imported lazily: they import this module)
+
+async def render_products() -> List[Any]:
+    return [p.model_dump(by_alias=True, mode="json") for p in await read_many(Product, CACHE_FILL)]
+
+
+async def render_categories() -> List[Any]:
+    from app.routers.categories import list_categories
+    return [c.model_dump(by_alias=True, mode="json") for c in await list_categories(CACHE_FILL)]
+
+
+async def render_companies() -> List[Any]:
+    return [c.model_dump(by_alias=True, mode="json") for c in await read_many(Company, CACHE_FILL)]
+
+
+async def render_featured_projects() -> List[Any]:
+    from app.core.project_views import get_featured_view
+    from app.routers.projects import FeaturedProjectResponse
+    view = await get_featured_view()
+    return [FeaturedProjectResponse(**p.model_dump()).model_dump(mode="json") for p in view.projects]
+
+
+RENDERERS: Dict[str, Callable[[], Awaitable[List[Any]]]] = {
+    PRODUCTS: render_products,
+    CATEGORIES: render_categories,
+    COMPANIES: render_companies,
+    FEATURED_PROJECTS: render_featured_projects,
+}
+
+
+# ----------------------------
+# --- GENERATION ---
+# ----------------------------
+
+def _write_shard(shard: str, version: str, body: bytes):
+    """Store a shard and its precompressed copies (blocking, CPU-heavy)."""
+    store.put(shard_key(shard, version, "gzip"), gzip.compress(body, compresslevel=9, mtime=0))
+    if brotli is not None:
+        store.put(shard_key(shard, version, "br"), brotli.compress(body, quality=11))
+    # Plain copy last: its presence marks the version as complete
+    store.put(shard_key(shard, version), body)
+
+
+def _delete_shard(shard: str, version: str):
+    for encoding in (None, *ENCODINGS):
+        store.delete(shard_key(shard, version, encoding))
+
+
+def load_manifest() -> Dict[str, Any]:
+    raw = store.get(MANIFEST_KEY)
+    return json.loads(raw) if raw else {"version": None, "generated_at": None, "shards": {}}
+
+
+async def regenerate(shards: Optional[Iterable[str]] = None) -> List[str]:
+    """
+    Render the given shards (all by default) and publish the versions that
+    changed in a new manifest. Returns the names of the changed shards.
+    Older versions are kept for SNAPSHOT_KEEP_VERSIONS generations, since
+    caches may still reference them.
+    """
+    manifest = await asyncio.to_thread(load_manifest)
+    changed = []
+    for shard in shards or RENDERERS:
+        items = await RENDERERS[shard]()
+        body = json.dumps(items, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8")
+        version = hashlib.blake2b(body, digest_size=8).hexdigest()
+        current = manifest["shards"].get(shard, {})
+        if current.get("version") == version:
+            continue
+
+        await asyncio.to_thread(_write_shard, shard, version, body)
+        previous = [current["version"], *current.get("previous", [])] if current else []
+        for stale in previous[settings.SNAPSHOT_KEEP_VERSIONS:]:
+            await asyncio.to_thread(_delete_shard, shard, stale)
+        manifest["shards"][shard] = {
+            "version": version,
+            "url": shard_url(shard, version),
+            "count": len(items),
+            "size": len(body),
+            "encodings": ["br", "gzip"] if brotli is not None else ["gzip"],
+            "previous": previous[:settings.SNAPSHOT_KEEP_VERSIONS],
+        }
+        changed.append(shard)
+
+    if changed:
+        versions = json.dumps({name: s["version"] for name, s in sorted(manifest["shards"].items())})
+        manifest["version"] = hashlib.blake2b(versions.encode(), digest_size=8).hexdigest()
+        manifest["generated_at"] = datetime.utcnow().isoformat() + "Z"
+        await asyncio.to_thread(store.put, MANIFEST_KEY, json.dumps(manifest, indent=2).encode("utf-8"))
+        print(f"--> Catalog snapshot {manifest['version']}: regenerated {changed}")
+    return changed
+
+
+async def regenerate_locked(shards: Optional[Iterable[str]] = None) -> Optional[List[str]]:
+    """
+    regenerate() under a Redis lock, so worker replicas never write the
+    manifest concurrently. The shards are first marked dirty: if another
+    replica (or the periodic refresh) holds the lock, it regenerates them
+    after its current run, which may have read the data before this change.
+    Returns the changed shards, or None if the work was left to the holder.
+    """
+    client = get_redis()
+    if client is None:
+        return await regenerate(shards)
+
+    await cache_breaker.call(client.sadd, DIRTY_KEY, *(shards or RENDERERS))
+    changed: List[str] = []
+    acquired = False
+    while True:
+        token = f"{settings.WORKER_CONSUMER}:{uuid.uuid4().hex}"
+        if not await cache_breaker.call(client.set, LOCK_KEY, token, nx=True, ex=300):
+            return changed if acquired else None
+        acquired = True
+        try:
+            dirty = await cache_breaker.call(client.spop, DIRTY_KEY, len(RENDERERS))
+            if dirty:
+                try:
+                    changed += await regenerate([s for s in RENDERERS if s in dirty])
+                except BaseException:
+                    await client.sadd(DIRTY_KEY, *dirty)  # still to do
+                    raise
+        finally:
+            try:
+                await cache_breaker.call(client.eval, RELEASE_LOCK_SCRIPT, 1, LOCK_KEY, token)
+            except Exception as e:
+                # The lock expires on its own
+                print(f"Error releasing the snapshot lock: {e!r}")
+        # Shards marked while the lock was held: their writer gave up on the lock
+        if not await cache_breaker.call(client.scard, DIRTY_KEY):
+            return changed
+
+
+async def mark_changed(*shards: str):
+    """
+    Ask the worker to regenerate shards after a write. Lost events are
+    harmless: the worker also refreshes every shard periodically.
+    """
+    await publish_event(settings.CATALOG_EVENTS_STREAM, "catalog.changed", {"shards": list(shards)})
@@ -0,0 +1,66 @@
+from typing import Any, Dict, Optional, Type, TypeVar
+from beanie import Document, PydanticObjectId
+from beanie.odm.operators.update.general import Set, Inc
+from beanie.odm.queries.update import UpdateResponse
+from fastapi import HTTPException
+
+DocT = TypeVar("DocT", bound=Document)
+
+
+def parse_if_match(if_match: Optional[str]) -> Optional[int]:
+    """
+    Read the expected revision from an If-Match header.
+    Accepts `3`, `"3"` and `W/"3"`; no header means last-write-wins.
+    """
+    if not if_match or if_match.strip() == "*":
+        return None
+    value = if_match.strip()
+    if value.startswith("W/"):
+        value = value[2:]
+    try:
+        return int(value.strip('"'))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="If-Match must contain a revision number.")
+
+
+def revision_etag(revision: int) -> str:
+    return f'"{revision}"'
+
+
+async def atomic_update(
+    model: Type[DocT],
+    doc_id: PydanticObjectId,
+    changes: Dict[str, Any],
+    expected_revision: Optional[int] = None,
+    return_old: bool = False,
+    not_found_detail: str = "Document not found.",
+) -> DocT:
+    """
+    Apply `changes` with a single find_one_and_update ($set + revision bump).
+
+    Only the changed fields are written, so concurrent edits of different
+    fields never overwrite each other. When `expected_revision` is given the
+    update only applies if the stored revision still matches (optimistic
+    concurrency), otherwise 409 is raised.
+
+    Returns the post-image, or the pre-image with `return_old=True` for
+    callers that need the previous values (e.g. to invalidate old caches).
+    """
+    query: Dict[str, Any] = {"_id": doc_id}
+    if expected_revision is not None:
+        # Documents written before the revision field existed count as revision 0
+        query["revision"] = {"$in": [0, None]} if expected_revision == 0 else expected_revision
+
+    # An empty $set is rejected by older MongoDB versions: only bump the revision then
+    operators = [Set(changes), Inc({"revision": 1})] if changes else [Inc({"revision": 1})]
+    result = await model.find_one(query).update(
+        *operators,
+        response_type=UpdateResponse.OLD_DOCUMENT if return_old else UpdateResponse.NEW_DOCUMENT,
+    )
+    if result is not None:
+        return result
+
+    # Nothing matched: tell a missing document apart from a stale revision
+    if expected_revision is not None and await model.find({"_id": doc_id}).count():
+        raise HTTPException(status_code=409, detail="Revision conflict: the document was modified by someone else.")
+    raise HTTPException(status_code=404, detail=not_found_detail)
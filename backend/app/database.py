@@ -1,6 +1,8 @@
 import motor.motor_asyncio
 from beanie import init_beanie
-from app.models import Product, Order, Project, Company, User, Category  # Import các models
+from app.core.resilience import CommandHealthListener, db_breaker
+from app.core.shedding import pool_monitor
+from app.models import Product, Order, Project, Company, User, Category, ProjectListView  # Import các models
 import os
 from dotenv import load_dotenv
 
@@ -24,6 +26,10 @@ async def init_db():
     max_idle_time_ms = int(os.getenv("MONGODB_MAX_IDLE_TIME_MS", 60000))
     # connectTimeoutMS: Timeout after 10 seconds if can't connect (default: 10000)
     connect_timeout_ms = int(os.getenv("MONGODB_CONNECT_TIMEOUT_MS", 10000))
+    # timeoutMS: Deadline of every operation, including waiting for a pooled connection and retries (default: 10000)
+    timeout_ms = int(os.getenv("MONGODB_TIMEOUT_MS", 10000))
+    # serverSelectionTimeoutMS: Give up quickly when no server is reachable (default: 5000)
+    server_selection_timeout_ms = int(os.getenv("MONGODB_SERVER_SELECTION_TIMEOUT_MS", 5000))
 
     # Create connection with pool settings
     client = motor.motor_asyncio.AsyncIOMotorClient(
@@ -31,11 +37,15 @@ async def init_db():
         maxPoolSize=max_pool_size,
         minPoolSize=min_pool_size,
         maxIdleTimeMS=max_idle_time_ms,
-        connectTimeoutMS=connect_timeout_ms
+        connectTimeoutMS=connect_timeout_ms,
+        timeoutMS=timeout_ms,
+        serverSelectionTimeoutMS=server_selection_timeout_ms,
+        # Pool wait queue and command failures, read by the load shedder
+        event_listeners=[pool_monitor, CommandHealthListener(db_breaker)],
     )
 
     # IMPORTANT: Select specific database
     database = client.khangviet_db
     
     # Initialize Beanie with models
-    await init_beanie(database, document_models=[Product, Order, Company, Project, User, Category]) #type:ignore
\ No newline at end of file
+    await init_beanie(database, document_models=[Product, Order, Company, Project, User, Category, ProjectListView]) #type:ignore
\ No newline at end of file
@@ -2,9 +2,14 @@ from app.routers import all_routers
 from fastapi import FastAPI, Request, status
 from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.middleware.gzip import GZipMiddleware
 from app.database import init_db
-from app.core.redis import init_redis
+from app.core.redis import init_redis, close_redis, get_redis
+from app.core.compression import CompressionMiddleware
+from app.core.resilience import breaker_metrics, db_breaker
+from app.core.shedding import LoadSheddingMiddleware, loop_monitor, pool_monitor
+from app.core.profiling import ProfilingMiddleware, watchdog
+from app.core.config import settings
+from pymongo.errors import ConnectionFailure, ExecutionTimeout, ServerSelectionTimeoutError
 from contextlib import asynccontextmanager
 from fastapi.middleware.httpsredirect import HTTPSRedirectMiddleware
 
@@ -33,11 +38,36 @@ async def lifespan(app: FastAPI):
             await Category(**cat_data).insert()
         print("--> Seeding complete.")
 
+    # Backfill image_count for projects saved before the field existed
+    from app.models import Project
+    async for project in Project.find({"image_count": {"$exists": False}}):
+        await project.save()  # model validator recomputes image_count
+
+    # Embed category name/slug into products saved before those fields existed
+    from app.core.catalog import backfill_category_fields
+    await backfill_category_fields()
+
+    # Give a short order number to orders placed before numbers existed
+    from app.core.order_numbers import backfill_order_numbers
+    await backfill_order_numbers()
+
     await init_redis()
+    loop_monitor.start()
+    if settings.PROFILING_ENABLED:
+        if settings.PROFILING_TOKEN:
+            print("--> Profiling enabled: reporting event loop stalls, X-Profile requests are sampled")
+        else:
+            print("--> Profiling enabled: reporting event loop stalls; request profiling off (PROFILING_TOKEN not set)")
+        watchdog.start()
     yield
     # Cleanup tasks can be added here if needed
+    watchdog.stop()
+    await loop_monitor.stop()
+    await close_redis()
 
 app = FastAPI(lifespan=lifespan)
+# Innermost on purpose: it must run in the same task as the endpoint (see ProfilingMiddleware)
+app.add_middleware(ProfilingMiddleware)
 app.add_middleware(HTTPSRedirectMiddleware)
 
 # --- Middleware to limit upload size (Custom) ---
@@ -57,6 +87,9 @@ async def limit_upload_size(request: Request, call_next):
                 )
     return await call_next(request)
 
+# Reject new requests with 503 while overloaded (inside CORS so browsers can read the error)
+app.add_middleware(LoadSheddingMiddleware)
+
 # --- CORS Configuration ---
 
 origins = ["https://khang-viet-web-s2ra.vercel.app", "http://localhost:3000"]
@@ -69,11 +102,40 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-app.add_middleware(GZipMiddleware, minimum_size=1000) # Zip any files larger than 1 kB
+app.add_middleware(CompressionMiddleware) # brotli/gzip for responses larger than COMPRESSION_MINIMUM_SIZE
 
 for router in all_routers:
     app.include_router(router)
 
+# --- Database timeouts / outages: 503 instead of a 500 ---
+@app.exception_handler(ConnectionFailure)
+@app.exception_handler(ExecutionTimeout)
+async def database_unavailable(request: Request, exc: Exception):
+    # Failed commands are counted by the driver listener; no server at all is counted here
+    if isinstance(exc, ServerSelectionTimeoutError):
+        db_breaker.record_failure(exc)
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Database temporarily unavailable, please retry."},
+        headers={"Retry-After": "5"},
+    )
+
+# --- Health / degraded-mode metrics ---
+@app.get("/health")
+async def health():
+    breakers = breaker_metrics()
+    degraded = get_redis() is None or any(b["state"] != "closed" for b in breakers.values())
+    metrics = {
+        "status": "degraded" if degraded else "ok",
+        "redis_connected": get_redis() is not None,
+        "breakers": breakers,
+        "event_loop_lag_ms": round(loop_monitor.lag_ms, 1),
+        "db_pool": {"waiting": pool_monitor.waiting, "checked_out": pool_monitor.checked_out},
+    }
+    if settings.PROFILING_ENABLED:
+        metrics["event_loop_stalls"] = watchdog.metrics()
+    return metrics
+
 # --- Root Endpoint ---
 @app.get("/")
 async def read_root():
@@ -1,4 +1,4 @@
-from typing import Optional, List, Any
+from typing import Optional, List, Any, Dict
 from beanie import Document
 from pydantic import BaseModel, Field, ConfigDict, EmailStr, model_validator
 from datetime import datetime
@@ -22,6 +22,27 @@ class ProductOptionGroup(BaseModel):
     name: str
     choices: List[ProductOptionChoice] = []
 
+class VariantStock(BaseModel):
+    """ Stock of one option combination, key like 'Kích thước=Nhỏ|Màu sắc=Hồng' (see app/core/inventory.py) """
+    key: str
+    stock: int = Field(default=0, ge=0)
+
+# --- IMAGE RECORDS (computed on write, see app/core/images.py) ---
+
+class ImageVariant(BaseModel):
+    """ One responsive rendition of an image """
+    width: int
+    url: str
+
+class ImageAsset(BaseModel):
+    """ Everything the frontend needs to render an image without extra requests """
+    url: str
+    width: Optional[int] = None
+    height: Optional[int] = None
+    blur_data_url: Optional[str] = None
+    variants: List[ImageVariant] = []
+    srcset: str = ""
+
 # --- MAIN DOCUMENT MODELS ---
 
 class Product(Document):
@@ -33,6 +54,9 @@ class Product(Document):
     price: float = Field(..., description="Giá gốc của sản phẩm")
     category: Optional[str] = Field(default=None, description="Phân loại sản phẩm (e.g., 'Bảng hiệu', 'Hộp đèn')")
     category_id: Optional[str] = Field(default=None, description="ID của danh mục sản phẩm")
+    # Sao chép từ Category (theo category_id), worker cập nhật lại khi danh mục đổi tên
+    category_name: Optional[str] = Field(default=None, description="Tên danh mục (denormalized)")
+    category_slug: Optional[str] = Field(default=None, description="Slug danh mục (denormalized)")
     description: Optional[str] = None
     
     # Use the Enum for strict type validation
@@ -40,10 +64,18 @@ class Product(Document):
     
     # Switched to a list of images
     images: List[str] = Field(default=[], description="Danh sách URL hình ảnh. Ảnh đầu tiên là ảnh bìa.")
+    # Precomputed on write, same order as `images`
+    image_assets: List[ImageAsset] = Field(default=[], description="Kích thước, placeholder và srcset của từng ảnh")
     
     # Nested options for customizable products
     options: List[ProductOptionGroup] = Field(default=[], description="Các nhóm tùy chọn cho sản phẩm đặt làm")
     
+    # Tồn kho (chỉ cho hàng có sẵn). None = không theo dõi tồn kho
+    stock: Optional[int] = Field(default=None, ge=0, description="Số lượng tồn kho")
+    variant_stock: List[VariantStock] = Field(default=[], description="Tồn kho theo tổ hợp tùy chọn")
+    # Hàng bán chạy (flash sale): bộ đếm tồn kho nằm trên Redis, đồng bộ về MongoDB theo lô
+    hot_stock: bool = Field(default=False, description="Giữ bộ đếm tồn kho trên Redis")
+    
     # Legacy field support (Hidden from API output usually, but needed for reading from DB)
     image_url: Optional[str] = Field(default=None, description="Legacy string image URL", exclude=True)
 
@@ -57,6 +89,9 @@ class Product(Document):
     # Add slug for SEO-friendly URLs
     slug: str = Field(..., description="URL slug")
 
+    # Tăng mỗi lần cập nhật, dùng cho optimistic concurrency (If-Match)
+    revision: int = Field(default=0, description="Phiên bản của document")
+
     class Settings:
         name = "products"
         indexes = [
@@ -65,6 +100,8 @@ class Product(Document):
             "type",
             # Optimization indexes
             "category_id",
+            # Lọc sản phẩm theo slug danh mục (trang shop)
+            pymongo.IndexModel([("category_slug", pymongo.ASCENDING), ("_id", pymongo.DESCENDING)]),
             pymongo.IndexModel([("slug", pymongo.ASCENDING)], unique=True),
         ]
 
@@ -111,7 +148,9 @@ class CustomerInfo(BaseModel):
 
 class OrderRequestItem(BaseModel):
     product_id: str
-    quantity: int
+    quantity: int = Field(..., gt=0)
+    # Tùy chọn đã chọn: {tên nhóm: nhãn lựa chọn}
+    options: Dict[str, str] = {}
 
 class CreateOrderRequest(BaseModel):
     customer_info: CustomerInfo
@@ -126,9 +165,32 @@ class OrderItem(BaseModel):
     # QUAN TRỌNG: Lưu giá và số lượng tại thời điểm chốt đơn (Snapshot)
     quantity: int = Field(..., gt=0)
     price_at_purchase: float = Field(..., gt=0)
+    options: Dict[str, str] = {}
+
+# --- GIỮ HÀNG (tồn kho) CHO ĐƠN HÀNG ---
+class StockLine(BaseModel):
+    product_id: str
+    variant_key: str = ""
+    quantity: int
+    # True nếu bộ đếm nằm trên Redis (hot_stock)
+    hot: bool = False
+
+class ReservationStatus(str, Enum):
+    ACTIVE = "active"        # Đang giữ hàng
+    COMMITTED = "committed"  # Đơn đã được xác nhận
+    RELEASED = "released"    # Đơn bị hủy, đã trả hàng về kho
+    EXPIRED = "expired"      # Quá hạn, đã trả hàng về kho
+
+class StockReservation(BaseModel):
+    lines: List[StockLine] = []
+    status: ReservationStatus = ReservationStatus.ACTIVE
+    expires_at: datetime
 
 # --- SCHEMA CHÍNH ĐẠI DIỆN ĐƠN HÀNG ---
 class Order(Document):
+    # Số đơn ngắn để tra cứu qua điện thoại (xem app/core/order_numbers.py)
+    number: Optional[int] = None
+
     # Thông tin khách hàng (Không cần bảng riêng vì khách lẻ)
     customer_name: str
     customer_phone: str
@@ -149,10 +211,24 @@ class Order(Document):
     # Timestamps
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
+    # Set by the worker once side effects (thông báo, thống kê) are done
+    processed_at: Optional[datetime] = None
+    # Hàng được giữ cho đơn (None nếu không có sản phẩm nào theo dõi tồn kho)
+    reservation: Optional[StockReservation] = None
     
     class Settings:
         name = "orders"
         indexes = [
+            # Số đơn là duy nhất; đơn cũ chưa có số (null) không nằm trong index
+            pymongo.IndexModel(
+                [("number", pymongo.ASCENDING)],
+                unique=True,
+                partialFilterExpression={"number": {"$gt": 0}},
+            ),
+            # Index để worker tìm các lượt giữ hàng đã hết hạn
+            pymongo.IndexModel([("reservation.status", pymongo.ASCENDING), ("reservation.expires_at", pymongo.ASCENDING)]),
+            # Index để worker tìm nhanh các đơn chưa xử lý
+            pymongo.IndexModel([("processed_at", pymongo.ASCENDING), ("created_at", pymongo.ASCENDING)]),
             # Index để tìm kiếm nhanh theo tên và số điện thoại
             pymongo.IndexModel([("customer_name", pymongo.ASCENDING)]),
             pymongo.IndexModel([("customer_phone", pymongo.ASCENDING)]),
@@ -166,6 +242,7 @@ class Category(Document):
     """
     name: str = Field(..., description="Tên danh mục")
     slug: str = Field(..., description="Slug URL")
+    revision: int = Field(default=0, description="Phiên bản của document")
 
     class Settings:
         name = "categories"
@@ -201,7 +278,17 @@ class Project(Document):
     
     # Đây là chỗ chứa danh sách link ảnh
     image_urls: List[str] = [] 
+    # Số lượng ảnh, lưu sẵn để trang danh sách không phải tải cả mảng image_urls
+    image_count: int = 0
+    # Precomputed on write, same order as `image_urls`
+    image_assets: List[ImageAsset] = []
     is_featured: bool = False
+    revision: int = 0
+
+    @model_validator(mode='after')
+    def sync_image_count(self) -> 'Project':
+        self.image_count = len(self.image_urls)
+        return self
     
     class Settings:
         name = "projects"
@@ -212,6 +299,43 @@ class Project(Document):
             "name",
         ]
 
+# 3. Materialized view cho trang dự án (featured / theo công ty)
+class ProjectViewItem(BaseModel):
+    """ Denormalized project card stored inside a ProjectListView """
+    id: str = Field(..., alias="_id")
+    name: str
+    slug: str
+    company_slug: str
+    company_name: Optional[str] = None
+    company_logo_url: Optional[str] = None
+    address: Optional[str] = None
+    completion_date: Optional[datetime] = None
+    image_urls: List[str] = []
+    cover_asset: Optional[ImageAsset] = None
+    is_featured: bool = False
+
+    model_config = ConfigDict(populate_by_name=True)
+
+class ProjectListView(Document):
+    """
+    Precomputed project list for one page: the featured list or one company.
+    Rebuilt on project/company writes so a page is a single lookup by `key`.
+    """
+    key: str           # "featured" hoặc "company:<slug>"
+    company_slug: Optional[str] = None
+    company_name: Optional[str] = None
+    company_logo_url: Optional[str] = None
+    projects: List[ProjectViewItem] = []
+    # Tăng mỗi lần rebuild, dùng làm cache key / ETag
+    version: int = 0
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+    class Settings:
+        name = "project_views"
+        indexes = [
+            pymongo.IndexModel([("key", pymongo.ASCENDING)], unique=True),
+        ]
+
 class User(Document):
     email: EmailStr
     hashed_password: str
@@ -229,4 +353,4 @@ class User(Document):
                 "role": "admin"
             }
         }
-    )
\ No newline at end of file
+    )
@@ -4,6 +4,8 @@ from .products import router as products_router
 from .companies import router as companies_router
 from .orders import router as orders_router
 from .categories import router as categories_router
+from .catalog import router as catalog_router
+from .batch import router as batch_router
 
 # Tạo một list chứa tất cả
-all_routers = [users_router, projects_router, products_router, companies_router, orders_router, categories_router]
\ No newline at end of file
+all_routers = [users_router, projects_router, products_router, companies_router, orders_router, categories_router, catalog_router, batch_router]
\ No newline at end of file
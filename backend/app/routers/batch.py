@@ -0,0 +1,146 @@
+import asyncio
+import json
+from typing import Any, Awaitable, Callable, Dict, List, NamedTuple, Optional, Tuple, Type
+from beanie import PydanticObjectId
+from fastapi import APIRouter, HTTPException, Response
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel, ConfigDict, Field, ValidationError
+from pymongo.errors import ConnectionFailure, ExecutionTimeout, ServerSelectionTimeoutError
+from starlette.requests import Request
+from app.core.config import settings
+from app.core.resilience import db_breaker
+from app.routers import categories, companies, products, projects
+
+# --------------------------
+# --- BATCH READS ---
+# --------------------------
+# Lets server-side rendering fetch everything a page needs in one round trip.
+# Only whitelisted read operations can be batched; each one runs the same
+# handler as its GET endpoint (same caches, same read routing).
+router = APIRouter(
+    tags=["batch"]
+)
+
+
+class NoParams(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+
+class ProductsParams(NoParams):
+    ids: Optional[str] = None
+    category_slug: Optional[str] = None
+
+class ProductParams(NoParams):
+    product_id: PydanticObjectId
+
+class ProjectsParams(NoParams):
+    company_slug: Optional[str] = None
+    page: int = Field(1, ge=1)
+    page_size: int = Field(projects.DEFAULT_PAGE_SIZE, ge=1, le=projects.MAX_PAGE_SIZE)
+
+class ProjectParams(NoParams):
+    slug: str
+
+class CompanyProjectsParams(NoParams):
+    company_slug: str
+
+
+class Operation(NamedTuple):
+    handler: Callable[..., Awaitable[Any]]
+    params: Type[BaseModel]
+    # Whether the handler takes the request (for ETag / compression negotiation)
+    needs_request: bool = False
+
+
+OPERATIONS: Dict[str, Operation] = {
+    "products": Operation(products.get_products, ProductsParams),
+    "product": Operation(products.get_product, ProductParams),
+    "categories": Operation(categories.get_categories, NoParams),
+    "companies": Operation(companies.get_companies, NoParams),
+    "company_projects": Operation(companies.get_projects_by_company, CompanyProjectsParams, needs_request=True),
+    "projects": Operation(projects.get_projects, ProjectsParams, needs_request=True),
+    "project": Operation(projects.get_project, ProjectParams),
+    "featured_projects": Operation(projects.get_featured_projects, NoParams, needs_request=True),
+}
+
+
+class BatchOperation(BaseModel):
+    id: str = Field(..., min_length=1, max_length=64)
+    op: str
+    params: Dict[str, Any] = {}
+
+class BatchRequest(BaseModel):
+    operations: List[BatchOperation] = Field(..., min_length=1, max_length=settings.BATCH_MAX_OPERATIONS)
+
+class BatchResult(BaseModel):
+    status: int
+    body: Any = None
+
+class BatchResponse(BaseModel):
+    results: Dict[str, BatchResult]
+
+
+def _internal_request() -> Request:
+    """
+    Request handed to handlers that want one: no Accept-Encoding and no
+    If-None-Match, so they answer with a plain JSON body (the batch response
+    as a whole is compressed by the middleware).
+    """
+    return Request({"type": "http", "method": "GET", "path": "/batch", "query_string": b"", "headers": []})
+
+
+async def _run(name: str, params: BaseModel) -> BatchResult:
+    operation = OPERATIONS[name]
+    kwargs = dict(params)
+    if operation.needs_request:
+        kwargs["request"] = _internal_request()
+    try:
+        result = await operation.handler(**kwargs)
+    except HTTPException as e:
+        return BatchResult(status=e.status_code, body={"detail": e.detail})
+    # Same answers as the app's exception handlers, but for this operation only
+    except (ConnectionFailure, ExecutionTimeout) as e:
+        if isinstance(e, ServerSelectionTimeoutError):
+            db_breaker.record_failure(e)
+        return BatchResult(status=503, body={"detail": "Database temporarily unavailable, please retry."})
+    except Exception as e:
+        print(f"--> Batch operation '{name}' failed: {e!r}")
+        return BatchResult(status=500, body={"detail": "Internal Server Error"})
+
+    if isinstance(result, Response):
+        return BatchResult(status=result.status_code, body=json.loads(result.body) if result.body else None)
+    return BatchResult(status=200, body=jsonable_encoder(result))
+
+
+@router.post("/batch", response_model=BatchResponse)
+async def batch(request: BatchRequest):
+    """
+    Run several read operations concurrently and return all results, keyed
+    by the operation id. Identical operations in one batch run only once.
+    A failing operation (404, bad params, database down, unexpected error)
+    gets its own status; the others still succeed.
+    """
+    ids = [o.id for o in request.operations]
+    if len(set(ids)) != len(ids):
+        raise HTTPException(status_code=400, detail="Operation ids must be unique.")
+    unknown = sorted({o.op for o in request.operations} - OPERATIONS.keys())
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown operation(s) {unknown}, expected one of {sorted(OPERATIONS)}.")
+
+    # Shared by all operations of the batch: (op, params) -> running task
+    memo: Dict[Tuple[str, str], "asyncio.Task[BatchResult]"] = {}
+    tasks: Dict[str, Awaitable[BatchResult]] = {}
+    results: Dict[str, BatchResult] = {}
+    for operation in request.operations:
+        try:
+            params = OPERATIONS[operation.op].params(**operation.params)
+        except ValidationError as e:
+            results[operation.id] = BatchResult(status=422, body={"detail": jsonable_encoder(e.errors(include_url=False))})
+            continue
+        key = (operation.op, params.model_dump_json())
+        if key not in memo:
+            memo[key] = asyncio.ensure_future(_run(operation.op, params))
+        tasks[operation.id] = memo[key]
+
+    for op_id, result in zip(tasks, await asyncio.gather(*tasks.values())):
+        results[op_id] = result
+    return BatchResponse(results={op_id: results[op_id] for op_id in ids})
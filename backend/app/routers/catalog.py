@@ -0,0 +1,62 @@
+import asyncio
+import hashlib
+import re
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Request, Response
+from app.core.compression import negotiate_encoding
+from app.core.snapshots import MANIFEST_KEY, RENDERERS, shard_key, store
+
+# --------------------------
+# --- CATALOG SNAPSHOTS ---
+# --------------------------
+# Serves the snapshot store when no CDN/bucket is configured (SNAPSHOT_BASE_URL
+# empty). The manifest is short-lived; shards are content-addressed, so they
+# are cached forever.
+router = APIRouter(
+    prefix="/catalog",
+    tags=["catalog"]
+)
+
+VERSION_FILE = re.compile(r"^([0-9a-f]{16})\.json$")
+
+
+@router.get("/manifest.json")
+async def get_manifest(request: Request):
+    """Current version and URL of every catalog shard."""
+    body = await asyncio.to_thread(store.get, MANIFEST_KEY)
+    if body is None:
+        raise HTTPException(status_code=404, detail="Catalog snapshot not generated yet.")
+
+    etag = f'"{hashlib.blake2b(body, digest_size=8).hexdigest()}"'
+    headers = {"ETag": etag, "Cache-Control": "public, max-age=30, stale-while-revalidate=300"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+@router.get("/{shard}/{filename}")
+async def get_shard(request: Request, shard: str, filename: str):
+    """One version of a shard, precompressed as negotiated with Accept-Encoding."""
+    match = VERSION_FILE.match(filename)
+    if shard not in RENDERERS or not match:
+        raise HTTPException(status_code=404, detail="Snapshot not found.")
+    version = match.group(1)
+
+    encoding: Optional[str] = negotiate_encoding(request.headers.get("accept-encoding", ""))
+    body = await asyncio.to_thread(store.get, shard_key(shard, version, encoding)) if encoding else None
+    if body is None:
+        encoding = None
+        body = await asyncio.to_thread(store.get, shard_key(shard, version))
+    if body is None:
+        raise HTTPException(status_code=404, detail="Snapshot not found.")
+
+    headers = {
+        "ETag": f'"{version}"',
+        "Cache-Control": "public, max-age=31536000, immutable",
+        "Vary": "Accept-Encoding",
+    }
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    if request.headers.get("if-none-match") == headers["ETag"]:
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
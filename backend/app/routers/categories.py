@@ -1,8 +1,13 @@
 from typing import List, Optional
-from fastapi import APIRouter, HTTPException, Body
+from fastapi import APIRouter, HTTPException, Body, Header, Response
+from pymongo.errors import DuplicateKeyError
 from beanie import PydanticObjectId
 from pydantic import BaseModel, Field
 from app.models import Category, Product
+from app.core.updates import atomic_update, parse_if_match, revision_etag
+from app.core.read_routing import CATALOG, read_many, routed_collection
+from app.core.catalog import category_changed
+from app.core.snapshots import CATEGORIES, mark_changed
 
 router = APIRouter(
     prefix="/categories",
@@ -16,19 +21,18 @@ class CategoryUpdate(BaseModel):
     name: Optional[str] = None
     slug: Optional[str] = None
 
-@router.get("/", response_model=List[CategoryResponse])
-async def get_categories():
-    """Retrieve all categories with product counts."""
-    categories = await Category.find_all().to_list()
+async def list_categories(route: str = CATALOG) -> List[CategoryResponse]:
+    """All categories with product counts, read through `route`."""
+    categories = await read_many(Category, route)
     
     # Retrieve all products to count categories manually
     # (Avoids AsyncIOMotorLatentCommandCursor error in some Beanie/Motor versions)
-    products = await Product.find_all().to_list()
+    # Only category_id is needed, so only that field is transferred
+    products = routed_collection(Product, route).find({"category_id": {"$ne": None}}, {"category_id": 1})
     
     from collections import Counter
     # Count products by category_id
-    # Ensure p.category_id is not None
-    counts = Counter(p.category_id for p in products if p.category_id)
+    counts = Counter([p["category_id"] async for p in products])
     
     result = []
     for cat in categories:
@@ -42,6 +46,11 @@ async def get_categories():
         )
     return result
 
+@router.get("/", response_model=List[CategoryResponse])
+async def get_categories():
+    """Retrieve all categories with product counts."""
+    return await list_categories()
+
 @router.post("/", response_model=Category, status_code=201)
 async def create_category(category: Category):
     """Create a new category."""
@@ -50,26 +59,37 @@ async def create_category(category: Category):
     if existing:
         raise HTTPException(status_code=400, detail="Slug already exists.")
     await category.insert()
+    await mark_changed(CATEGORIES)
     return category
 
 @router.put("/{category_id}", response_model=Category)
-async def update_category(category_id: PydanticObjectId, update_data: CategoryUpdate):
-    """Update a category."""
-    category = await Category.get(category_id)
-    if not category:
-        raise HTTPException(status_code=404, detail="Category not found.")
-    
-    # If updating slug, check uniqueness
-    if update_data.slug and update_data.slug != category.slug:
-        existing = await Category.find_one(Category.slug == update_data.slug)
-        if existing:
-            raise HTTPException(status_code=400, detail="Slug already exists.")
-            
+async def update_category(
+    category_id: PydanticObjectId,
+    update_data: CategoryUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(None),
+):
+    """
+    Update a category in one atomic $set.
+    Send the current revision in If-Match to reject stale updates.
+    A new name or slug is copied into the category's products in the background.
+    """
     updates = update_data.model_dump(exclude_unset=True)
-    for k, v in updates.items():
-        setattr(category, k, v)
-    
-    await category.save()
+
+    # Slug uniqueness is enforced by the unique index instead of a pre-read
+    try:
+        category = await atomic_update(
+            Category, category_id, updates,
+            expected_revision=parse_if_match(if_match),
+            not_found_detail="Category not found.",
+        )
+    except DuplicateKeyError:
+        raise HTTPException(status_code=400, detail="Slug already exists.")
+
+    if {"name", "slug"} & updates.keys():
+        await category_changed(str(category_id))
+    await mark_changed(CATEGORIES)
+    response.headers["ETag"] = revision_etag(category.revision)
     return category
 
 @router.delete("/{category_id}", status_code=204)
@@ -86,4 +106,5 @@ async def delete_category(category_id: PydanticObjectId):
         raise HTTPException(status_code=400, detail=f"Cannot delete. There are {product_count} products in this category.")
         
     await category.delete()
+    await mark_changed(CATEGORIES)
     return None
@@ -1,6 +1,9 @@
 from typing import List
-from fastapi import APIRouter, HTTPException
-from app.models import Company, Project
+from fastapi import APIRouter, HTTPException, Request
+from app.models import Company, ProjectViewItem
+from app.core.project_views import get_company_view, rebuild_company_view, view_response
+from app.core.read_routing import CATALOG, read_many
+from app.core.snapshots import COMPANIES, mark_changed
 
 # --------------------------
 # --- COMPANY API ENDPOINTS ---
@@ -15,7 +18,7 @@ router = APIRouter(    # Tự động thêm /projects vào trước mọi API tr
 @router.get("/companies", response_model=List[Company])
 async def get_companies():
     """Retrieve all companies."""
-    companies = await Company.find_all().to_list()
+    companies = await read_many(Company, CATALOG)
     return companies
 
 @router.post("/companies", status_code=201)
@@ -26,13 +29,17 @@ async def create_company(company: Company):
         raise HTTPException(status_code=400, detail="Company slug already exists.")
     
     await company.create()
+    await rebuild_company_view(company.slug)
+    await mark_changed(COMPANIES)
     return {"message": "Company created successfully", "id": str(company.id)}
 
-@router.get("/companies/{company_slug}/projects", response_model=List[Project])
-async def get_projects_by_company(company_slug: str):
+@router.get("/companies/{company_slug}/projects", response_model=List[ProjectViewItem])
+async def get_projects_by_company(request: Request, company_slug: str):
     """Get all projects associated with a specific company slug."""
-    if not await Company.find_one(Company.slug == company_slug):
+    # Single read of the materialized view (company existence is implied by the view)
+    view = await get_company_view(company_slug)
+    if view is None:
         raise HTTPException(status_code=404, detail="Company not found.")
-        
-    projects = await Project.find(Project.company_slug == company_slug).to_list()
-    return projects
\ No newline at end of file
+
+    items = [p.model_dump(by_alias=True, mode="json") for p in view.projects]
+    return await view_response(request, view, items)
\ No newline at end of file
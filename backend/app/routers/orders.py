@@ -1,57 +1,146 @@
-from typing import List, Optional
-from fastapi import APIRouter, Query, HTTPException
-from app.models import Order, CreateOrderRequest, Product, OrderItem
+from typing import Dict, List, Literal, Optional
+from fastapi import APIRouter, Depends, Path, Query, HTTPException, Header
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from app.models import Order, CreateOrderRequest, Product, OrderItem, ReservationStatus
+from app.core.config import settings
+from app.core.events import publish_event
+from app.core import idempotency, inventory
+from app.core.order_numbers import next_order_number, parse_order_number
+from app.core.ratelimit import RateLimit
+from app.core.read_routing import CHECKOUT, read_many
+from beanie import PydanticObjectId
+from beanie.odm.operators.update.general import Set
+from beanie.odm.queries.update import UpdateResponse
+from datetime import datetime
+from bson.errors import InvalidId
 
 router = APIRouter(
     prefix="/orders",    # Tự động thêm /orders vào trước mọi API trong file này
     tags=["orders"]
 )
 
-# ... (rest of the file)
+OrderStatus = Literal["pending", "processing", "ready", "completed", "cancelled"]
 
-@router.post("/", response_model=Order, status_code=201)
-async def create_order(request: CreateOrderRequest):
+class UpdateOrderStatusModel(BaseModel):
+    status: OrderStatus
+
+def option_price(product: Product, options: Dict[str, str]) -> float:
+    """Price modifier of the chosen options; 400 if one does not exist on the product."""
+    groups = {g.name: g for g in product.options}
+    modifier = 0.0
+    for name, label in options.items():
+        choice = next((c for c in groups[name].choices if c.label == label), None) if name in groups else None
+        if choice is None:
+            raise HTTPException(status_code=400, detail=f"Invalid option for {product.name}: {name}={label}")
+        modifier += choice.price_modifier
+    return modifier
+
+@router.post(
+    "/", response_model=Order, status_code=201,
+    dependencies=[Depends(RateLimit("orders", settings.RATE_LIMIT_ORDERS))],
+)
+async def create_order(
+    request: CreateOrderRequest,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+):
     """
     Create a new order from a customer request.
+    With an Idempotency-Key header, retries and concurrent duplicates of the
+    same checkout get the first response back instead of a new order.
+    """
+    if not idempotency_key:
+        return await place_order(request)
+
+    request_fingerprint = idempotency.fingerprint(request.model_dump_json())
+    stored = await idempotency.begin("orders", idempotency_key, request_fingerprint)
+    if stored is not None:
+        return JSONResponse(
+            status_code=stored.status_code,
+            content=stored.body,
+            headers={"Idempotent-Replayed": "true"},
+        )
+
+    try:
+        order = await place_order(request)
+    except BaseException:
+        await idempotency.abort("orders", idempotency_key)
+        raise
+    await idempotency.complete("orders", idempotency_key, request_fingerprint, 201, jsonable_encoder(order))
+    return order
+
+async def place_order(request: CreateOrderRequest) -> Order:
+    """
+    Validate the request against current products and insert the order.
     Fetches product details to ensure valid prices and data.
+    Stock of tracked products is reserved before the insert (409 if short).
+    Side effects (notifications, analytics) run in the worker: this only
+    inserts the order and enqueues an `order.created` event.
     """
     order_items = []
     total_amount = 0.0
 
-    # 1. Validate and fetch products
+    # 1. Validate and fetch all products in one query
+    try:
+        product_ids = [PydanticObjectId(item.product_id) for item in request.items]
+    except InvalidId:
+        raise HTTPException(status_code=404, detail="Product not found.")
+    # Prices and stock decide the order: read them from the primary
+    products = await read_many(Product, CHECKOUT, {"_id": {"$in": product_ids}})
+    products_by_id = {str(p.id): p for p in products}
+
     for item_req in request.items:
-        product = await Product.get(item_req.product_id)
+        product = products_by_id.get(item_req.product_id)
         if not product:
             raise HTTPException(status_code=404, detail=f"Product not found: {item_req.product_id}")
         
         # Create OrderItem snapshot
+        price = product.price + option_price(product, item_req.options)
         order_item = OrderItem(
             product_name=product.name,
             product_id=str(product.id),
             quantity=item_req.quantity,
-            price_at_purchase=product.price
+            price_at_purchase=price,
+            options=item_req.options,
         )
         order_items.append(order_item)
-        total_amount += product.price * item_req.quantity
-
-    # 2. Create Order document
-    new_order = Order(
-        customer_name=request.customer_info.name,
-        customer_phone=request.customer_info.phone,
-        customer_email=request.customer_info.email,
-        customer_address=request.customer_info.address,
-        items=order_items,
-        total_amount=total_amount,
-        status="pending"
-    )
-    
-    await new_order.insert()
+        total_amount += price * item_req.quantity
+
+    # Numbered before the stock is taken: a failing counter must not strand a
+    # reservation, and a number lost to a 409 is just a gap
+    number = await next_order_number()
+
+    # 2. Take the stock (all lines or none)
+    reservation = await inventory.reserve(order_items, products_by_id)
+
+    # 3. Create Order document
+    try:
+        new_order = Order(
+            number=number,
+            customer_name=request.customer_info.name,
+            customer_phone=request.customer_info.phone,
+            customer_email=request.customer_info.email,
+            customer_address=request.customer_info.address,
+            items=order_items,
+            total_amount=total_amount,
+            status="pending",
+            reservation=reservation,
+        )
+        await new_order.insert()
+    except BaseException:
+        if reservation is not None:
+            await inventory.release(reservation)
+        raise
+
+    # 4. Hand the side effects to the worker (never fails the checkout)
+    await publish_event(settings.ORDER_EVENTS_STREAM, "order.created", {"order_id": str(new_order.id)})
     return new_order
 
 @router.get("/", response_model=List[Order])
 async def get_all_orders(
     status: Optional[str] = Query(None, description="Filter orders by status"),
-    search: Optional[str] = Query(None, description="Search by customer name or phone number")
+    search: Optional[str] = Query(None, description="Search by order number (#1042), customer name or phone number")
 ):
     """Retrieve all orders with optional filtering."""
     query_filter = {}
@@ -59,11 +148,66 @@ async def get_all_orders(
     if status:
         query_filter["status"] = status
         
-    if search:
+    number = parse_order_number(search) if search else None
+    if search and search.strip().startswith("#") and number:
+        # Explicit order number: exact match on the unique index, no scan
+        query_filter["number"] = number
+    elif search:
         query_filter["$or"] = [
             {"customer_name": {"$regex": search, "$options": "i"}},
             {"customer_phone": {"$regex": search, "$options": "i"}}
         ]
+        if number:
+            query_filter["$or"].append({"number": number})
         
     orders = await Order.find(query_filter).to_list()
-    return orders
\ No newline at end of file
+    return orders
+
+@router.get("/by-number/{number}", response_model=Order)
+async def get_order_by_number(number: int = Path(..., ge=1)):
+    """Look up one order by its short number (unique index, no scan)."""
+    order = await Order.find_one({"number": number})
+    if order is None:
+        raise HTTPException(status_code=404, detail="Order not found.")
+    return order
+
+@router.patch("/{order_id}", response_model=Order)
+async def update_order_status(order_id: PydanticObjectId, update: UpdateOrderStatusModel):
+    """
+    Change the status of an order.
+    Moving a pending order forward confirms its stock reservation (taking
+    the stock again if the hold expired, 409 if it is gone); cancelling
+    gives the reserved stock back. A cancelled order cannot be reopened.
+    """
+    order = await Order.get(order_id)
+    if order is None:
+        raise HTTPException(status_code=404, detail="Order not found.")
+    if order.status == "cancelled" and update.status != "cancelled":
+        raise HTTPException(status_code=409, detail="A cancelled order cannot be reopened.")
+
+    reclaimed = False
+    if (update.status not in ("pending", "cancelled") and order.reservation
+            and order.reservation.status == ReservationStatus.EXPIRED):
+        reclaimed = await inventory.reclaim_expired(order_id)
+
+    # Conditional: an order cancelled meanwhile stays cancelled
+    query = Order.find_one(Order.id == order_id)
+    if update.status != "cancelled":
+        query = Order.find_one(Order.id == order_id, Order.status != "cancelled")
+    order = await query.update(
+        Set({"status": update.status, "updated_at": datetime.utcnow()}),
+        response_type=UpdateResponse.NEW_DOCUMENT,
+    )
+    if order is None:
+        if reclaimed:
+            await inventory.finish_reservation(order_id, ReservationStatus.RELEASED, current=(ReservationStatus.COMMITTED,))
+        raise HTTPException(status_code=409, detail="A cancelled order cannot be reopened.")
+
+    if update.status == "cancelled":
+        await inventory.finish_reservation(
+            order_id, ReservationStatus.RELEASED,
+            current=(ReservationStatus.ACTIVE, ReservationStatus.COMMITTED),
+        )
+    elif update.status != "pending":
+        await inventory.finish_reservation(order_id, ReservationStatus.COMMITTED)
+    return await Order.get(order_id)
@@ -1,8 +1,15 @@
 from typing import List, Optional
-from fastapi import HTTPException, APIRouter
-from app.models import Product, ProductType, ProductOptionGroup
+from fastapi import HTTPException, APIRouter, Header, Query, Response
+from app.models import Product, ProductType, ProductOptionGroup, VariantStock
+from app.core.inventory import drop_hot_counters, flush_hot_counters, normalize_variant_stock
+from app.core.redis import clear_cache, get_cache_many, set_cache_many
+from app.core.read_routing import CACHE_FILL, CATALOG, read_many
+from app.core.catalog import resolve_category_fields
+from app.core.snapshots import CATEGORIES, PRODUCTS, mark_changed
+from app.core.images import build_image_assets, existing_image_assets
+from app.core.updates import atomic_update, parse_if_match, revision_etag
 from beanie import PydanticObjectId
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 router = APIRouter(
     prefix="/products",
@@ -19,44 +26,125 @@ class UpdateProductModel(BaseModel):
     type: Optional[ProductType] = None
     images: Optional[List[str]] = None
     options: Optional[List[ProductOptionGroup]] = None
+    stock: Optional[int] = Field(default=None, ge=0)
+    variant_stock: Optional[List[VariantStock]] = None
+    hot_stock: Optional[bool] = None
 
 # --------------------------
 # --- PRODUCT API ENDPOINTS ---
 # --------------------------
 
+# Short TTL: cached details include stock, which orders change without
+# invalidating (the authoritative check happens when stock is reserved)
+PRODUCT_CACHE_TTL = 60
+
+def _product_key(product_id) -> str:
+    return f"product:{product_id}"
+
+async def get_products_by_ids(ids: List[str]) -> List[Product]:
+    """
+    Product details for many ids: one MGET for the cached ones, one $in query
+    for the rest, one pipelined write to cache them. Unknown ids are skipped.
+    """
+    ids = list(dict.fromkeys(ids))
+    cached = await get_cache_many([_product_key(i) for i in ids])
+    found = {i: Product.model_validate(c) for i, c in zip(ids, cached) if c}
+
+    missing = [PydanticObjectId(i) for i in ids if i not in found and PydanticObjectId.is_valid(i)]
+    if missing:
+        fetched = await read_many(Product, CACHE_FILL, {"_id": {"$in": missing}})
+        found.update((str(p.id), p) for p in fetched)
+        await set_cache_many({_product_key(p.id): p.model_dump(mode="json") for p in fetched}, PRODUCT_CACHE_TTL)
+    return [found[i] for i in ids if i in found]
+
 @router.get("/", response_model=List[Product])
-async def get_products():
-    """Retrieve all products from the database."""
-    products = await Product.find_all().to_list()
+async def get_products(
+    ids: Optional[str] = Query(None, description="Comma-separated product ids"),
+    category_slug: Optional[str] = Query(None, description="Only products of this category"),
+):
+    """Retrieve all products, only the given ids (e.g. the items of a cart), or one category."""
+    if ids:
+        return await get_products_by_ids([i.strip() for i in ids.split(",") if i.strip()])
+    query = {"category_slug": category_slug} if category_slug else {}
+    products = await read_many(Product, CATALOG, query)
     return products
 
 @router.get("/{product_id}", response_model=Product)
 async def get_product(product_id: PydanticObjectId):
     """Retrieve a single product by its ID."""
-    product = await Product.get(product_id)
-    if not product:
+    products = await get_products_by_ids([str(product_id)])
+    if not products:
         raise HTTPException(status_code=404, detail="Product not found.")
-    return product
+    return products[0]
 
 @router.post("/", response_model=Product, status_code=201)
 async def create_product(product: Product):
     """Create a new product with the complex structure."""
+    if product.category_id:
+        for field, value in (await resolve_category_fields(product.category_id)).items():
+            setattr(product, field, value)
+    product.variant_stock = normalize_variant_stock(product.variant_stock, product.options)
+    product.image_assets = await build_image_assets(product.images)
     await product.insert()
+    # Category snapshots carry product counts
+    await mark_changed(PRODUCTS, CATEGORIES)
     return product
 
 @router.put("/{product_id}", response_model=Product)
-async def update_product(product_id: PydanticObjectId, product_update: UpdateProductModel):
-    """Update an existing product."""
-    product = await Product.get(product_id)
-    if not product:
-        raise HTTPException(status_code=404, detail="Product not found.")
-
+async def update_product(
+    product_id: PydanticObjectId,
+    product_update: UpdateProductModel,
+    response: Response,
+    if_match: Optional[str] = Header(None),
+):
+    """
+    Update an existing product.
+    Only the sent fields are written, in one atomic $set. Send the current
+    revision in If-Match to reject the update if someone else changed it.
+    """
     update_data = product_update.model_dump(exclude_unset=True)
-    
-    for key, value in update_data.items():
-        setattr(product, key, value)
-        
-    await product.save()
+
+    # Category name/slug are embedded in the product
+    if "category_id" in update_data:
+        update_data.update(await resolve_category_fields(update_data["category_id"]))
+
+    # Image records are computed only for URLs that were not there before
+    if "images" in update_data:
+        existing = await existing_image_assets(Product, product_id)
+        update_data["image_assets"] = await build_image_assets(update_data["images"], existing)
+
+    stock_edit = {"stock", "variant_stock", "hot_stock"} & update_data.keys()
+    variant_edit = {"options", "variant_stock"} & update_data.keys()
+    current = None
+    if stock_edit or variant_edit:
+        current = await Product.get(product_id)
+        if not current:
+            raise HTTPException(status_code=404, detail="Product not found.")
+
+    # Variant keys must stay valid combinations of the (possibly new) options
+    if variant_edit:
+        variant_stock = normalize_variant_stock(
+            update_data.get("variant_stock", current.variant_stock) or [],
+            update_data.get("options", current.options) or [],
+        )
+        if "variant_stock" in update_data:
+            update_data["variant_stock"] = [v.model_dump() for v in variant_stock]
+
+    # Hot products count stock in Redis: keep the live numbers when only the
+    # flag changes, and drop the counters so they re-seed from the new values
+    if stock_edit and current.hot_stock and not {"stock", "variant_stock"} & stock_edit:
+        await flush_hot_counters(current)
+
+    product = await atomic_update(
+        Product, product_id, update_data,
+        expected_revision=parse_if_match(if_match),
+        not_found_detail="Product not found.",
+    )
+    if stock_edit:
+        await drop_hot_counters(current, product)
+    await clear_cache(_product_key(product_id))
+    await mark_changed(PRODUCTS, CATEGORIES)
+    response.headers["ETag"] = revision_etag(product.revision)
     return product
 
 @router.delete("/{product_id}", status_code=204)
@@ -67,4 +155,8 @@ async def delete_product(product_id: PydanticObjectId):
         raise HTTPException(status_code=404, detail="Product not found.")
     
     await product.delete()
+    await clear_cache(_product_key(product_id))
+    if product.hot_stock:
+        await drop_hot_counters(product)
+    await mark_changed(PRODUCTS, CATEGORIES)
     return None # No content response
\ No newline at end of file
@@ -1,7 +1,9 @@
-from typing import List, Optional
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
-from app.models import Project, Company
+from typing import Any, List, Optional
+from fastapi import APIRouter, HTTPException, Query, Header, Response
+from pydantic import BaseModel, ConfigDict, Field, model_validator
+from app.models import Project, Company, ImageAsset
+from app.core.images import build_image_assets, existing_image_assets
+from app.core.updates import atomic_update, parse_if_match, revision_etag
 from beanie import PydanticObjectId
 from datetime import datetime
 
@@ -31,37 +33,161 @@ class FeaturedProjectResponse(BaseModel):
     slug: str
     address: Optional[str]
     company_slug: str
+    company_name: Optional[str] = None
+    company_logo_url: Optional[str] = None
     image_urls: List[str]
+    cover_asset: Optional[ImageAsset] = None
 
-@router.get("/featured", response_model=List[FeaturedProjectResponse])
-async def get_featured_projects():
-    """Retrieve up to 6 featured projects."""
-    projects = await Project.find(Project.is_featured == True).limit(6).to_list()
-    return projects
+# Listing item: only the cover image and the number of images are sent
+class ProjectSummary(BaseModel):
+    id: PydanticObjectId = Field(..., alias="_id")
+    name: str
+    slug: str
+    company_slug: str
+    address: Optional[str] = None
+    completion_date: Optional[datetime] = None
+    is_featured: bool = False
+    cover_image: Optional[str] = None
+    cover_asset: Optional[ImageAsset] = None
+    image_count: int = 0
+
+    model_config = ConfigDict(populate_by_name=True)
+
+    @model_validator(mode='before')
+    @classmethod
+    def take_cover_image(cls, data: Any) -> Any:
+        # The projection returns image_urls / image_assets sliced to the first element
+        if isinstance(data, dict):
+            data = dict(data)
+            images = data.pop("image_urls", None) or []
+            assets = data.pop("image_assets", None) or []
+            data.setdefault("cover_image", images[0] if images else None)
+            data.setdefault("cover_asset", assets[0] if assets else None)
+        return data
+
+    class Settings:
+        projection = {
+            "_id": 1, "name": 1, "slug": 1, "company_slug": 1, "address": 1,
+            "completion_date": 1, "is_featured": 1, "image_count": 1,
+            "image_urls": {"$slice": 1}, "image_assets": {"$slice": 1},
+        }
+
+class ProjectPage(BaseModel):
+    items: List[ProjectSummary]
+    page: int
+    page_size: int
+    total: int
+    has_more: bool = False
+
+class ProjectGalleryPage(BaseModel):
+    items: List[str]
+    assets: List[ImageAsset] = []
+    page: int
+    page_size: int
+    total: int
+
+DEFAULT_PAGE_SIZE = 24
+MAX_PAGE_SIZE = 100
+# Redis sets tracking which page entries are cached, for selective invalidation
+PROJECT_PAGES_GROUP = "projects:pages"
+
+def _page_key(page_size: int, page: int) -> str:
+    return f"projects:page:{page_size}:{page}"
+
+def _gallery_group(slug: str) -> str:
+    return f"project:{slug}:images"
 
-from app.core.redis import get_cache, set_cache, clear_cache
+def _gallery_key(slug: str, page_size: int, page: int) -> str:
+    return f"project:{slug}:images:{page_size}:{page}"
+
+import json
+from fastapi import Request
+from app.core.redis import get_cache_raw, set_cache_raw, get_tracked_keys, clear_cache_keys
+from app.core.compression import precompressed_response
+from app.core.project_views import get_featured_view, get_company_view, refresh_project_views, view_response
+from app.core.read_routing import CACHE_FILL, CATALOG, count, read_many, read_one, routed_collection
+from app.core.snapshots import FEATURED_PROJECTS, mark_changed
+
+@router.get("/featured", response_model=List[FeaturedProjectResponse])
+async def get_featured_projects(request: Request):
+    """Retrieve up to 6 featured projects (served from the materialized view)."""
+    view = await get_featured_view()
+    items = [
+        FeaturedProjectResponse(**p.model_dump()).model_dump(mode="json")
+        for p in view.projects
+    ]
+    return await view_response(request, view, items)
 
 # ... imports ...
 
-@router.get("/", response_model=List[Project])
-async def get_projects(company_slug: Optional[str] = None):
-    """Retrieve all projects, optionally filtering by company slug."""
+@router.get("/", response_model=ProjectPage)
+async def get_projects(
+    request: Request,
+    company_slug: Optional[str] = None,
+    page: int = Query(1, ge=1),
+    page_size: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+):
+    """
+    Retrieve one page of projects (newest first) with only the cover image and image count.
+    With company_slug, the page is taken from that company's project list.
+    Follow `has_more` to read every page.
+    """
     if company_slug:
-        # Check if company exists to avoid returning empty list for non-existent slugs
-        if not await Company.find_one(Company.slug == company_slug):
+        # One read of the company's materialized view (None if the company doesn't exist)
+        view = await get_company_view(company_slug)
+        if view is None:
             raise HTTPException(status_code=404, detail=f"Company with slug '{company_slug}' not found.")
-        projects = await Project.find(Project.company_slug == company_slug).to_list()
-    else:
-        # Check cache first for full list
-        cached_projects = await get_cache("all_projects")
-        if cached_projects:
-            return cached_projects
-
-        projects = await Project.find_all().to_list()
-        # Store in cache (serialize Pydantic models to JSON-compatible dicts)
-        await set_cache("all_projects", [p.model_dump(mode='json') for p in projects], 3600)
-    
-    return projects
+        start = (page - 1) * page_size
+        items = [
+            ProjectSummary.model_validate({**p.model_dump(by_alias=True), "image_count": len(p.image_urls)})
+            for p in view.projects[start:start + page_size]
+        ]
+        total = len(view.projects)
+        result = ProjectPage(items=items, page=page, page_size=page_size, total=total, has_more=start + page_size < total)
+        return await view_response(request, view, result.model_dump(by_alias=True, mode="json"), variant=f"{page_size}:{page}")
+
+    # Each page is cached on its own, so editing one project only drops its page
+    cache_key = _page_key(page_size, page)
+    cached_page = await get_cache_raw(cache_key)
+    if cached_page:
+        return await precompressed_response(request, cache_key, cached_page.encode("utf-8"))
+
+    # Sorting by _id keeps a project on the same page when it is edited
+    items = await read_many(
+        Project, CACHE_FILL,
+        response_model=ProjectSummary,
+        sort=[("_id", -1)],
+        skip=(page - 1) * page_size,
+        limit=page_size,
+    )
+    total = await count(Project, CACHE_FILL)
+    result = ProjectPage(items=items, page=page, page_size=page_size, total=total, has_more=page * page_size < total)
+
+    payload = result.model_dump_json(by_alias=True)
+    await set_cache_raw(cache_key, payload, 3600, group=PROJECT_PAGES_GROUP)
+    return await precompressed_response(request, cache_key, payload.encode("utf-8"))
+
+async def _invalidate_project_pages(project: Optional[Project] = None):
+    """
+    Drop cached listing pages.
+    For an edited project only the page holding it is dropped; otherwise
+    (new project shifts every page) all tracked pages are.
+    """
+    keys = await get_tracked_keys(PROJECT_PAGES_GROUP)
+    if project is not None:
+        # Position of the project in the _id-descending listing
+        rank = await Project.find({"_id": {"$gt": project.id}}).count()
+        stale = []
+        for key in keys:
+            page_size, page = (int(x) for x in key.rsplit(":", 2)[1:])
+            if rank // page_size + 1 == page:
+                stale.append(key)
+        keys = stale
+    await clear_cache_keys(keys, PROJECT_PAGES_GROUP)
+
+async def _invalidate_gallery(slug: str):
+    group = _gallery_group(slug)
+    await clear_cache_keys(await get_tracked_keys(group), group)
 
 @router.post("/", status_code=201)
 async def create_project(project: Project):
@@ -71,25 +197,68 @@ async def create_project(project: Project):
     if not company:
         raise HTTPException(status_code=404, detail="Associated company not found.")
 
+    project.image_assets = await build_image_assets(project.image_urls)
     await project.create()
-    await clear_cache("all_projects")
+    await _invalidate_project_pages()
+    await refresh_project_views([project.company_slug], featured=project.is_featured)
+    if project.is_featured:
+        await mark_changed(FEATURED_PROJECTS)
     return {"message": "Project created successfully", "id": str(project.id)}
 
 @router.get("/{slug}", response_model=Project)
 async def get_project(slug: str):
     """Retrieve a single project by its slug."""
-    project = await Project.find_one(Project.slug == slug)
+    project = await read_one(Project, CATALOG, {"slug": slug})
     if project:
         return project
     raise HTTPException(status_code=404, detail="Project not found.")
 
-@router.put("/{project_id}", response_model=Project)
-async def update_project(project_id: PydanticObjectId, project_update: UpdateProjectModel):
-    """Update an existing project."""
-    project = await Project.get(project_id)
-    if not project:
+@router.get("/{slug}/images", response_model=ProjectGalleryPage)
+async def get_project_images(
+    request: Request,
+    slug: str,
+    page: int = Query(1, ge=1),
+    page_size: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+):
+    """Retrieve one page of a project's image gallery."""
+    cache_key = _gallery_key(slug, page_size, page)
+    cached_page = await get_cache_raw(cache_key)
+    if cached_page:
+        return await precompressed_response(request, cache_key, cached_page.encode("utf-8"))
+
+    # Slice the array on the server so only the requested URLs are transferred
+    collection = routed_collection(Project, CACHE_FILL)
+    window = [(page - 1) * page_size, page_size]
+    doc = await collection.find_one(
+        {"slug": slug},
+        {"image_urls": {"$slice": window}, "image_assets": {"$slice": window}, "image_count": 1},
+    )
+    if not doc:
         raise HTTPException(status_code=404, detail="Project not found.")
 
+    result = ProjectGalleryPage(
+        items=doc.get("image_urls", []),
+        assets=doc.get("image_assets", []),
+        page=page,
+        page_size=page_size,
+        total=doc.get("image_count", 0),
+    )
+    payload = result.model_dump_json()
+    await set_cache_raw(cache_key, payload, 3600, group=_gallery_group(slug))
+    return await precompressed_response(request, cache_key, payload.encode("utf-8"))
+
+@router.put("/{project_id}", response_model=Project)
+async def update_project(
+    project_id: PydanticObjectId,
+    project_update: UpdateProjectModel,
+    response: Response,
+    if_match: Optional[str] = Header(None),
+):
+    """
+    Update an existing project.
+    Only the sent fields are written, in one atomic $set. Send the current
+    revision in If-Match to reject the update if someone else changed it.
+    """
     update_data = project_update.model_dump(exclude_unset=True)
 
     # If company_slug is being updated, verify the new company exists
@@ -101,10 +270,28 @@ async def update_project(project_id: PydanticObjectId, project_update: UpdatePro
                 detail=f"Company with slug '{update_data['company_slug']}' not found."
             )
 
-    # Update the project document
-    for key, value in update_data.items():
-        setattr(project, key, value)
+    # Image records are computed only for URLs that were not there before
+    if "image_urls" in update_data:
+        existing = await existing_image_assets(Project, project_id)
+        update_data["image_assets"] = await build_image_assets(update_data["image_urls"], existing)
+        update_data["image_count"] = len(update_data["image_urls"])
+
+    # The pre-image tells which caches/views held the project before the change
+    old = await atomic_update(
+        Project, project_id, update_data,
+        expected_revision=parse_if_match(if_match),
+        return_old=True,
+        not_found_detail="Project not found.",
+    )
+    project = old.model_copy(update={**update_data, "revision": old.revision + 1})
 
-    await project.save()
-    await clear_cache("all_projects")
-    return project
\ No newline at end of file
+    await _invalidate_project_pages(project)
+    await _invalidate_gallery(old.slug)
+    await refresh_project_views(
+        [old.company_slug, project.company_slug],
+        featured=old.is_featured or project.is_featured,
+    )
+    if old.is_featured or project.is_featured:
+        await mark_changed(FEATURED_PROJECTS)
+    response.headers["ETag"] = revision_etag(project.revision)
+    return project
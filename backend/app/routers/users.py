@@ -11,6 +11,8 @@ from fastapi.security import OAuth2PasswordRequestForm
 from pydantic import BaseModel, EmailStr
 from typing import Optional
 from fastapi.security import OAuth2PasswordBearer
+from app.core.config import settings
+from app.core.ratelimit import RateLimit
 
 # --- AUTH & SECURITY ---
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
@@ -88,7 +90,7 @@ router = APIRouter(
 # --- AUTHENTICATION API ENDPOINTS ---
 # ----------------------------
 
-@router.post("/users", status_code=201)
+@router.post("/users", status_code=201, dependencies=[Depends(RateLimit("signup", settings.RATE_LIMIT_SIGNUP))])
 async def create_user(user_in: UserCreate):
     """
     Create a new user. Can be used to seed the initial admin user.
@@ -108,7 +110,7 @@ async def create_user(user_in: UserCreate):
     await user.create()
     return {"message": "Admin created successfully"}
 
-@router.post("/token", response_model=Token)
+@router.post("/token", response_model=Token, dependencies=[Depends(RateLimit("login", settings.RATE_LIMIT_LOGIN))])
 async def login_for_access_token(response: Response, form_data: OAuth2PasswordRequestForm = Depends()):
     """
     Login endpoint. Returns Access Token and sets Refresh Token HttpOnly cookie.
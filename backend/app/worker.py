@@ -0,0 +1,202 @@
+"""
+Background worker: consumes the event streams and runs side effects
+outside of the request path.
+
+Run with:  python -m app.worker
+"""
+import asyncio
+import signal
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, List
+from beanie import PydanticObjectId
+from beanie.odm.operators.update.general import Set
+from app.core.config import settings
+from app.core import catalog, inventory, snapshots
+from app.core.events import Event, StreamConsumer, publish_event
+from app.core.redis import init_redis, get_redis
+from app.database import init_db
+from app.models import Order
+
+# ----------------------------
+# --- ORDER HANDLERS ---
+# ----------------------------
+
+def notify_new_orders(orders: List[Order]):
+    """Staff notification for new orders (log line; plug email/SMS in here)."""
+    for order in orders:
+        print(f"--> New order {order.id}: {order.customer_name} ({order.customer_phone}), "
+              f"{len(order.items)} item(s), total {order.total_amount:,.0f}")
+
+
+async def record_order_analytics(orders: List[Order]):
+    """Daily order count, revenue and quantity per product, in one transaction."""
+    pipe = get_redis().pipeline(transaction=True)
+    for order in orders:
+        day = order.created_at.strftime("%Y-%m-%d")
+        pipe.hincrby(f"analytics:orders:{day}", "count", 1)
+        pipe.hincrbyfloat(f"analytics:orders:{day}", "revenue", order.total_amount)
+        for item in order.items:
+            pipe.zincrby(f"analytics:products:{day}", item.quantity, item.product_id)
+    await pipe.execute()
+
+
+async def handle_orders_created(events: List[Event]):
+    ids = [PydanticObjectId(e.data["order_id"]) for e in events]
+    # Events may be delivered more than once: only take orders not processed yet
+    orders = await Order.find({"_id": {"$in": ids}, "processed_at": None}).to_list()
+    if not orders:
+        return
+
+    notify_new_orders(orders)
+    await record_order_analytics(orders)
+    await Order.find({"_id": {"$in": [o.id for o in orders]}}).update(
+        Set({"processed_at": datetime.utcnow()})
+    )
+
+
+# ----------------------------
+# --- CATALOG HANDLERS ---
+# ----------------------------
+
+async def handle_categories_updated(events: List[Event]):
+    """Copy renamed categories into their products (one update_many per category)."""
+    for category_id in dict.fromkeys(e.data["category_id"] for e in events):
+        modified = await catalog.fan_out_category(category_id)
+        print(f"--> Category {category_id}: updated {modified} product(s)")
+    # Products now carry the new names: their snapshot must follow
+    await snapshots.mark_changed(snapshots.PRODUCTS)
+
+
+async def handle_catalog_changed(events: List[Event]):
+    """Regenerate the snapshot shards touched by a batch of writes (once per shard)."""
+    shards = dict.fromkeys(s for e in events for s in e.data["shards"] if s in snapshots.RENDERERS)
+    if shards and await snapshots.regenerate_locked(list(shards)) is None:
+        # The shards are marked dirty: the replica generating now redoes them
+        print(f"--> Snapshot generation already running, queued {list(shards)}")
+
+
+# ----------------------------
+# --- SWEEP ---
+# ----------------------------
+
+SWEEP_LOCK_KEY = "orders:sweep:lock"
+SWEEP_WATERMARK_KEY = "orders:sweep:watermark"
+
+
+async def sweep_unpublished_orders():
+    """
+    Re-publish `order.created` for orders whose event never made it to the
+    stream (e.g. Redis was down during checkout). Each order is swept at most
+    once: a watermark remembers how far previous sweeps went.
+    """
+    client = get_redis()
+    # Only one worker replica sweeps at a time
+    if not await client.set(SWEEP_LOCK_KEY, settings.WORKER_CONSUMER, nx=True, ex=60):
+        return
+
+    upper = datetime.utcnow() - timedelta(seconds=settings.WORKER_SWEEP_AFTER_SECONDS)
+    watermark = await client.get(SWEEP_WATERMARK_KEY)
+    lower = datetime.fromisoformat(watermark) if watermark else upper - timedelta(days=1)
+
+    orders = await Order.find({
+        "processed_at": None,
+        "created_at": {"$gt": lower, "$lte": upper},
+    }).sort("created_at").to_list()
+    published = 0
+    watermark = upper
+    for order in orders:
+        if await publish_event(settings.ORDER_EVENTS_STREAM, "order.created", {"order_id": str(order.id)}) is None:
+            # Stop here; the next sweep starts again from this order
+            # (orders with the same timestamp may be re-published: the handler is idempotent)
+            watermark = order.created_at - timedelta(microseconds=1)
+            break
+        published += 1
+    if published:
+        print(f"--> Re-published {published} unprocessed order(s)")
+
+    await client.set(SWEEP_WATERMARK_KEY, watermark.isoformat())
+
+
+# ----------------------------
+# --- INVENTORY ---
+# ----------------------------
+
+async def expire_reservations():
+    """Give back the stock held by orders left pending past RESERVATION_TTL_MINUTES."""
+    expired = await inventory.expire_reservations()
+    if expired:
+        print(f"--> Released stock of {expired} expired reservation(s)")
+
+
+async def sync_stock_counters():
+    """Write hot (Redis) stock counters back to MongoDB until none are left dirty."""
+    while await inventory.sync_hot_counters() >= settings.STOCK_SYNC_BATCH:
+        pass
+
+
+# ----------------------------
+# --- SNAPSHOTS ---
+# ----------------------------
+
+async def refresh_snapshots():
+    """Regenerate every snapshot shard (only changed ones get a new version)."""
+    await snapshots.regenerate_locked()
+
+
+# ----------------------------
+# --- PERIODIC JOBS ---
+# ----------------------------
+
+async def periodic(stop: asyncio.Event, interval: float, job: Callable[[], Awaitable[None]]):
+    """Run `job` every `interval` seconds until `stop` is set; errors are logged, not fatal."""
+    while not stop.is_set():
+        try:
+            await job()
+        except Exception as e:
+            print(f"--> Error in {job.__name__}: {e!r}")
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=interval)
+        except asyncio.TimeoutError:
+            pass
+
+
+def build_jobs(stop: asyncio.Event) -> List[Awaitable[None]]:
+    return [
+        periodic(stop, settings.WORKER_SWEEP_AFTER_SECONDS, sweep_unpublished_orders),
+        periodic(stop, settings.RESERVATION_SWEEP_INTERVAL, expire_reservations),
+        periodic(stop, settings.STOCK_SYNC_INTERVAL, sync_stock_counters),
+        periodic(stop, settings.SNAPSHOT_REFRESH_INTERVAL, refresh_snapshots),
+    ]
+
+
+# ----------------------------
+# --- ENTRYPOINT ---
+# ----------------------------
+
+def build_consumers() -> List[StreamConsumer]:
+    orders = StreamConsumer(settings.ORDER_EVENTS_STREAM, settings.WORKER_GROUP, settings.WORKER_CONSUMER)
+    orders.register("order.created", handle_orders_created)
+    catalog_events = StreamConsumer(settings.CATALOG_EVENTS_STREAM, settings.WORKER_GROUP, settings.WORKER_CONSUMER)
+    catalog_events.register("category.updated", handle_categories_updated)
+    catalog_events.register("catalog.changed", handle_catalog_changed)
+    return [orders, catalog_events]
+
+
+async def main():
+    await init_db()
+    await init_redis()
+    if get_redis() is None:
+        raise SystemExit("--> Worker needs Redis, exiting.")
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    consumers = build_consumers()
+    print(f"--> Worker {settings.WORKER_CONSUMER} consuming {[c.stream for c in consumers]}")
+    await asyncio.gather(*(c.run(stop) for c in consumers), *build_jobs(stop))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,79 @@
+"""
+Test fixtures: the app runs against in-memory MongoDB (mongomock-motor) and
+Redis (fakeredis), so the suite needs no server. Every test gets empty ones.
+"""
+import os
+
+# Read by app.core.config at import time
+os.environ.setdefault("JWT_SECRET_KEY", "test-secret")
+os.environ.setdefault("IMAGE_PROBE_ENABLED", "false")
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+os.environ.setdefault("LOAD_SHEDDING_ENABLED", "false")
+
+import fakeredis
+import httpx
+import mongomock.collection
+import mongomock_motor
+import pytest
+from beanie import init_beanie
+
+import app.core.redis as redis_module
+from app.core.resilience import breakers
+from app.models import Category, Company, Order, Product, Project, ProjectListView, User
+
+
+# --- mongomock gaps (not app behaviour) ---
+
+def _with_options(self, **kwargs):
+    # mongomock-motor returns the synchronous collection here
+    inner = getattr(self, "_AsyncMongoMockCollection__collection")
+    return mongomock_motor.AsyncMongoMockCollection(self.database, inner.with_options(**kwargs))
+
+mongomock_motor.AsyncMongoMockCollection.with_options = _with_options
+
+def _ignore_sort(add):
+    # pymongo >= 4.11 passes `sort` to update builders, which mongomock does not know
+    def wrapper(self, *args, sort=None, **kwargs):
+        return add(self, *args, **kwargs)
+    return wrapper
+
+mongomock.collection.BulkOperationBuilder.add_update = _ignore_sort(mongomock.collection.BulkOperationBuilder.add_update)
+mongomock.collection.BulkOperationBuilder.add_replace = _ignore_sort(mongomock.collection.BulkOperationBuilder.add_replace)
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+async def db():
+    client = mongomock_motor.AsyncMongoMockClient()
+    database = client["khangviet_test"]
+    await init_beanie(database, document_models=[Product, Order, Company, Project, User, Category, ProjectListView])
+    yield database
+
+
+@pytest.fixture
+def redis_server():
+    return fakeredis.FakeServer()
+
+
+@pytest.fixture
+async def redis(monkeypatch, redis_server):
+    server = redis_server
+    client = fakeredis.FakeAsyncRedis(server=server, decode_responses=True)
+    monkeypatch.setattr(redis_module, "redis_client", client)
+    monkeypatch.setattr(redis_module, "redis_binary", fakeredis.FakeAsyncRedis(server=server))
+    for breaker in breakers.values():
+        breaker.record_success()
+        monkeypatch.setattr(breaker, "_open_until", 0.0)
+    yield client
+
+
+@pytest.fixture
+async def client(db, redis):
+    from app.main import app
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="https://test") as c:
+        yield c
@@ -0,0 +1,78 @@
+import pytest
+from pymongo.errors import ServerSelectionTimeoutError
+
+from app.models import Company, Product, ProductType
+from app.routers import batch, products
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def catalog(db):
+    await Company(name="Co", slug="co").insert()
+    product = Product(name="Sign", slug="sign", price=100, type=ProductType.READY)
+    await product.insert()
+    return product
+
+
+async def run(client, *operations):
+    response = await client.post("/batch", json={"operations": list(operations)})
+    assert response.status_code == 200
+    return response.json()["results"]
+
+
+async def test_each_operation_gets_its_own_status(client, catalog):
+    results = await run(
+        client,
+        {"id": "product", "op": "product", "params": {"product_id": str(catalog.id)}},
+        {"id": "missing", "op": "product", "params": {"product_id": "0" * 24}},
+        {"id": "bad", "op": "projects", "params": {"page": 0}},
+        {"id": "companies", "op": "companies"},
+        {"id": "projects", "op": "company_projects", "params": {"company_slug": "co"}},
+    )
+    assert results["product"]["status"] == 200 and results["product"]["body"]["slug"] == "sign"
+    assert results["missing"]["status"] == 404
+    assert results["bad"]["status"] == 422
+    assert results["companies"]["status"] == 200 and results["companies"]["body"][0]["slug"] == "co"
+    assert results["projects"] == {"status": 200, "body": []}
+
+
+async def test_failures_stay_inside_their_operation(client, catalog, monkeypatch):
+    async def database_down(**kwargs):
+        raise ServerSelectionTimeoutError("no primary")
+
+    async def bug(**kwargs):
+        raise KeyError("oops")
+    monkeypatch.setitem(batch.OPERATIONS, "products", batch.Operation(database_down, batch.ProductsParams))
+    monkeypatch.setitem(batch.OPERATIONS, "categories", batch.Operation(bug, batch.NoParams))
+
+    results = await run(
+        client,
+        {"id": "a", "op": "products"},
+        {"id": "b", "op": "categories"},
+        {"id": "c", "op": "product", "params": {"product_id": str(catalog.id)}},
+    )
+    assert [results[i]["status"] for i in "abc"] == [503, 500, 200]
+
+
+async def test_identical_operations_run_once(client, catalog, monkeypatch):
+    calls = []
+    get_product = products.get_product
+
+    async def counted(**kwargs):
+        calls.append(kwargs)
+        return await get_product(**kwargs)
+    monkeypatch.setitem(batch.OPERATIONS, "product", batch.Operation(counted, batch.ProductParams))
+
+    params = {"product_id": str(catalog.id)}
+    results = await run(client, {"id": "a", "op": "product", "params": params}, {"id": "b", "op": "product", "params": params})
+    assert results["a"] == results["b"]
+    assert len(calls) == 1
+
+
+async def test_malformed_batches_are_rejected(client, catalog):
+    duplicate = {"operations": [{"id": "a", "op": "companies"}, {"id": "a", "op": "companies"}]}
+    assert (await client.post("/batch", json=duplicate)).status_code == 400
+    unknown = {"operations": [{"id": "a", "op": "orders"}]}
+    assert (await client.post("/batch", json=unknown)).status_code == 400
+    assert (await client.post("/batch", json={"operations": []})).status_code == 422
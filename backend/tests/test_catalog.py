@@ -0,0 +1,72 @@
+import json
+
+import pytest
+
+from app import worker
+from app.core.config import settings
+from app.core.events import Event
+from app.core.redis import cache_breaker
+from app.models import Category, Product
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def category(db):
+    category = Category(name="Neon", slug="neon")
+    await category.insert()
+    return category
+
+
+async def create_product(client, category_id, slug="sign"):
+    return await client.post("/products/", json={
+        "name": "Sign", "slug": slug, "price": 100, "type": "ready", "category_id": category_id,
+    })
+
+
+async def catalog_events(redis):
+    entries = await redis.xrange(settings.CATALOG_EVENTS_STREAM)
+    return [Event(i, f["type"], json.loads(f["data"]), 1) for i, f in entries]
+
+
+async def test_products_embed_their_category(client, category):
+    response = await create_product(client, str(category.id))
+    assert response.status_code == 201
+    body = response.json()
+    assert (body["category_name"], body["category_slug"], body["category"]) == ("Neon", "neon", "Neon")
+
+    assert (await create_product(client, "0" * 24, slug="other")).status_code == 400
+    listed = await client.get("/products/", params={"category_slug": "neon"})
+    assert [p["slug"] for p in listed.json()] == ["sign"]
+
+
+async def test_rename_fans_out_in_the_worker(client, category, redis):
+    product_ids = [(await create_product(client, str(category.id), slug=f"s{i}")).json()["_id"] for i in range(3)]
+
+    response = await client.put(f"/categories/{category.id}", json={"name": "LED", "slug": "led"})
+    assert response.status_code == 200
+    # The request only publishes the event; products still carry the old name
+    assert (await Product.get(product_ids[0])).category_name == "Neon"
+    events = [e for e in await catalog_events(redis) if e.type == "category.updated"]
+    assert [e.data for e in events] == [{"category_id": str(category.id)}]
+
+    # Replays converge on the current name
+    await worker.handle_categories_updated(events + events)
+    for product_id in product_ids:
+        product = await Product.get(product_id)
+        assert (product.category_name, product.category_slug, product.category) == ("LED", "led", "LED")
+
+
+async def test_rename_without_redis_fans_out_inline(client, category, redis):
+    product_id = (await create_product(client, str(category.id))).json()["_id"]
+    for _ in range(settings.CACHE_BREAKER_FAILURES):
+        cache_breaker.record_failure(ConnectionError("redis down"))
+
+    assert (await client.put(f"/categories/{category.id}", json={"name": "LED"})).status_code == 200
+    assert (await Product.get(product_id)).category_name == "LED"
+
+
+async def test_other_edits_do_not_fan_out(client, category, redis):
+    await create_product(client, str(category.id))
+    assert (await client.put(f"/categories/{category.id}", json={})).status_code == 200
+    assert not [e for e in await catalog_events(redis) if e.type == "category.updated"]
@@ -0,0 +1,78 @@
+import gzip
+import json
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse, StreamingResponse
+import httpx
+
+from app.core.compression import CompressionMiddleware, negotiate_encoding
+from app.models import Product, ProductType
+
+pytestmark = pytest.mark.anyio
+
+
+def test_negotiate_encoding():
+    assert negotiate_encoding("") is None
+    assert negotiate_encoding("identity") is None
+    assert negotiate_encoding("gzip, br") == "br"
+    assert negotiate_encoding("gzip;q=1, br;q=0") == "gzip"
+    assert negotiate_encoding("gzip;q=0.5, br;q=0.8") == "br"
+    assert negotiate_encoding("*") == "br"
+
+
+async def test_json_endpoint_behind_full_stack_is_compressed(client):
+    # Large enough to pass COMPRESSION_MINIMUM_SIZE, served by a plain (non-precompressed) handler
+    for i in range(20):
+        await Product(name=f"Bảng hiệu {i}", slug=f"p{i}", price=100, type=ProductType.READY, description="x" * 100).insert()
+
+    for accept, expected in (("br", "br"), ("gzip", "gzip"), ("identity", None)):
+        response = await client.get("/products/", headers={"accept-encoding": accept})
+        assert response.status_code == 200
+        assert response.headers.get("content-encoding") == expected
+        assert len(response.json()) == 20
+        if expected:
+            assert "accept-encoding" in response.headers["vary"].lower()
+
+
+def _app(endpoint):
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, minimum_size=100)
+    app.get("/")(endpoint)
+    return app
+
+
+async def _get(app, accept="gzip"):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="https://test") as c:
+        return await c.get("/", headers={"accept-encoding": accept})
+
+
+async def test_streamed_body_is_compressed_incrementally():
+    chunks = [json.dumps({"i": i, "pad": "y" * 50}).encode() for i in range(10)]
+
+    async def endpoint():
+        async def body():
+            for chunk in chunks:
+                yield chunk
+        return StreamingResponse(body(), media_type="application/json")
+
+    for accept in ("gzip", "br"):
+        response = await _get(_app(endpoint), accept)
+        assert response.headers["content-encoding"] == accept
+        assert "content-length" not in response.headers
+        assert response.content == b"".join(chunks)
+
+
+async def test_small_and_precompressed_bodies_pass_through():
+    async def small():
+        return PlainTextResponse("tiny")
+    response = await _get(_app(small))
+    assert "content-encoding" not in response.headers
+    assert response.text == "tiny"
+
+    async def precompressed():
+        body = gzip.compress(b"z" * 500)
+        return PlainTextResponse(body, headers={"Content-Encoding": "gzip"})
+    response = await _get(_app(precompressed), "br")
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.text == "z" * 500
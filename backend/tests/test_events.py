@@ -0,0 +1,74 @@
+import asyncio
+import fakeredis
+import pytest
+
+from app.core import events
+from app.core.config import settings
+from app.core.events import StreamConsumer, dead_letter_stream, publish_event
+from app.core.redis import create_blocking_client
+
+pytestmark = pytest.mark.anyio
+
+STREAM = "test:events"
+
+
+async def test_blocking_client_outlasts_the_block():
+    client = create_blocking_client(settings.WORKER_BLOCK_MS)
+    try:
+        timeout = client.connection_pool.connection_kwargs["socket_timeout"]
+        assert timeout > settings.WORKER_BLOCK_MS / 1000
+    finally:
+        await client.aclose()
+
+
+@pytest.fixture
+def consumer(monkeypatch, redis, redis_server):
+    # run() reads through its own client: same in-memory server
+    monkeypatch.setattr(events, "create_blocking_client",
+                        lambda block_ms: fakeredis.FakeAsyncRedis(server=redis_server, decode_responses=True))
+    return StreamConsumer(STREAM, "workers", "w1")
+
+
+async def _run_until(consumer, stop):
+    await asyncio.wait_for(consumer.run(stop), timeout=5)
+
+
+async def test_handled_events_are_acknowledged(consumer, redis):
+    stop = asyncio.Event()
+    seen = []
+
+    async def handler(batch):
+        seen.extend(e.data["n"] for e in batch)
+        stop.set()
+
+    consumer.register("thing.happened", handler)
+    await consumer.ensure_group()
+    for n in range(3):
+        await publish_event(STREAM, "thing.happened", {"n": n})
+
+    await _run_until(consumer, stop)
+    assert seen == [0, 1, 2]
+    assert (await redis.xpending(STREAM, "workers"))["pending"] == 0
+    assert consumer.reader is None
+
+
+async def test_failing_events_stay_pending_then_go_to_dead_letters(consumer, redis, monkeypatch):
+    async def handler(batch):
+        raise RuntimeError("boom")
+
+    consumer.register("thing.happened", handler)
+    await consumer.ensure_group()
+    await publish_event(STREAM, "thing.happened", {"n": 1})
+
+    await consumer.process(await consumer.read_batch())
+    assert (await redis.xpending(STREAM, "workers"))["pending"] == 1
+
+    # Retried right away, and this delivery is the last one allowed
+    monkeypatch.setattr(settings, "WORKER_RETRY_IDLE_MS", 0)
+    monkeypatch.setattr(settings, "WORKER_MAX_DELIVERIES", 2)
+    retries = await consumer.read_batch()
+    assert [e.deliveries for e in retries] == [2]
+    await consumer.process(retries)
+    assert (await redis.xpending(STREAM, "workers"))["pending"] == 0
+    dead = await redis.xrange(dead_letter_stream(STREAM))
+    assert dead[0][1]["source_id"] == retries[0].id
@@ -0,0 +1,64 @@
+import asyncio
+
+import pytest
+
+from app.models import Order, Product, ProductType
+
+pytestmark = pytest.mark.anyio
+
+CUSTOMER = {"name": "An", "phone": "0900000000", "email": "an@example.com", "address": "HCM"}
+
+
+@pytest.fixture
+async def product(db):
+    product = Product(name="Sign", slug="sign", price=100, type=ProductType.READY, stock=5)
+    await product.insert()
+    return product
+
+
+def checkout(product, quantity=1):
+    return {"customer_info": CUSTOMER, "items": [{"product_id": str(product.id), "quantity": quantity}]}
+
+
+async def test_retry_replays_the_first_response(client, product):
+    headers = {"Idempotency-Key": "k1"}
+    first = await client.post("/orders/", json=checkout(product), headers=headers)
+    assert first.status_code == 201
+    assert "idempotent-replayed" not in first.headers
+
+    retry = await client.post("/orders/", json=checkout(product), headers=headers)
+    assert retry.status_code == 201
+    assert retry.headers["idempotent-replayed"] == "true"
+    assert retry.json()["_id"] == first.json()["_id"]
+    assert await Order.count() == 1
+    assert (await Product.get(product.id)).stock == 4
+
+
+async def test_concurrent_duplicates_create_one_order(client, product):
+    headers = {"Idempotency-Key": "k2"}
+    responses = await asyncio.gather(*(client.post("/orders/", json=checkout(product), headers=headers) for _ in range(3)))
+    assert {r.status_code for r in responses} == {201}
+    assert len({r.json()["_id"] for r in responses}) == 1
+    assert await Order.count() == 1
+
+
+async def test_key_reused_with_another_body(client, product):
+    headers = {"Idempotency-Key": "k3"}
+    assert (await client.post("/orders/", json=checkout(product), headers=headers)).status_code == 201
+    assert (await client.post("/orders/", json=checkout(product, 2), headers=headers)).status_code == 422
+
+
+async def test_failed_request_can_be_retried(client, product):
+    headers = {"Idempotency-Key": "k4"}
+    assert (await client.post("/orders/", json=checkout(product, 9), headers=headers)).status_code == 409
+    # The key was released: the corrected retry is processed, not replayed
+    await Product.find_one(Product.id == product.id).set({"stock": 10})
+    retry = await client.post("/orders/", json=checkout(product, 9), headers=headers)
+    assert retry.status_code == 201
+    assert "idempotent-replayed" not in retry.headers
+
+
+async def test_without_key_every_request_is_processed(client, product):
+    for _ in range(2):
+        assert (await client.post("/orders/", json=checkout(product))).status_code == 201
+    assert await Order.count() == 2
@@ -0,0 +1,73 @@
+import os
+import struct
+import pytest
+
+from app.core.config import settings
+from app.core.images import CloudinaryTransformer, LocalTransformer, build_image_assets
+from app.models import ImageAsset, ImageVariant
+
+pytestmark = pytest.mark.anyio
+
+PNG_800x600 = b"\x89PNG\r\n\x1a\n" + b"\x00\x00\x00\rIHDR" + struct.pack(">II", 800, 600) + b"\x08\x02\x00\x00\x00"
+
+
+@pytest.fixture
+def media(tmp_path, monkeypatch):
+    root = tmp_path / "media"
+    root.mkdir()
+    (root / "a.png").write_bytes(PNG_800x600)
+    secret = tmp_path / "media_secret"
+    secret.mkdir()
+    (secret / "b.png").write_bytes(PNG_800x600)
+    monkeypatch.setattr(settings, "MEDIA_ROOT", str(root))
+    return root
+
+
+async def test_local_images_get_dimensions_but_no_variants(media):
+    [asset] = await build_image_assets(["/media/a.png"])
+    assert (asset.width, asset.height) == (800, 600)
+    assert asset.variants == [] and asset.srcset == ""
+
+
+async def test_other_hosts_get_no_srcset():
+    [asset] = await build_image_assets(["https://images.example.com/0.jpg"])
+    assert asset.variants == [] and asset.srcset == ""
+
+
+async def test_media_path_cannot_escape_into_a_sibling_directory(media):
+    transformer = LocalTransformer()
+    assert transformer._local_path("/media/a.png") == os.path.join(str(media), "a.png")
+    assert transformer._local_path("/media/../media_secret/b.png") is None
+    assert transformer._local_path("/media/../../etc/passwd") is None
+
+
+async def test_cloudinary_variants_are_resized_and_capped_at_the_original(monkeypatch):
+    async def probe(self, url):
+        return 700, 400
+
+    async def no_placeholder(self, url, width, height):
+        return None
+    monkeypatch.setattr(CloudinaryTransformer, "probe", probe)
+    monkeypatch.setattr(CloudinaryTransformer, "blur_placeholder", no_placeholder)
+    url = f"https://{settings.CLOUDINARY_HOST}/demo/image/upload/v1/sign.jpg"
+    [asset] = await build_image_assets([url])
+    assert [v.width for v in asset.variants] == [320, 640, 700]
+    assert asset.variants[0].url == f"https://{settings.CLOUDINARY_HOST}/demo/image/upload/w_320,c_limit,f_auto,q_auto/v1/sign.jpg"
+    assert asset.srcset.endswith(" 700w")
+
+
+@pytest.mark.parametrize("url", [
+    "http://res.cloudinary.com/demo/image/upload/a.jpg",
+    "https://res.cloudinary.com.evil.example/image/upload/a.jpg",
+    "https://user@res.cloudinary.com/image/upload/a.jpg",
+    "https://res.cloudinary.com:8443/image/upload/a.jpg",
+    "file:///etc/passwd?/upload/",
+])
+def test_cloudinary_only_handles_its_https_host(url):
+    assert not CloudinaryTransformer().handles(url)
+
+
+async def test_stale_query_string_variants_are_recomputed(media):
+    stale = ImageAsset(url="/media/a.png", variants=[ImageVariant(width=320, url="/media/a.png?w=320")], srcset="/media/a.png?w=320 320w")
+    [asset] = await build_image_assets(["/media/a.png"], [stale])
+    assert asset.variants == [] and asset.width == 800
@@ -0,0 +1,157 @@
+import pytest
+
+from app.core import inventory
+from app.core.updates import atomic_update
+from app.models import Order, Product, ProductOptionChoice, ProductOptionGroup, ProductType, ReservationStatus, VariantStock
+
+pytestmark = pytest.mark.anyio
+
+CUSTOMER = {"name": "An", "phone": "0900000000", "email": "an@example.com", "address": "HCM"}
+
+
+async def make_product(**fields) -> Product:
+    product = Product(name="Sign", slug="sign", price=100, type=ProductType.READY, **fields)
+    await product.insert()
+    return product
+
+
+async def order(client, product, quantity, **options):
+    return await client.post("/orders/", json={
+        "customer_info": CUSTOMER,
+        "items": [{"product_id": str(product.id), "quantity": quantity, "options": options}],
+    })
+
+
+async def stock_of(product) -> Product:
+    return await Product.get(product.id)
+
+
+async def test_reserve_and_cancel(client):
+    product = await make_product(stock=5)
+    response = await order(client, product, 3)
+    assert response.status_code == 201
+    assert (await stock_of(product)).stock == 2
+
+    # Short: nothing is taken
+    assert (await order(client, product, 3)).status_code == 409
+    assert (await stock_of(product)).stock == 2
+
+    order_id = response.json()["_id"]
+    cancelled = await client.patch(f"/orders/{order_id}", json={"status": "cancelled"})
+    assert cancelled.status_code == 200
+    assert (await stock_of(product)).stock == 5
+    assert (await Order.get(order_id)).reservation.status == ReservationStatus.RELEASED
+
+    # Cancelling twice gives the stock back once
+    await client.patch(f"/orders/{order_id}", json={"status": "cancelled"})
+    assert (await stock_of(product)).stock == 5
+
+
+async def test_confirm_commits_the_reservation(client):
+    product = await make_product(stock=5)
+    order_id = (await order(client, product, 2)).json()["_id"]
+    assert (await client.patch(f"/orders/{order_id}", json={"status": "processing"})).status_code == 200
+    assert (await Order.get(order_id)).reservation.status == ReservationStatus.COMMITTED
+    assert (await stock_of(product)).stock == 3
+
+
+async def test_variant_stock(client):
+    size = ProductOptionGroup(name="Size", choices=[ProductOptionChoice(label="S"), ProductOptionChoice(label="L")])
+    product = await make_product(options=[size], variant_stock=[VariantStock(key="Size=S", stock=1)])
+    assert (await order(client, product, 1, Size="S")).status_code == 201
+    assert (await order(client, product, 1, Size="S")).status_code == 409
+    assert (await order(client, product, 1, Size="L")).status_code == 409  # no stock entry
+    assert (await order(client, product, 1)).status_code == 400  # no option chosen
+    assert (await stock_of(product)).variant_stock[0].stock == 0
+
+
+async def test_hot_counters_sync_back(client, redis):
+    product = await make_product(stock=5, hot_stock=True)
+    order_id = (await order(client, product, 2)).json()["_id"]
+    key = inventory.counter_key(str(product.id), "")
+    assert await redis.get(key) == "3"
+    assert (await stock_of(product)).stock == 5  # MongoDB catches up on sync
+
+    assert await inventory.sync_hot_counters() == 1
+    assert (await stock_of(product)).stock == 3
+    assert await redis.scard(inventory.DIRTY_COUNTERS) == 0
+
+    await client.patch(f"/orders/{order_id}", json={"status": "cancelled"})
+    assert await redis.get(key) == "5"
+    await inventory.sync_hot_counters()
+    assert (await stock_of(product)).stock == 5
+
+
+async def test_failed_sync_keeps_counters_dirty(client, redis, monkeypatch):
+    product = await make_product(stock=5, hot_stock=True)
+    await order(client, product, 2)
+    collection = Product.get_pymongo_collection()
+
+    async def bulk_write(*args, **kwargs):
+        raise RuntimeError("primary stepped down")
+    monkeypatch.setattr(collection, "bulk_write", bulk_write)
+    monkeypatch.setattr(Product, "get_pymongo_collection", classmethod(lambda cls: collection))
+
+    with pytest.raises(RuntimeError):
+        await inventory.sync_hot_counters()
+    assert await redis.smembers(inventory.DIRTY_COUNTERS) == {inventory.counter_key(str(product.id), "")}
+
+
+async def test_sync_does_not_overwrite_an_admin_edit(client, redis, monkeypatch):
+    product = await make_product(stock=5, hot_stock=True)
+    await order(client, product, 2)
+    key = inventory.counter_key(str(product.id), "")
+    mget = redis.mget
+
+    async def edit_during_sync(keys):
+        values = await mget(keys)
+        # The admin sets the stock between the counter read and the write-back
+        assert (await client.put(f"/products/{product.id}", json={"stock": 50})).status_code == 200
+        return values
+    monkeypatch.setattr(redis, "mget", edit_during_sync)
+
+    await inventory.sync_hot_counters()
+    assert (await stock_of(product)).stock == 50
+    assert await redis.get(key) is None
+
+
+async def test_order_during_sync_stays_dirty(client, redis, monkeypatch):
+    product = await make_product(stock=5, hot_stock=True)
+    await order(client, product, 2)
+    mget = redis.mget
+
+    async def order_during_sync(keys):
+        values = await mget(keys)
+        assert (await order(client, product, 1)).status_code == 201
+        return values
+    monkeypatch.setattr(redis, "mget", order_during_sync)
+    await inventory.sync_hot_counters()
+    assert (await stock_of(product)).stock == 3
+
+    monkeypatch.setattr(redis, "mget", mget)
+    assert await redis.scard(inventory.DIRTY_COUNTERS) == 1
+    await inventory.sync_hot_counters()
+    assert (await stock_of(product)).stock == 2
+
+
+async def test_stale_revision_is_retried(db, redis, monkeypatch):
+    product = await make_product(stock=5, hot_stock=True)
+    key = inventory.counter_key(str(product.id), "")
+    await redis.set(key, 4)
+    await redis.sadd(inventory.DIRTY_COUNTERS, key)
+
+    revisions = inventory._revisions
+    edits = []
+
+    async def edited_after_read(ids):
+        result = await revisions(ids)
+        if not edits:
+            edits.append(await atomic_update(Product, product.id, {"name": "Renamed"}))
+        return result
+    monkeypatch.setattr(inventory, "_revisions", edited_after_read)
+    await inventory.sync_hot_counters()
+    # A non-stock edit only delays the write-back
+    assert (await stock_of(product)).stock == 5
+    assert await redis.sismember(inventory.DIRTY_COUNTERS, key)
+    await inventory.sync_hot_counters()
+    assert (await stock_of(product)).stock == 4
@@ -0,0 +1,46 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.core import order_numbers
+from app.models import Order, OrderItem
+
+pytestmark = pytest.mark.anyio
+
+ITEM = OrderItem(product_name="Sign", product_id="0" * 24, quantity=1, price_at_purchase=10)
+
+
+def make_order(**fields) -> Order:
+    return Order(customer_name="An", customer_phone="0900000000", customer_address="HCM",
+                 items=[ITEM], total_amount=10, **fields)
+
+
+@pytest.fixture
+def allocator(monkeypatch):
+    monkeypatch.setattr(order_numbers, "allocator", order_numbers.OrderNumberAllocator(10))
+
+
+async def test_backfill_runs_once(db, allocator):
+    # mongomock ignores partialFilterExpression: several orders without a
+    # number would collide on the unique index
+    await Order.get_pymongo_collection().drop_indexes()
+    now = datetime.utcnow()
+    newer = await make_order(created_at=now).insert()
+    older = await make_order(created_at=now - timedelta(days=1)).insert()
+    numbered = await make_order(number=500, created_at=now - timedelta(days=2)).insert()
+
+    await order_numbers.backfill_order_numbers()
+    assert (await Order.get(older.id)).number == 1
+    assert (await Order.get(newer.id)).number == 2
+    assert (await Order.get(numbered.id)).number == 500
+
+    # Later startups skip the scan
+    late = await make_order().insert()
+    await order_numbers.backfill_order_numbers()
+    assert (await Order.get(late.id)).number is None
+
+
+def test_parse_order_number():
+    assert order_numbers.parse_order_number(" #1042 ") == 1042
+    assert order_numbers.parse_order_number("0") is None
+    assert order_numbers.parse_order_number("abc") is None
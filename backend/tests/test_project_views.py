@@ -0,0 +1,68 @@
+import pytest
+
+from app.core import project_views
+from app.models import Company, Project, ProjectListView
+
+pytestmark = pytest.mark.anyio
+
+
+async def view_of(slug: str) -> ProjectListView:
+    return await ProjectListView.find_one(ProjectListView.key == project_views.company_key(slug))
+
+
+async def test_company_projects_endpoint(client, db):
+    await Company(name="Co", slug="co", logo_url="https://cdn.example.com/co.png").insert()
+    await Project(name="P", slug="p", company_slug="co").insert()
+
+    response = await client.get("/companies/co/projects")
+    assert response.status_code == 200
+    [item] = response.json()
+    assert item["slug"] == "p" and item["company_name"] == "Co"
+    assert response.headers["etag"] == '"company:co:v1"'
+
+    assert (await client.get("/companies/co/projects", headers={"If-None-Match": '"company:co:v1"'})).status_code == 304
+    assert (await client.get("/companies/nope/projects")).status_code == 404
+
+
+async def test_stale_rebuild_is_not_written(db, monkeypatch):
+    await Company(name="Co", slug="co").insert()
+    await Project(name="Old", slug="old", company_slug="co").insert()
+    await project_views.rebuild_company_view("co")
+
+    store = project_views._store_view
+    raced = []
+
+    async def racing_store(key, projects, company, version):
+        if not raced:
+            # A project is added and its rebuild finishes while this one is
+            # about to write the list it read before
+            raced.append(True)
+            await Project(name="New", slug="new", company_slug="co").insert()
+            await project_views.rebuild_company_view("co")
+        return await store(key, projects, company, version)
+    monkeypatch.setattr(project_views, "_store_view", racing_store)
+
+    await project_views.rebuild_company_view("co")
+    view = await view_of("co")
+    assert sorted(p.slug for p in view.projects) == ["new", "old"]
+    assert view.version == 3  # initial build, the racing rebuild, the retry
+
+
+async def test_missing_company_drops_its_view(db):
+    company = Company(name="Co", slug="co")
+    await company.insert()
+    await project_views.rebuild_company_view("co")
+    assert (await view_of("co")).version == 1
+
+    await company.delete()
+    await project_views.rebuild_company_view("co")
+    assert await view_of("co") is None
+
+
+async def test_featured_view(db):
+    await Company(name="Co", slug="co").insert()
+    for i in range(project_views.FEATURED_LIMIT + 2):
+        await Project(name=f"P{i}", slug=f"p{i}", company_slug="co", is_featured=i % 2 == 0).insert()
+    view = await project_views.get_featured_view()
+    assert len(view.projects) == (project_views.FEATURED_LIMIT + 2) // 2
+    assert all(p.is_featured and p.company_name == "Co" for p in view.projects)
@@ -0,0 +1,45 @@
+import pytest
+
+from app.models import Company, Project
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def projects(db):
+    await Company(name="Co", slug="co").insert()
+    created = []
+    for i in range(3):
+        project = Project(name=f"P{i}", slug=f"p{i}", company_slug="co",
+                          image_urls=[f"https://cdn.example.com/p{i}/{n}.jpg" for n in range(5)])
+        await project.insert()
+        created.append(project)
+    return created
+
+
+async def test_listing_pages_carry_covers_only(client, projects):
+    first = (await client.get("/projects/", params={"page_size": 2})).json()
+    assert [p["slug"] for p in first["items"]] == ["p2", "p1"]
+    assert first["total"] == 3 and first["has_more"] is True
+    assert first["items"][0]["cover_image"] == "https://cdn.example.com/p2/0.jpg"
+    assert first["items"][0]["image_count"] == 5
+    assert "image_urls" not in first["items"][0]
+
+    last = (await client.get("/projects/", params={"page_size": 2, "page": 2})).json()
+    assert [p["slug"] for p in last["items"]] == ["p0"]
+    assert last["has_more"] is False
+
+
+async def test_company_listing_pages(client, projects):
+    page = (await client.get("/projects/", params={"company_slug": "co", "page_size": 2})).json()
+    assert len(page["items"]) == 2 and page["has_more"] is True
+    assert (await client.get("/projects/", params={"company_slug": "nope"})).status_code == 404
+
+
+async def test_gallery_pages(client, projects):
+    response = await client.get("/projects/p1/images", params={"page_size": 2, "page": 2})
+    assert response.status_code == 200
+    page = response.json()
+    assert page["items"] == ["https://cdn.example.com/p1/2.jpg", "https://cdn.example.com/p1/3.jpg"]
+    assert page["total"] == 5
+    assert (await client.get("/projects/missing/images")).status_code == 404
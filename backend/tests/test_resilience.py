@@ -0,0 +1,64 @@
+import asyncio
+import json
+import time
+import pytest
+from fastapi import HTTPException
+from redis.exceptions import ConnectionError
+from starlette.requests import Request
+from starlette.responses import Response
+
+from app.core import idempotency
+from app.core.config import settings
+from app.core.events import publish_event
+from app.core.ratelimit import RateLimit
+from app.core.redis import cache_breaker, get_redis
+
+pytestmark = pytest.mark.anyio
+
+
+async def _slow(*args, **kwargs):
+    await asyncio.sleep(5)
+
+
+async def _broken(*args, **kwargs):
+    raise ConnectionError("connection reset")
+
+
+async def test_slow_redis_publish_gives_up_at_the_deadline(redis, monkeypatch):
+    monkeypatch.setattr(redis, "xadd", _slow)
+    started = time.monotonic()
+    assert await publish_event("test:events", "thing.happened", {}) is None
+    assert time.monotonic() - started < 1
+    assert cache_breaker.metrics()["timeouts"] >= 1
+
+
+async def test_repeated_slow_calls_open_the_circuit(redis, monkeypatch):
+    monkeypatch.setattr(redis, "xadd", _slow)
+    for _ in range(settings.CACHE_BREAKER_FAILURES):
+        await publish_event("test:events", "thing.happened", {})
+    assert cache_breaker.state == "open"
+    assert get_redis() is None
+
+
+async def test_rate_limit_lets_requests_through_when_redis_is_slow(redis, monkeypatch):
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", True)
+    monkeypatch.setattr(redis, "eval", _slow)
+    request = Request({"type": "http", "method": "POST", "path": "/", "headers": [], "client": ("10.0.0.1", 1)})
+    started = time.monotonic()
+    assert await RateLimit("test", "1/60")(request, Response()) is None
+    assert time.monotonic() - started < 1
+
+
+async def test_idempotency_claim_falls_back_to_processing(redis, monkeypatch):
+    monkeypatch.setattr(redis, "set", _slow)
+    assert await idempotency.begin("orders", "k1", "fp") is None
+
+
+async def test_idempotency_poll_error_is_a_409_not_a_500(redis, monkeypatch):
+    # In flight on another instance (no local waiter), then Redis breaks while polling
+    marker = json.dumps({"state": idempotency.IN_FLIGHT, "fingerprint": "fp"})
+    await redis.set("idem:orders:k2", marker)
+    monkeypatch.setattr(redis, "get", _broken)
+    with pytest.raises(HTTPException) as e:
+        await idempotency.begin("orders", "k2", "fp")
+    assert e.value.status_code == 409
@@ -0,0 +1,101 @@
+import pytest
+
+from app import worker
+from app.core import read_routing, snapshots
+from app.core.events import Event
+from app.core.read_routing import CATALOG
+from app.models import Category, Company, Product, ProductType
+from app.routers import categories
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(snapshots, "store", snapshots.LocalObjectStore(str(tmp_path)))
+    return snapshots.store
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    """Shard lists passed to regenerate(), in order."""
+    seen = []
+    original = snapshots.regenerate
+
+    async def regenerate(shards=None):
+        seen.append(list(shards or snapshots.RENDERERS))
+        return await original(shards)
+    monkeypatch.setattr(snapshots, "regenerate", regenerate)
+    return seen
+
+
+async def test_renderers_read_from_the_primary(db, redis, store, monkeypatch):
+    routes = []
+    original = read_routing.routed_collection
+
+    def routed_collection(model, route):
+        routes.append(route)
+        return original(model, route)
+    monkeypatch.setattr(read_routing, "routed_collection", routed_collection)
+    monkeypatch.setattr(categories, "routed_collection", routed_collection)
+
+    await Category(name="Neon", slug="neon").insert()
+    await Company(name="Co", slug="co").insert()
+    await Product(name="Sign", slug="sign", price=1, type=ProductType.READY).insert()
+    for render in (snapshots.render_products, snapshots.render_categories, snapshots.render_companies):
+        assert len(await render()) == 1
+    assert routes and CATALOG not in routes
+
+
+async def test_busy_lock_marks_shards_for_the_holder(db, redis, store, calls):
+    await redis.set(snapshots.LOCK_KEY, "other-replica")
+    assert await snapshots.regenerate_locked([snapshots.PRODUCTS]) is None
+    assert await redis.smembers(snapshots.DIRTY_KEY) == {snapshots.PRODUCTS}
+    assert calls == []
+    # The lock of another replica is never deleted
+    assert await redis.get(snapshots.LOCK_KEY) == "other-replica"
+
+    await redis.delete(snapshots.LOCK_KEY)
+    changed = await snapshots.regenerate_locked([snapshots.COMPANIES])
+    assert calls == [[snapshots.PRODUCTS, snapshots.COMPANIES]]
+    assert set(changed) == {snapshots.PRODUCTS, snapshots.COMPANIES}
+    assert await redis.get(snapshots.LOCK_KEY) is None
+    assert await redis.scard(snapshots.DIRTY_KEY) == 0
+
+
+async def test_change_during_a_run_is_regenerated_after_it(db, redis, store, monkeypatch):
+    seen = []
+    original = snapshots.regenerate
+
+    async def regenerate(shards=None):
+        seen.append(list(shards))
+        if len(seen) == 1:
+            # A write lands while this run renders: its event finds the lock held
+            await worker.handle_catalog_changed([Event("1-0", "catalog.changed", {"shards": [snapshots.CATEGORIES]}, 1)])
+        return await original(shards)
+    monkeypatch.setattr(snapshots, "regenerate", regenerate)
+
+    await snapshots.regenerate_locked()
+    assert seen == [list(snapshots.RENDERERS), [snapshots.CATEGORIES]]
+
+
+async def test_failed_run_keeps_its_shards_dirty(db, redis, store, monkeypatch):
+    async def regenerate(shards=None):
+        raise RuntimeError("store down")
+    monkeypatch.setattr(snapshots, "regenerate", regenerate)
+
+    with pytest.raises(RuntimeError):
+        await snapshots.regenerate_locked([snapshots.PRODUCTS])
+    assert await redis.smembers(snapshots.DIRTY_KEY) == {snapshots.PRODUCTS}
+    assert await redis.get(snapshots.LOCK_KEY) is None
+
+
+async def test_unchanged_shards_keep_their_version(db, redis, store):
+    await Product(name="Sign", slug="sign", price=1, type=ProductType.READY).insert()
+    assert snapshots.PRODUCTS in await snapshots.regenerate_locked()
+    version = snapshots.load_manifest()["shards"][snapshots.PRODUCTS]["version"]
+    assert await snapshots.regenerate_locked() == []
+
+    await Product(name="Lamp", slug="lamp", price=2, type=ProductType.READY).insert()
+    assert await snapshots.regenerate_locked([snapshots.PRODUCTS]) == [snapshots.PRODUCTS]
+    assert snapshots.load_manifest()["shards"][snapshots.PRODUCTS]["previous"] == [version]
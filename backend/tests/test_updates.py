@@ -0,0 +1,57 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from app.core.updates import atomic_update, parse_if_match
+from app.models import Product, ProductType
+
+pytestmark = pytest.mark.anyio
+
+
+async def make_product() -> Product:
+    product = Product(name="Sign", slug="sign", price=100, type=ProductType.READY, description="Neon")
+    await product.insert()
+    return product
+
+
+async def test_if_match_rejects_a_stale_revision(client):
+    product = await make_product()
+    url = f"/products/{product.id}"
+
+    first = await client.put(url, json={"price": 120}, headers={"If-Match": '"0"'})
+    assert first.status_code == 200
+    assert first.headers["etag"] == '"1"'
+    assert first.json()["revision"] == 1
+
+    stale = await client.put(url, json={"price": 90}, headers={"If-Match": '"0"'})
+    assert stale.status_code == 409
+    assert (await Product.get(product.id)).price == 120
+
+    assert (await client.put(url, json={"price": 90}, headers={"If-Match": 'W/"1"'})).status_code == 200
+    assert (await client.put(url, json={"price": 90}, headers={"If-Match": "abc"})).status_code == 400
+
+
+async def test_missing_document_is_404_not_409(client):
+    missing = "0" * 24
+    response = await client.put(f"/products/{missing}", json={"price": 1}, headers={"If-Match": '"0"'})
+    assert response.status_code == 404
+
+
+async def test_only_sent_fields_are_written(db):
+    product = await make_product()
+    # Two edits of different fields from the same revision both survive
+    await asyncio.gather(
+        atomic_update(Product, product.id, {"price": 150}),
+        atomic_update(Product, product.id, {"description": "LED"}),
+    )
+    stored = await Product.get(product.id)
+    assert (stored.price, stored.description, stored.revision) == (150, "LED", 2)
+
+
+def test_parse_if_match():
+    assert parse_if_match(None) is None
+    assert parse_if_match("*") is None
+    assert parse_if_match('W/"7"') == 7
+    with pytest.raises(HTTPException):
+        parse_if_match('"x"')
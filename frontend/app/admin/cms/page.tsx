@@ -3,7 +3,7 @@
 
 import React, { useState, FormEvent, useEffect, useCallback } from "react";
 import { compressImage } from "@/lib/utils";
-import { getApiUrl } from "@/lib/api";
+import { fetchAllProjects, getApiUrl } from "@/lib/api";
 import { uploadToCloudinary } from "@/lib/cloudinary";
 import { Button } from "@/components/ui/button";
 import { Input } from "@/components/ui/input";
@@ -85,12 +85,9 @@ const CMSPage = () => {
   // --- DATA FETCHING ---
   const fetchProjects = useCallback(async () => {
     setStatus("Đang tải danh sách dự án...");
-    const baseUrl = getApiUrl();
     try {
-      const response = await fetch(`${baseUrl}/projects`);
-      if (!response.ok) throw new Error("Failed to fetch projects.");
-      const data: Project[] = await response.json();
-      setProjects(data);
+      // Listing is paginated and only carries the cover image: load every page
+      setProjects(await fetchAllProjects<Project>());
       setStatus("");
     } catch (error) {
       const msg =
@@ -122,9 +119,19 @@ const CMSPage = () => {
   }, [fetchProjects, fetchCompanies]);
 
   // --- HANDLERS ---
-  const handleEditClick = (project: Project) => {
-    setSelectedProject(project);
-    setActiveTab("editor");
+  const handleEditClick = async (project: Project) => {
+    // The listing has no image_urls, load the full project before editing
+    try {
+      const response = await fetch(`${getApiUrl()}/projects/${project.slug}`);
+      if (!response.ok) throw new Error("Failed to fetch project.");
+      const fullProject: Project = await response.json();
+      setSelectedProject(fullProject);
+      setActiveTab("editor");
+    } catch (error) {
+      const msg =
+        error instanceof Error ? error.message : "Could not fetch project.";
+      toast.error(`Error: ${msg}`);
+    }
   };
 
   const handleAddNewClick = () => {
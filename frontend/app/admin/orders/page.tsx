@@ -40,13 +40,14 @@ interface OrderItem {
 
 interface Order {
   _id: string;
+  number?: number; // Short order number, e.g. #1042
   customer_name: string;
   customer_phone: string;
   customer_address: string;
   customer_note?: string;
   items: OrderItem[];
   total_amount: number;
-  status: "pending" | "processing" | "ready" | "completed";
+  status: "pending" | "processing" | "ready" | "completed" | "cancelled";
   created_at: string; // Comes as ISO string
 }
 
@@ -87,6 +88,10 @@ const statusConfig = {
     label: "Hoàn thành",
     className: "bg-green-900/30 text-green-400 border border-green-600/50",
   },
+  cancelled: {
+    label: "Đã hủy",
+    className: "bg-red-900/30 text-red-400 border border-red-600/50",
+  },
 };
 
 const getStatusBadge = (status: Order["status"]) => {
@@ -135,15 +140,23 @@ export default function OrderManagementPage() {
 
   const handleUpdateStatus = async (newStatus: Order["status"]) => {
     if (!selectedOrder) return;
-    // TODO: Implement API call to PATCH /orders/{order_id} to update status
-    console.log(`Updating order ${selectedOrder._id} to ${newStatus}`);
-
-    // Optimistic UI update
-    setOrders(
-      orders.map((o) =>
-        o._id === selectedOrder._id ? { ...o, status: newStatus } : o
-      )
-    );
+    try {
+      const response = await fetch(
+        `${getApiUrl()}/orders/${selectedOrder._id}`,
+        {
+          method: "PATCH",
+          headers: { "Content-Type": "application/json" },
+          body: JSON.stringify({ status: newStatus }),
+        }
+      );
+      if (!response.ok) {
+        throw new Error("Failed to update order status");
+      }
+      const updated: Order = await response.json();
+      setOrders(orders.map((o) => (o._id === updated._id ? updated : o)));
+    } catch (error) {
+      console.error("Error updating order status:", error);
+    }
     setIsModalOpen(false);
   };
 
@@ -204,6 +217,9 @@ export default function OrderManagementPage() {
                 className="border-b border-gray-800 hover:bg-[#252525] transition-colors text-sm"
               >
                 <td className="px-4 py-2 text-gray-300">
+                  {order.number && (
+                    <div className="font-medium text-white">#{order.number}</div>
+                  )}
                   {formatDate(order.created_at)}
                 </td>
                 <td className="px-4 py-2">
@@ -69,6 +69,7 @@ interface Product {
   price: number;
   category?: string;
   category_id?: string;
+  category_name?: string;
   description?: string;
   type: "ready" | "custom";
   images: string[];
@@ -252,7 +253,7 @@ const ProductList = ({
                   </TableCell>
                   <TableCell className="font-medium">{p.name}</TableCell>
                   <TableCell>
-                    <Badge variant="outline">{p.category || "N/A"}</Badge>
+                    <Badge variant="outline">{p.category_name || p.category || "N/A"}</Badge>
                   </TableCell>
                   <TableCell>{formatCurrency(p.price)}</TableCell>
                   <TableCell>
@@ -1,7 +1,7 @@
 "use client";
 
-import { useState } from 'react';
-import { useCart } from '@/components/providers/CartContext';
+import { useRef, useState } from 'react';
+import { cartLineKey, useCart } from '@/components/providers/CartContext';
 import { Input } from '@/components/ui/input';
 import { Button } from '@/components/ui/button';
 import { toast } from 'sonner';
@@ -18,6 +18,9 @@ export default function CheckoutPage() {
     email: '',
     address: '',
   });
+  // One key per checkout attempt: retries and double-clicks reuse it so the
+  // backend creates the order only once
+  const idempotencyKey = useRef<string | null>(null);
 
   const handleInputChange = (e: React.ChangeEvent<HTMLInputElement>) => {
     const { name, value } = e.target;
@@ -40,21 +43,32 @@ export default function CheckoutPage() {
       items: cartItems.map(item => ({
         product_id: item.product.id,
         quantity: item.quantity,
+        options: item.product.options ?? {},
       })),
     };
 
     const baseUrl = getApiUrl();
+    if (!idempotencyKey.current) {
+      idempotencyKey.current = crypto.randomUUID();
+    }
     try {
       const response = await fetch(`${baseUrl}/orders`, {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
+          'Idempotency-Key': idempotencyKey.current,
         },
         body: JSON.stringify(payload),
       });
 
       if (response.ok) {
-        toast.success('Order placed successfully!');
+        const order = await response.json();
+        toast.success(
+          order.number
+            ? `Order #${order.number} placed successfully!`
+            : 'Order placed successfully!'
+        );
+        idempotencyKey.current = null;
         clearCart();
         setCustomerInfo({ name: '', phone: '', email: '', address: '' });
       } else {
@@ -140,7 +154,7 @@ export default function CheckoutPage() {
           <div className="space-y-4">
             {cartItems.length > 0 ? (
               cartItems.map(item => (
-                <div key={item.product.id} className="flex items-center justify-between">
+                <div key={cartLineKey(item.product)} className="flex items-center justify-between">
                   <div className="flex items-center gap-4">
                     <Image
                       src={item.product.imageUrl || '/placeholder.svg'}
@@ -151,12 +165,15 @@ export default function CheckoutPage() {
                     />
                     <div>
                       <p className="font-semibold">{item.product.name}</p>
+                      {item.product.options && Object.keys(item.product.options).length > 0 && (
+                        <p className="text-sm text-gray-500">{Object.values(item.product.options).join(' / ')}</p>
+                      )}
                       <p className="text-sm text-gray-500">${item.product.price.toFixed(2)} x {item.quantity}</p>
                     </div>
                   </div>
                   <div className="flex items-center gap-4">
                      <p className="font-semibold">${(item.product.price * item.quantity).toFixed(2)}</p>
-                     <Button variant="ghost" size="icon" onClick={() => removeFromCart(item.product.id)}>
+                     <Button variant="ghost" size="icon" onClick={() => removeFromCart(cartLineKey(item.product))}>
                         <Trash2 className="h-5 w-5 text-red-500" />
                      </Button>
                   </div>
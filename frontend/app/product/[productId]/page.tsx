@@ -34,9 +34,11 @@ export async function getProduct(id: string): Promise<Product | null> {
       price: item.price,
       images: item.images || [],
       category:
+        item.category_name ||
         item.category ||
         (item.type === "ready" ? "Sản phẩm có sẵn" : "Thiết kế riêng"),
       category_id: item.category_id,
+      category_slug: item.category_slug,
       description: item.description,
       options: item.options,
       type: item.type,
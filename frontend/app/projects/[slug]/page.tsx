@@ -1,6 +1,6 @@
 import { GalleryProjectDetail } from "@/components/gallery/GalleryProjectDetail";
 import { notFound } from "next/navigation";
-import { getApiUrl } from "@/lib/api";
+import { fetchAllProjects, fetchProjectImages, getApiUrl } from "@/lib/api";
 
 // Revalidate every 60 seconds
 export const revalidate = 60;
@@ -15,14 +15,7 @@ const baseUrl = getApiUrl();
 export async function generateStaticParams() {
 
   try {
-    const projects = await fetch(
-      `${baseUrl}/projects`
-    ).then((res) => res.json());
-
-    if (!Array.isArray(projects)) {
-      return [];
-    }
-
+    const projects = await fetchAllProjects<{ slug: string }>();
     return projects.map((project: { slug: string }) => ({
       slug: project.slug,
     }));
@@ -75,11 +68,19 @@ export default async function ProjectPage({ params }: ProjectPageProps) {
     notFound();
   }
 
+  // The gallery comes from its own paginated endpoint
+  let gallery_images: string[] = [];
+  try {
+    gallery_images = (await fetchProjectImages(slug)).items;
+  } catch (error) {
+    console.error(`Failed to fetch the gallery of project ${slug}:`, error);
+  }
+
   // --- Data Transformation ---
   // Map the API response to the format expected by the GalleryProjectDetail component
   const clean_project = {
     ...projectData,
-    gallery_images: projectData.image_urls || [], // Critical fix: Map image_urls to gallery_images
+    gallery_images,
     title: projectData.name, // Map name to title
     location: projectData.address || "Unknown", // Map address to location with a fallback
     year: projectData.completion_date
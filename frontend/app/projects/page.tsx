@@ -3,14 +3,15 @@ import { GalleryHeader } from "@/components/gallery/GalleryHeader";
 import { GalleryFooter } from "@/components/gallery/GalleryFooter";
 import { Project } from "@/types/project";
 import { Company } from "@/components/home/ClientMarquee";
-import { getApiUrl } from "@/lib/api";
+import Link from "next/link";
+import { fetchProjectsPage, getApiUrl } from "@/lib/api";
 
 // 1. Interface for the raw data from the backend API
 interface BackendProject {
   _id: string;
   name: string;
   address: string | null;
-  image_urls: string[];
+  cover_image?: string | null; // The listing sends the cover only
   slug: string;
   company_slug: string; // The backend sends this, we can map it to client_name
   completion_date: string | null;
@@ -23,22 +24,17 @@ interface GalleryProps {
 // The frontend Project interface is defined in @/types/project.ts
 // It expects: { title, slug, client_name, location, completion_year, cover_image, gallery_images, description? }
 
-async function getProjects(company_slug?: string): Promise<Project[]> {
+async function getProjects(
+  page: number,
+  company_slug?: string,
+): Promise<{ projects: Project[]; hasMore: boolean }> {
   try {
-    const baseUrl = `${getApiUrl()}/projects`;
-    const url = company_slug
-      ? `${baseUrl}?company_slug=${company_slug}`
-      : baseUrl;
-
-    const res = await fetch(url, {
-      next: { revalidate: 3600 }, // Revalidate every hour
-    });
-
-    if (!res.ok) {
-      throw new Error("Failed to fetch projects from backend");
-    }
-
-    const raw_data: BackendProject[] = await res.json();
+    // One page of the listing (optionally of one company's projects)
+    const { items: raw_data, has_more } = await fetchProjectsPage<BackendProject>(
+      page,
+      company_slug ? `company_slug=${encodeURIComponent(company_slug)}` : "",
+      { next: { revalidate: 3600 } }, // Revalidate every hour
+    );
 
     // 2. Map the raw backend data to the structure the frontend components expect
     const clean_data: Project[] = raw_data.map((project: BackendProject) => {
@@ -47,34 +43,33 @@ async function getProjects(company_slug?: string): Promise<Project[]> {
         ? new Date(project.completion_date).getFullYear().toString()
         : "N/A";
 
-      // Handle cover image and gallery images
+      // Handle cover image
       const cover_image =
-        project.image_urls?.[0] ||
+        project.cover_image ||
         "https://via.placeholder.com/1280x720.png?text=No+Image+Available";
-      const gallery_images = project.image_urls?.slice(1) || [];
 
       return {
         slug: project.slug,
         title: project.name, // Map `name` to `title`
         location: project.address || "Unknown Location", // Map `address` to `location` with fallback
-        cover_image: cover_image, // Use the first image as the cover
+        cover_image: cover_image,
         completion_year: completion_year, // Extract year from date
         client_name: project.company_slug, // Map company_slug to client_name
-        gallery_images: gallery_images, // Use remaining images for the gallery
+        gallery_images: [], // The project page loads its gallery from /projects/{slug}/images
         // description is optional and not provided by this endpoint
       };
     });
 
-    return clean_data;
+    return { projects: clean_data, hasMore: has_more };
   } catch (error) {
     console.error("Error fetching or processing projects:", error);
-    // Return an empty array on error to prevent the page from crashing
-    return [];
+    // Return an empty page on error to prevent the page from crashing
+    return { projects: [], hasMore: false };
   }
 }
 
 interface ProjectsPageProps {
-  searchParams: Promise<{ company?: string }>; // Params bây giờ là Promise
+  searchParams: Promise<{ company?: string; page?: string }>; // Params bây giờ là Promise
 }
 
 // Data fetching function for Companies
@@ -100,10 +95,18 @@ export default async function ProjectsPage({
 }: ProjectsPageProps) {
   const params = await searchParams;
   const companySlug = params.company;
+  const page = Math.max(1, parseInt(params.page ?? "1", 10) || 1);
   const companies = await getCompanies();
 
   // Fetch and transform the data
-  const projects = await getProjects(companySlug);
+  const { projects, hasMore } = await getProjects(page, companySlug);
+  const pageHref = (target: number) => {
+    const query = new URLSearchParams();
+    if (companySlug) query.set("company", companySlug);
+    if (target > 1) query.set("page", String(target));
+    const qs = query.toString();
+    return qs ? `/projects?${qs}` : "/projects";
+  };
 
   // Log the final, cleaned data to verify
   console.log("Cleaned project data passed to component:", projects);
@@ -114,6 +117,22 @@ export default async function ProjectsPage({
       <main>
         {/* 3. Pass the mapped clean_data and company name to the component */}
         <GalleryGrid projects={projects} companyName={companySlug} />
+        {(page > 1 || hasMore) && (
+          <nav className="mx-auto flex max-w-7xl justify-between px-6 pb-12 text-white/60">
+            {page > 1 ? (
+              <Link href={pageHref(page - 1)} className="hover:text-[#FF6B00]">
+                ← Trang trước
+              </Link>
+            ) : (
+              <span />
+            )}
+            {hasMore && (
+              <Link href={pageHref(page + 1)} className="hover:text-[#FF6B00]">
+                Trang sau →
+              </Link>
+            )}
+          </nav>
+        )}
       </main>
       <GalleryFooter companies={companies} />
     </div>
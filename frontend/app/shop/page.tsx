@@ -1,27 +1,33 @@
 import { CustomCursor } from "@/components/CustomCursor";
 import { Shop } from "@/components/shop/Shop";
 import { Product } from "@/types/product";
-import { getApiUrl } from "@/lib/api";
+import { getApiUrl, getCatalogShard } from "@/lib/api";
 
-export const dynamic = "force-dynamic";
+// Rebuilt at most once a minute from the catalog snapshot (ISR)
+export const revalidate = 60;
 
+async function fetchProducts(): Promise<any[] | null> {
+  // Static snapshot first, live API if no snapshot is available
+  const snapshot = await getCatalogShard("products");
+  if (snapshot) return snapshot;
 
-async function getProducts() {
   const baseUrl = getApiUrl();
-  try {
-    const res = await fetch(`${baseUrl}/products`, {
-      cache: "no-store",
-    });
-    if (!res.ok) {
-      console.error(
-        `Failed to fetch products from ${baseUrl}/products:`,
-        res.status,
-        res.statusText,
-      );
-      return [];
-    }
+  const res = await fetch(`${baseUrl}/products`, { next: { revalidate: 60 } });
+  if (!res.ok) {
+    console.error(
+      `Failed to fetch products from ${baseUrl}/products:`,
+      res.status,
+      res.statusText,
+    );
+    return null;
+  }
+  return res.json();
+}
 
-    const rawData: any[] = await res.json();
+async function getProducts() {
+  try {
+    const rawData = await fetchProducts();
+    if (rawData === null) return [];
 
     if (!Array.isArray(rawData)) {
       console.error("API response is not an array:", rawData);
@@ -36,9 +42,11 @@ async function getProducts() {
       images: item.images || [],
       // Use the real category from DB, or fallback to type if missing
       category:
+        item.category_name ||
         item.category ||
         (item.type === "ready" ? "Sản phẩm có sẵn" : "Thiết kế riêng"),
       category_id: item.category_id,
+      category_slug: item.category_slug,
       description: item.description,
       options: item.options,
       type: item.type,
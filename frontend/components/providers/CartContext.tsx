@@ -15,9 +15,20 @@ export interface Product {
   name: string;
   price: number;
   imageUrl?: string;
+  // Chosen option per group ({ "Kích thước": "Nhỏ" }), sent with the order
+  options?: Record<string, string>;
   // Add any other product properties you need
 }
 
+// The same product with other options is a separate cart line
+export const cartLineKey = (product: Product) =>
+  [
+    product.id,
+    ...Object.entries(product.options ?? {})
+      .sort(([a], [b]) => a.localeCompare(b))
+      .map(([name, label]) => `${name}=${label}`),
+  ].join("|");
+
 // Define the shape of an item in the cart
 export interface CartItem {
   product: Product;
@@ -28,7 +39,7 @@ export interface CartItem {
 interface CartContextType {
   cartItems: CartItem[];
   addToCart: (product: Product) => void;
-  removeFromCart: (productId: string) => void;
+  removeFromCart: (lineKey: string) => void;
   clearCart: () => void;
   cartCount: number;
 }
@@ -74,13 +85,14 @@ export const CartProvider = ({ children }: CartProviderProps) => {
   }, [cartItems]);
 
   const addToCart = (product: Product) => {
+    const key = cartLineKey(product);
     setCartItems((prevItems) => {
       const existingItem = prevItems.find(
-        (item) => item.product.id === product.id,
+        (item) => cartLineKey(item.product) === key,
       );
       if (existingItem) {
         return prevItems.map((item) =>
-          item.product.id === product.id
+          cartLineKey(item.product) === key
             ? { ...item, quantity: item.quantity + 1 }
             : item,
         );
@@ -90,9 +102,9 @@ export const CartProvider = ({ children }: CartProviderProps) => {
     });
   };
 
-  const removeFromCart = (productId: string) => {
+  const removeFromCart = (lineKey: string) => {
     setCartItems((prevItems) =>
-      prevItems.filter((item) => item.product.id !== productId),
+      prevItems.filter((item) => cartLineKey(item.product) !== lineKey),
     );
   };
 
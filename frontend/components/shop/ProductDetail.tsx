@@ -103,6 +103,9 @@ export function ProductDetail({ product }: ProductDetailProps) {
     name: product.name,
     price: totalPrice,
     imageUrl: product.images[0],
+    options: Object.fromEntries(
+      Object.entries(selectedOptions).map(([group, choice]) => [group, choice.label]),
+    ),
   });
 
   const handleAddToCart = () => {
@@ -108,7 +108,9 @@ export function QuickAddModal({
       name: product.name,
       price: totalPrice,
       imageUrl: product.images?.[0],
-      // Note: We might want to pass options/file to cart if supported
+      options: Object.fromEntries(
+        Object.entries(selectedOptions).map(([group, choice]) => [group, choice.label]),
+      ),
     });
 
     toast.success(`${product.name} đã được thêm vào giỏ hàng!`);
@@ -24,12 +24,129 @@ export async function fetchAPI(endpoint: string, options: RequestInit = {}) {
   return res;
 }
 
+// --- Batch reads ---
+// Several read operations in one round trip (POST /batch). Each result has
+// its own status; failed operations resolve to null.
+export type BatchOperation = {
+  op: string;
+  params?: Record<string, unknown>;
+};
+
+export async function batchAPI<T extends Record<string, BatchOperation>>(
+  operations: T,
+  options: RequestInit = {},
+): Promise<{ [K in keyof T]: any }> {
+  const res = await fetchAPI("batch", {
+    ...options,
+    method: "POST",
+    body: JSON.stringify({
+      operations: Object.entries(operations).map(([id, operation]) => ({ id, ...operation })),
+    }),
+  });
+  if (!res.ok) throw new Error(`Batch request failed: ${res.status} ${res.statusText}`);
+
+  const { results } = await res.json();
+  const data: Record<string, any> = {};
+  for (const id of Object.keys(operations)) {
+    const result = results[id];
+    data[id] = result && result.status < 400 ? result.body : null;
+  }
+  return data as { [K in keyof T]: any };
+}
+
 export async function getProducts() {
   const res = await fetchAPI("products");
   return res.json();
 }
 
-export async function getProjects() {
-  const res = await fetchAPI("projects");
+// The project listing is paginated ({ items, page, page_size, total, has_more }).
+// `query` adds filters, e.g. "company_slug=abc".
+export const PROJECT_PAGE_SIZE = 24;
+
+export type ProjectListPage<T> = {
+  items: T[];
+  page: number;
+  page_size: number;
+  total: number;
+  has_more: boolean;
+};
+
+export async function fetchProjectsPage<T = any>(
+  page = 1,
+  query = "",
+  options: RequestInit = {},
+  pageSize = PROJECT_PAGE_SIZE,
+): Promise<ProjectListPage<T>> {
+  const res = await fetchAPI(`projects?page_size=${pageSize}&page=${page}${query ? `&${query}` : ""}`, options);
+  if (!res.ok) throw new Error(`Failed to fetch projects (page ${page}): ${res.status}`);
+  const data = await res.json();
+  return { ...data, items: data.items ?? [], has_more: data.has_more ?? page * data.page_size < data.total };
+}
+
+// Every page of the listing. Only for callers that need every slug (sitemap,
+// static params, the CMS); pages shown to visitors read one page at a time.
+export async function fetchAllProjects<T = any>(query = "", options: RequestInit = {}): Promise<T[]> {
+  const items: T[] = [];
+  for (let page = 1; ; page++) {
+    const data = await fetchProjectsPage<T>(page, query, options, 100);
+    items.push(...data.items);
+    if (!data.has_more || !data.items.length) return items;
+  }
+}
+
+// One page of a project's gallery (GET /projects/{slug}/images); the listing
+// and the project document no longer need to carry every image URL.
+export type ProjectImagesPage = {
+  items: string[];
+  page: number;
+  page_size: number;
+  total: number;
+};
+
+export async function fetchProjectImages(
+  slug: string,
+  page = 1,
+  pageSize = 100,
+  options: RequestInit = {},
+): Promise<ProjectImagesPage> {
+  const res = await fetchAPI(
+    `projects/${encodeURIComponent(slug)}/images?page_size=${pageSize}&page=${page}`,
+    options,
+  );
+  if (!res.ok) throw new Error(`Failed to fetch images of project ${slug}: ${res.status}`);
   return res.json();
-}
\ No newline at end of file
+}
+
+export async function getProjects() {
+  return fetchAllProjects();
+}
+// --- Catalog snapshots ---
+// The backend publishes static, versioned JSON shards of the catalog listed
+// in a small manifest. The manifest is revalidated every minute; a shard URL
+// changes whenever its content does, so shards can be cached indefinitely.
+export type CatalogShard = "products" | "categories" | "companies" | "featured-projects";
+
+type CatalogManifest = {
+  version: string;
+  generated_at: string;
+  shards: Record<string, { version: string; url: string; count: number }>;
+};
+
+export async function getCatalogShard<T = any>(shard: CatalogShard): Promise<T[] | null> {
+  try {
+    const manifestRes = await fetchAPI("catalog/manifest.json", { next: { revalidate: 60 } });
+    if (!manifestRes.ok) return null;
+    const manifest: CatalogManifest = await manifestRes.json();
+    const entry = manifest.shards[shard];
+    if (!entry) return null;
+
+    // Relative URLs are served by the API itself, absolute ones by the CDN
+    const url = entry.url.startsWith("http") ? entry.url : `${getApiUrl()}${entry.url}`;
+    const res = await fetch(url, { cache: "force-cache" });
+    if (!res.ok) return null;
+    return res.json();
+  } catch (error) {
+    console.error(`Failed to load catalog snapshot '${shard}':`, error);
+    return null;
+  }
+}
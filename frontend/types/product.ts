@@ -15,6 +15,7 @@ export interface Product {
   images: string[];
   category: string;
   category_id?: string;
+  category_slug?: string;
   description?: string;
   highlights?: string[];
   options?: ProductOptionGroup[];